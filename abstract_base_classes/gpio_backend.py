@@ -0,0 +1,94 @@
+from abc import ABC, abstractmethod
+from typing import Callable, Union
+
+import pigpio
+
+class GPIOBackend(ABC):
+    """
+    The gpio functions the modules use. Names, arguments and return values are the ones of pigpio.pi, so every
+    backend is used with the constants of the pigpio module (INPUT, OUTPUT, PUD_UP, RISING_EDGE, TIMEOUT, ...).
+    Ticks are microseconds that wrap around at 2^32 like the ticks of pigpio, pigpio.tickDiff() works on them.
+    Callbacks run on one thread of the backend in the order of the edges.
+    """
+
+    connected: bool
+
+    @abstractmethod
+    def set_mode(self, gpio: int, mode: int) -> int:
+        pass
+
+    @abstractmethod
+    def get_mode(self, gpio: int) -> int:
+        pass
+
+    @abstractmethod
+    def set_pull_up_down(self, gpio: int, pud: int) -> int:
+        pass
+
+    @abstractmethod
+    def read(self, gpio: int) -> int:
+        pass
+
+    @abstractmethod
+    def write(self, gpio: int, level: int) -> int:
+        pass
+
+    @abstractmethod
+    def callback(self, user_gpio: int, edge: int = pigpio.RISING_EDGE, func: Union[Callable[[int, int, int], None], None] = None):
+        """
+        Calls func(gpio, level, tick) on every edge of user_gpio and with level pigpio.TIMEOUT when the watchdog fired.
+        Returns a handle with cancel(). Without func the edges are only counted by tally() of the handle.
+        """
+        pass
+
+    @abstractmethod
+    def set_watchdog(self, user_gpio: int, wdog_timeout: int) -> int:
+        """Sends a pigpio.TIMEOUT to the callbacks of user_gpio after wdog_timeout milliseconds without edge. 0 cancels it"""
+        pass
+
+    @abstractmethod
+    def set_PWM_range(self, user_gpio: int, range_: int) -> int:
+        pass
+
+    @abstractmethod
+    def set_PWM_frequency(self, user_gpio: int, frequency: int) -> int:
+        pass
+
+    @abstractmethod
+    def set_PWM_dutycycle(self, user_gpio: int, dutycycle: int) -> int:
+        pass
+
+    @abstractmethod
+    def get_current_tick(self) -> int:
+        pass
+
+    @abstractmethod
+    def wave_add_generic(self, pulses: list) -> int:
+        """Adds pigpio.pulse(gpio_on, gpio_off, delay) to the waveform that the next wave_create() makes"""
+        pass
+
+    @abstractmethod
+    def wave_create(self) -> int:
+        """Turns the added pulses into a wave and returns its id"""
+        pass
+
+    @abstractmethod
+    def wave_delete(self, wave_id: int) -> int:
+        pass
+
+    @abstractmethod
+    def wave_chain(self, data: list) -> int:
+        """Transmits the waves with the ids in data one after another without gap"""
+        pass
+
+    @abstractmethod
+    def wave_tx_busy(self) -> int:
+        pass
+
+    @abstractmethod
+    def wave_tx_stop(self) -> int:
+        pass
+
+    @abstractmethod
+    def stop(self):
+        pass
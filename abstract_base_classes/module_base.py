@@ -16,8 +16,8 @@ class ModuleBase(ABC):
     @abstractmethod
     def tick(self):
         """
-        On every tick the module locks if he has something to do 
-        and does it and sets the timer to the next time it has some thing to do.
+        The ModuleManager calls tick once per interval of the module config.
+        The module does its periodic work here, e.g. writing sensor readings to the db.
         """
         pass
     
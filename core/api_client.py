@@ -4,6 +4,8 @@
 import json
 from typing import Callable, Union
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import socket
 import os
 import time
@@ -11,30 +13,94 @@ import time
 from core.logger import get_logger
 from abstract_base_classes.singleton_meta import SingletonMeta
 from core.lokal_db import LokalDB
+from core.config_storage import ConfigStorage
+from core.metrics import Metrics
 from exceptions.api_exception import ServerNotReachableException
+from helper import sensor_reading_codec
 
 DEFAULT_TIMEOUT = 10            # how long to wait for a response before throwing an error
+UPLOAD_CHUNK_SIZE = 500         # how many sensor readings are sent in one request until a better size is learned
+MIN_CHUNK_SIZE = 10             # the chunk size is never halved below this
+MAX_CHUNK_SIZE = 5000           # the chunk size never grows above this
+CHUNK_SIZE_STEP = 50            # how many readings are added to the chunk size after a fast upload
+TARGET_LATENCY = 2              # seconds. slower uploads halve the chunk size
+MAX_CHUNK_RETRIES = 3           # how many failed chunks are retried with a smaller size before the drain stops
+CONNECTION_POOL_SIZE = 2        # how many keep-alive connections to the api are kept open
+MAX_RETRIES = 3                 # how often a failed connect or a GET answered with RETRY_STATUS_CODES is repeated
+RETRY_BACKOFF = 0.5             # seconds. the wait between retries doubles starting with this
+RETRY_STATUS_CODES = (502, 503, 504)
+
+def create_session(headers: dict) -> requests.Session:
+    """
+    Creates a session that keeps connections to the api alive and retries with backoff.
+    Connects are retried for every method because nothing was sent yet.
+    Error responses are only retried for GET because uploads are not idempotent.
+
+    :param headers: Headers sent with every request.
+    """
+    retry = Retry(
+        total=MAX_RETRIES,
+        connect=MAX_RETRIES,
+        read=0,
+        status=MAX_RETRIES,
+        backoff_factor=RETRY_BACKOFF,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset(['GET']),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=CONNECTION_POOL_SIZE, max_retries=retry)
+
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update(headers)
+    return session
+
+class ChunkSizeController:
+    """
+    Learns the chunk size for uploads with additive increase and multiplicative decrease (AIMD).
+    Every fast upload adds CHUNK_SIZE_STEP readings, every slow or failed upload halves the size.
+    """
+    def __init__(self, size: int = UPLOAD_CHUNK_SIZE):
+        self.size = min(MAX_CHUNK_SIZE, max(MIN_CHUNK_SIZE, int(size)))
+
+    def on_success(self, latency: float):
+        """
+        :param latency: Seconds the accepted upload took.
+        """
+        if latency > TARGET_LATENCY:
+            self.on_failure()
+        else:
+            self.size = min(MAX_CHUNK_SIZE, self.size + CHUNK_SIZE_STEP)
+
+    def on_failure(self):
+        self.size = max(MIN_CHUNK_SIZE, self.size // 2)
 
 class APIClient(metaclass=SingletonMeta):
     def __init__(self) -> None:
-        self.headers = {
+        self.session = create_session({
             "Origin":self.__get_local_ip(),
             "Content-Type":"application/json; charset=utf-8"
-        }
+        })
 
         self.url = os.getenv("API_LINK")
         self.device_uid = os.getenv("DEVICE_UID")
         self.time_offset = 0 # milliseconds shift from server time to compensate all sensor readings
+        # upload encoding. verbose json until the server offers a compact one on ping
+        self.sensor_reading_format = sensor_reading_codec.FORMAT_JSON
+        self.sensor_reading_encoding = None
         self.db = LokalDB()
+        self.config_storage = ConfigStorage()
+        self.chunk_size = ChunkSizeController(self.config_storage.get('upload_chunk_size', UPLOAD_CHUNK_SIZE))
 
         self.__auth()
 
     def __auth(self):
-            response = requests.post(f"{self.url}/device-auth", json={"uid": self.device_uid}, headers=self.headers, timeout=DEFAULT_TIMEOUT)
+            response = self.session.post(f"{self.url}/device-auth", json={"uid": self.device_uid}, timeout=DEFAULT_TIMEOUT)
 
             if response.status_code != 200: raise ValueError(f"{self.url}/device-auth: Response Status Code: {response.status_code}. Message: {response.text}")
 
-            self.headers['Authorization'] = 'Bearer ' + response.text
+            self.session.headers['Authorization'] = 'Bearer ' + response.text
 
             # todo: do a validation vor the auth token here to avoid error responses written to the Authorization header
 
@@ -44,7 +110,7 @@ class APIClient(metaclass=SingletonMeta):
             return None
 
     def get_device_config(self) -> Union[dict, None]:
-            response = requests.get(f"{self.url}/device-config", headers=self.headers, timeout=DEFAULT_TIMEOUT)
+            response = self.session.get(f"{self.url}/device-config", timeout=DEFAULT_TIMEOUT)
             get_logger().debug(f"{response} GET:{self.url}/device-config")
             # get_logger().debug(f"Detail: " + json.dumps(json.loads(response.text), indent=1))
             if self.__restoreAuth(response):
@@ -52,7 +118,7 @@ class APIClient(metaclass=SingletonMeta):
             return response.json()
 
     def get_device_config(self) -> Union[dict, None]:
-        response = requests.get(f"{self.url}/device-config", headers=self.headers, timeout=DEFAULT_TIMEOUT)
+        response = self.session.get(f"{self.url}/device-config", timeout=DEFAULT_TIMEOUT)
         get_logger().debug(f"{response} GET:{self.url}/device-config")
         # get_logger().debug(f"Detail: " + json.dumps(json.loads(response.text), indent=1))
         if self.__restoreAuth(response):
@@ -60,29 +126,95 @@ class APIClient(metaclass=SingletonMeta):
         return response.json()
 
     def get_mqtt_credentials(self) -> Union[dict, None]:
-        response = requests.get(f"{self.url}/mqtt-credentials", headers=self.headers, timeout=DEFAULT_TIMEOUT)
+        response = self.session.get(f"{self.url}/mqtt-credentials", timeout=DEFAULT_TIMEOUT)
         get_logger().debug(f"{response} GET:{self.url}/mqtt-credentials")
         # get_logger().debug(f"Detail: " + json.dumps(json.loads(response.text), indent=1))
         if self.__restoreAuth(response):
             return self.get_mqtt_credentials()
         return response.json()
 
-    def send_sensor_values(self, sensorReadings: list):
+    def sync_sensor_readings(self) -> bool:
+        """
+        Drains all sensor readings stored up to now chunk by chunk in id order.
+        Only one chunk is loaded into memory at a time and only acknowledged readings are deleted,
+        so an interrupted drain continues with the first unacknowledged reading on the next call.
+        The chunk size adapts to the upload latency and is kept across restarts.
+
+        :return: True if all readings were uploaded, False if the drain gave up after MAX_CHUNK_RETRIES failed chunks.
+        """
+        last_id = 0
+        high_water_mark = self.db.get_last_sensor_reading_id()
+        failures = 0
+        sent_readings = 0
+        start = time.perf_counter()
         try:
-            for sensor in sensorReadings:
-                sensor['createdAt'] = int(sensor['createdAt']) + self.time_offset
+            while True:
+                sensorReadings = self.db.get_sensor_readings(self.chunk_size.size, after_id=last_id, until_id=high_water_mark)
+                if len(sensorReadings) == 0: return True
+
+                upload_start = time.perf_counter()
+                if self.send_sensor_values(sensorReadings):
+                    self.chunk_size.on_success(time.perf_counter() - upload_start)
+                    last_id = sensorReadings[-1]['id']
+                    sent_readings += len(sensorReadings)
+                else:
+                    self.chunk_size.on_failure()
+                    failures += 1
+                    if failures > MAX_CHUNK_RETRIES: return False
+        finally:
+            self.__finish_drain(sent_readings, time.perf_counter() - start)
 
-            response = requests.post(f"{self.url}/sensor-readings-save", json=sensorReadings, headers=self.headers, timeout=DEFAULT_TIMEOUT)
+    def __finish_drain(self, sent_readings: int, duration: float):
+        metrics = Metrics()
+        metrics.set('upload.chunk_size', self.chunk_size.size)
+        if sent_readings > 0:
+            metrics.increment('upload.sent_readings', sent_readings)
+            metrics.set('upload.drain_rows_per_second', sent_readings / duration)
+            get_logger().debug(f"Uploaded {sent_readings} sensor readings in {duration:.2f}s. Next chunk size: {self.chunk_size.size}")
+
+        if self.config_storage.get('upload_chunk_size') != self.chunk_size.size:
+            self.config_storage.set('upload_chunk_size', self.chunk_size.size)
+
+    def send_sensor_values(self, sensorReadings: list) -> bool:
+        """
+        Sends one chunk of sensor readings and deletes them from the local db if the server accepts them.
+
+        :param sensorReadings: Readings from LokalDB.get_sensor_readings() in id order.
+        :return: True if the server accepted the readings.
+        """
+        try:
+            data, headers = sensor_reading_codec.encode(sensorReadings, self.sensor_reading_format, self.sensor_reading_encoding, self.time_offset)
+
+            response = self.session.post(f"{self.url}/sensor-readings-save", data=data, headers=headers, timeout=DEFAULT_TIMEOUT)
             get_logger().debug(f"{response} POST:{self.url}/sensor-readings-save BODY:{response.text}")
 
-            if self.__restoreAuth(response):
-                self.send_sensor_values(sensorReadings)
+            restored = self.__restoreAuth(response)
 
-            if response.status_code == 200:
-                self.db.delete_all_sensor_readings()
+        except requests.exceptions.ReadTimeout as error:
+            # the server is reachable but too slow for this chunk size. A ConnectTimeout is also a Timeout but means
+            # the server is not reachable, it is raised as ServerNotReachableException below
+            get_logger().error(f"POST:{self.url}/sensor-readings-save {error}")
+            return False
 
         except Exception as error:
-            raise ServerNotReachableException("POST:{self.url}/sensor-readings-save")
+            raise ServerNotReachableException(f"POST:{self.url}/sensor-readings-save {error}")
+
+        if restored:
+            return self.send_sensor_values(sensorReadings)
+
+        if response.status_code == 415 and (self.sensor_reading_format != sensor_reading_codec.FORMAT_JSON or self.sensor_reading_encoding is not None):
+            get_logger().warning(f"POST:{self.url}/sensor-readings-save: {self.sensor_reading_format} {self.sensor_reading_encoding} not accepted. Falling back to json")
+            self.sensor_reading_format = sensor_reading_codec.FORMAT_JSON
+            self.sensor_reading_encoding = None
+            return self.send_sensor_values(sensorReadings)
+
+        if response.status_code != 200:
+            get_logger().error(f"POST:{self.url}/sensor-readings-save: Response Status Code: {response.status_code}. Message: {response.text}")
+            return False
+
+        Metrics().increment('upload.sent_bytes', len(data))
+        self.db.delete_sensor_readings_until(sensorReadings[-1]['id'])
+        return True
 
     def __get_local_ip(self):
             # Stellen Sie eine Verbindung zu einem öffentlichen DNS-Server her
@@ -99,9 +231,10 @@ class APIClient(metaclass=SingletonMeta):
             return True
         return False
 
-    def send_ping(self) -> Union[dict, None]:
+    def send_ping(self) -> bool:
+        """:return: True if the server accepted the ping"""
         try:
-            response = requests.post(f"{self.url}/device-ping", headers=self.headers, timeout=DEFAULT_TIMEOUT)
+            response = self.session.post(f"{self.url}/device-ping", timeout=DEFAULT_TIMEOUT)
             get_logger().debug(f"{response} GET:{self.url}/device-ping")
             # get_logger().debug(f"Detail: " + json.dumps(json.loads(response.text), indent=1))
             if self.__restoreAuth(response):
@@ -114,13 +247,66 @@ class APIClient(metaclass=SingletonMeta):
                     local_time = int(time.time() * 1000) # UTC-Millisekunden seit 1970
                     self.time_offset = local_time - body['time']
 
+                # the server lists the upload formats and content encodings it accepts besides plain json
+                if 'sensorReadingFormats' in body:
+                    self.sensor_reading_format, self.sensor_reading_encoding = sensor_reading_codec.negotiate(body['sensorReadingFormats'], body.get('contentEncodings', []))
+
             except Exception as error:
                 get_logger().error(f"Failed to parse json response from ping! {error}")
 
+            if response.status_code != 200:
+                get_logger().error(f"POST:{self.url}/device-ping: Response Status Code: {response.status_code}. Message: {response.text}")
+                return False
+            return True
 
         except Exception as error:
             raise ServerNotReachableException("Server not reachable on send_sensor_values POST:{self.url}/device-ping {error}")
 
 
+    def on_destroy(self):
+        self.session.close()
+
+
 if __name__ == "__main__":
-   pass
+
+    # Benchmark: latency of a ping with a new connection per request vs. a kept alive session connection
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class PingHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True      # headers and body are written separately. avoid the delayed ack stall
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            body = json.dumps({"time": int(time.time() * 1000)}).encode('utf-8')
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), PingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/device-ping"
+    count = 500
+
+    start = time.perf_counter()
+    for _ in range(count):
+        requests.post(url, headers={"Content-Type": "application/json; charset=utf-8"}, timeout=DEFAULT_TIMEOUT).json()
+    new_connection = (time.perf_counter() - start) / count
+
+    session = create_session({"Content-Type": "application/json; charset=utf-8"})
+    start = time.perf_counter()
+    for _ in range(count):
+        session.post(url, timeout=DEFAULT_TIMEOUT).json()
+    kept_alive = (time.perf_counter() - start) / count
+    session.close()
+    server.shutdown()
+
+    print(f"new connection per ping: {new_connection * 1000:.3f} ms")
+    print(f"session keep-alive:      {kept_alive * 1000:.3f} ms")
+    print(f"saved per ping:          {(new_connection - kept_alive) * 1000:.3f} ms (plus the TLS handshake against the real api)")
@@ -1,5 +1,6 @@
 import json
 import os
+import threading
 
 from abstract_base_classes.singleton_meta import SingletonMeta
 from core.logger import get_logger
@@ -18,6 +19,8 @@ class ConfigStorage(metaclass=SingletonMeta):
             # Ordner erstellen, falls nicht vorhanden
             os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
             
+            # set() und delete() laufen auf mehreren Threads (UI, Uploader), json.dump() darf nicht parallel laufen
+            self.__lock = threading.Lock()
             self.config = self.__load_config()
         except Exception as e:
             get_logger().error(f"Fehler beim Erzeugen der Config-Datei: {e}")
@@ -40,19 +43,21 @@ class ConfigStorage(metaclass=SingletonMeta):
 
     def set(self, key, value):
         """Setzt einen Wert in der Konfiguration und speichert die Datei."""
-        self.config[key] = value
-        self.__save_config()
+        with self.__lock:
+            self.config[key] = value
+            self.__save_config()
 
     def __save_config(self):
-        """Speichert die aktuelle Konfiguration in die Datei."""
+        """Speichert die aktuelle Konfiguration in die Datei. Nur mit gehaltenem Lock aufrufen."""
         with open(self.file_path, "w", encoding="utf-8") as file:
             json.dump(self.config, file, indent=4)
 
     def delete(self, key):
         """Löscht einen Schlüssel aus der Konfiguration und speichert die Datei."""
-        if key in self.config:
-            del self.config[key]
-            self.__save_config()
+        with self.__lock:
+            if key in self.config:
+                del self.config[key]
+                self.__save_config()
 
 
 if __name__ == "__main__":
@@ -1,22 +1,35 @@
 #!/usr/bin/env python3
 # -*- coding: utf8 -*-
 
-import board
-import busio
-import pigpio
+import os
 
 from core.logger import get_logger
+from abstract_base_classes.gpio_backend import GPIOBackend
 from abstract_base_classes.singleton_meta import SingletonMeta
 
+GPIO_BACKENDS = ('pigpio', 'simulated')
+DEFAULT_GPIO_BACKEND = 'pigpio'     # the gpio of the Raspberry Pi through the pigpio daemon
+
 class IO(metaclass=SingletonMeta):
     """
-    This class handles all available bus systems and io gpio
+    This class handles all available bus systems and io gpio.
+    The bus libraries (board, busio) are imported on first use, so the modules using IO can be imported
+    on machines without them (e.g. a headless run with a simulated display).
+    The env GPIO_BACKEND selects the GPIOBackend get_gpio() returns:
+    - pigpio: PigpioBackend on the pigpio daemon (Default)
+    - simulated: SimulatedGPIO without hardware and without the pigpio daemon, e.g. for load tests
+    The pigpio Python package is needed with both backends. The backends and the modules use its constants
+    (INPUT, RISING_EDGE, TIMEOUT, ...) and tickDiff().
     """
     def __init__(self):
         self.__i2c = None
-        self.__pigpio = None
+        self.__gpio = None
         self.__spi = None
 
+        self.gpio_backend = os.getenv('GPIO_BACKEND', DEFAULT_GPIO_BACKEND)
+        if self.gpio_backend not in GPIO_BACKENDS:
+            raise ValueError(f"Environment Variable 'GPIO_BACKEND' has to be one of {GPIO_BACKENDS}.")
+
     def stop(self):
         get_logger().warning(f"Stop IO")
 
@@ -24,26 +37,35 @@ class IO(metaclass=SingletonMeta):
             self.__i2c.deinit()
         if self.__spi is not None:
             self.__spi.deinit()
-        if self.__pigpio is not None:
-            self.__pigpio.stop()
+        if self.__gpio is not None:
+            self.__gpio.stop()
 
     def get_spi(self):
         if self.__spi == None:
+            import board
+            import busio
             self.__spi = busio.SPI(clock=board.SCLK, MOSI=board.MOSI, MISO=board.MISO)
             get_logger().info("Initialize spi bus")
         return self.__spi
 
     def get_i2c(self):
         if self.__i2c == None:
+            import board
+            import busio
             self.__i2c = busio.I2C(scl=board.SCL, sda=board.SDA)
             get_logger().info("Initialize i2c bus")
         return self.__i2c
 
-    def get_pigpio(self):
-        if self.__pigpio == None:
-            self.__pigpio = pigpio.pi()
-            get_logger().info("Initialize gpio")
-        return self.__pigpio
+    def get_gpio(self) -> GPIOBackend:
+        if self.__gpio == None:
+            if self.gpio_backend == 'simulated':
+                from core.simulated_gpio import SimulatedGPIO
+                self.__gpio = SimulatedGPIO()
+            else:
+                from core.pigpio_backend import PigpioBackend
+                self.__gpio = PigpioBackend()
+            get_logger().info(f"Initialize gpio ({self.gpio_backend})")
+        return self.__gpio
 
 if __name__ == "__main__":
    pass
@@ -2,18 +2,18 @@
 # -*- coding: utf8 -*-
 
 import os
-import threading
 import time
 import pigpio
 
 from typing import TYPE_CHECKING, Callable, Union
 
 from core.io import IO
+from core.timer_service import TimerService
 from abstract_base_classes.singleton_meta import SingletonMeta
 
 class Light(metaclass=SingletonMeta):
     def __init__(self):
-        self.pigpio = IO().get_pigpio()
+        self.pigpio = IO().get_gpio()
         try:
             self.gpio = int(os.getenv('LIGHT_GPIO'))
         except:
@@ -23,8 +23,7 @@ class Light(metaclass=SingletonMeta):
         
     def init_sequence(self):
         self.blink()
-        timer = threading.Timer(0.3, lambda: self.blink())
-        timer.start()
+        TimerService().call_later(0.3, lambda: self.blink())
         self.blink()
 
     def on(self):
@@ -35,5 +34,4 @@ class Light(metaclass=SingletonMeta):
 
     def blink(self, duration=0.1):
         self.on()
-        timer = threading.Timer(duration, lambda: self.off())
-        timer.start()
\ No newline at end of file
+        TimerService().call_later(duration, lambda: self.off())
\ No newline at end of file
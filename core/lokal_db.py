@@ -1,240 +1,354 @@
 import sqlite3
 import os
-from typing import List, Dict
+import threading
+from typing import List, Dict, Union
 from core.logger import get_logger
 from abstract_base_classes.singleton_meta import SingletonMeta
 import time
 
+SYNCHRONOUS_MODES = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+DEFAULT_SYNCHRONOUS = 'NORMAL'          # im WAL Modus wird nur beim Checkpoint ge-fsync-t. Ein Stromausfall kostet höchstens die letzten Commits
+DEFAULT_JOURNAL_SIZE_LIMIT = 1048576    # Bytes auf die das WAL File nach einem Checkpoint gekürzt wird
+BUSY_TIMEOUT = 5                        # Sekunden die auf einen Lock einer anderen Verbindung gewartet wird
+DEFAULT_FLUSH_SIZE = 100                # Anzahl gepufferter Messwerte ab der in die Datenbank geschrieben wird
+DEFAULT_FLUSH_INTERVAL = 30             # Sekunden die ein Messwert höchstens im Puffer bleibt
+MAX_PENDING_FLUSHES = 10                # Vielfaches von SQLITE_FLUSH_SIZE, das der Puffer hält, wenn das Schreiben scheitert
+
 class LokalDB(metaclass=SingletonMeta):
-    def __init__(self):
+    def __init__(self, db_path: Union[str, None] = None):
+        """
+        Hält eine einzige Verbindung zur Datenbank offen, die von allen Threads (Main Loop, MQTT und pigpio Callbacks)
+        gemeinsam genutzt wird. Der Zugriff wird über einen Lock serialisiert.
+
+        Args:
+            db_path (str, optional): Pfad zur Datenbank. Standard ist '../data/temporary_sensor_reading.db'.
+        """
+        self.__lock = threading.RLock()
+        self.__conn = None
+
+        # Write-Behind Puffer: Messwerte aller Module werden gesammelt und in einer Transaktion geschrieben
+        self.__pending: List[tuple] = []
+        self.__pending_since: Union[float, None] = None
+        self.__flush_failed = False     # das letzte Schreiben ist gescheitert, erst nach SQLITE_FLUSH_INTERVAL neu versuchen
+        self.__dropped = 0              # verworfene Messwerte seit dem letzten erfolgreichen Schreiben
+
         try:
-            relative_path = '../data/temporary_sensor_reading.db'
+            self.flush_size = int(os.getenv('SQLITE_FLUSH_SIZE', DEFAULT_FLUSH_SIZE))
+            self.flush_interval = float(os.getenv('SQLITE_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL))
+            if self.flush_size <= 0 or self.flush_interval <= 0: raise ValueError()
+        except ValueError:
+            raise ValueError("Environment Variables 'SQLITE_FLUSH_SIZE' and 'SQLITE_FLUSH_INTERVAL' have to be numbers greater than 0.")
 
-            # Absoluter Pfad zum aktuellen Python-Skript
-            script_dir = os.path.dirname(os.path.abspath(__file__))
+        try:
+            if db_path is None:
+                relative_path = '../data/temporary_sensor_reading.db'
 
-            # Relativer Pfad zur Datenbank (basierend auf dem Ort der Python-Datei)
-            self.db_path = os.path.join(script_dir, relative_path)
+                # Absoluter Pfad zum aktuellen Python-Skript
+                script_dir = os.path.dirname(os.path.abspath(__file__))
+
+                # Relativer Pfad zur Datenbank (basierend auf dem Ort der Python-Datei)
+                db_path = os.path.join(script_dir, relative_path)
+
+            self.db_path = db_path
 
             # Ordner erstellen, falls nicht vorhanden
             os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
 
             # Verbindung zur SQLite-Datenbank herstellen (Datei wird erstellt, falls sie nicht existiert)
-            conn = sqlite3.connect(self.db_path)
-
-            # Cursor-Objekt erstellen, um SQL-Befehle auszuführen
-            cursor = conn.cursor()
-
+            self.__conn = self.__connect()
+
+            with self.__lock:
+                # Tabelle erstellen (falls nicht existiert)
+                self.__conn.execute('''
+                CREATE TABLE IF NOT EXISTS sensor_readings (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT, -- Auto-Increment
+                    value REAL NOT NULL,                  -- Float-Wert
+                    sensor_id INTEGER NOT NULL,           -- Sensor-ID
+                    created_at INTEGER NOT NULL           -- UTC-Milliseconds seit 1970
+                )
+                ''')
+
+                # Änderungen speichern
+                self.__conn.commit()
 
-            # Tabelle erstellen (falls nicht existiert)
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS sensor_readings (
-                id INTEGER PRIMARY KEY AUTOINCREMENT, -- Auto-Increment
-                value REAL NOT NULL,                  -- Float-Wert
-                sensor_id INTEGER NOT NULL,           -- Sensor-ID
-                created_at INTEGER NOT NULL           -- UTC-Milliseconds seit 1970
-            )
-            ''')
-
-            # Änderungen speichern
-            conn.commit()
         except sqlite3.Error as e:
             get_logger().error(f"Fehler beim Erzeugen der Database: {e}")
+            self.on_destroy()
             raise e
 
-        finally:
-            # Verbindung schließen
-            if conn:
-                conn.close()
+    def __connect(self) -> sqlite3.Connection:
+        """
+        Öffnet die Verbindung im WAL Modus. Die Pragmas 'synchronous' und 'journal_size_limit'
+        können über die Umgebungsvariablen SQLITE_SYNCHRONOUS und SQLITE_JOURNAL_SIZE_LIMIT angepasst werden.
+        """
+        synchronous = os.getenv('SQLITE_SYNCHRONOUS', DEFAULT_SYNCHRONOUS).upper()
+        if synchronous not in SYNCHRONOUS_MODES:
+            raise ValueError(f"Environment Variable 'SQLITE_SYNCHRONOUS' has to be one of {SYNCHRONOUS_MODES}.")
+
+        try:
+            journal_size_limit = int(os.getenv('SQLITE_JOURNAL_SIZE_LIMIT', DEFAULT_JOURNAL_SIZE_LIMIT))
+        except ValueError:
+            raise ValueError("Environment Variable 'SQLITE_JOURNAL_SIZE_LIMIT' has to be a number of bytes.")
+
+        # check_same_thread=False weil die Verbindung von mehreren Threads genutzt wird. Der Lock sorgt für die Serialisierung.
+        conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(f'PRAGMA synchronous={synchronous}')
+        conn.execute(f'PRAGMA journal_size_limit={journal_size_limit}')
+
+        get_logger().debug(f"Database verbunden: {self.db_path} (WAL, synchronous={synchronous}, journal_size_limit={journal_size_limit})")
+        return conn
 
     def safe_sensor_readings(self, sensor_readings: List[Dict]):
         """
-        Speichert eine Liste von Sensor-Daten in der Tabelle sensor_readings.
+        Legt eine Liste von Sensor-Daten im Puffer ab. Der Puffer wird in die Tabelle sensor_readings geschrieben,
+        sobald er SQLITE_FLUSH_SIZE Einträge hat oder der älteste Eintrag SQLITE_FLUSH_INTERVAL Sekunden alt ist.
 
         Args:
             sensor_readings (List[Dict]): Eine Liste von Dictionaries mit den Sensor-Daten.
                 Jedes Dictionary sollte folgende Keys haben:
                     - "value" (float): Der Messwert.
-                    - "sensor_id" (int): Die ID des Sensors.
-                    - "created_at" (int): UTC-Zeitstempel in Millisekunden seit 1970.
+                    - "sensorId" (int): Die ID des Sensors.
         Raises:
             sqlite3.Error: Bei Fehlern in der Datenbankoperation.
         """
 
-        try:
-            # Verbindung zur Datenbank herstellen
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            # SQL-Statement für das Einfügen der Daten
-            insert_query = '''
-            INSERT INTO sensor_readings (sensor_id, value, created_at)
-            VALUES (?, ?, ?)
-            '''
-
-            # UTC-Millisekunden seit 1970
-            utc_milliseconds = int(time.time() * 1000)
-
-            # Daten iterativ einfügen
-            for reading in sensor_readings:
-                cursor.execute(insert_query, (
-                    reading['sensorId'],
-                    reading['value'],
-                    utc_milliseconds,
-                ))
-
-            # Änderungen speichern
-            conn.commit()
-            get_logger().debug(f"{len(sensor_readings)} Einträge erfolgreich gespeichert.")
-
-        except sqlite3.Error as e:
-            get_logger().error(f"Fehler beim Speichern der Sensor-Daten: {e}")
-            raise e
-
-        finally:
-            # Verbindung schließen
-            if conn:
-                conn.close()
-
-    def get_sensor_readings(self) -> List[Dict]:
-        """
-        Ruft alle Sensor-Daten ab.
-
-        Returns:
-            List[Dict]: Eine Liste von Dictionaries mit den Spaltenwerten der Tabelle.
-        """
-        try:
-            # Verbindung zur Datenbank herstellen
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            # Abfrage der Sensor-Daten
-            query = '''
-            SELECT value, sensor_id, created_at
-            FROM sensor_readings
-            '''
-            cursor.execute(query)
-            rows = cursor.fetchall()
-
-            # Ergebnisse als Liste von Dictionaries formatieren
-            result = [
-                {"value": row[0], "sensorId": row[1], "createdAt": row[2]}
-                for row in rows
-            ]
-            return result
+        # UTC-Millisekunden seit 1970. Der Zeitstempel wird beim Messen gesetzt, nicht beim Schreiben
+        utc_milliseconds = int(time.time() * 1000)
 
-        except sqlite3.Error as e:
-            get_logger().error(f"Fehler beim Abrufen der Daten: {e}")
-            return []
+        with self.__lock:
+            if self.__pending_since is None:
+                self.__pending_since = time.time()
 
-        finally:
-            if conn:
-                conn.close()
+            self.__pending.extend(
+                (reading['sensorId'], reading['value'], utc_milliseconds)
+                for reading in sensor_readings
+            )
 
-    def delete_all_sensor_readings(self):
+            # z.B. volle oder schreibgeschützte SD-Karte: die ältesten Messwerte verwerfen statt den Speicher zu füllen
+            max_pending = self.flush_size * MAX_PENDING_FLUSHES
+            if len(self.__pending) > max_pending:
+                if self.__dropped == 0:
+                    get_logger().warning(f"Puffer voll ({max_pending} Einträge), die ältesten Sensor-Daten werden verworfen.")
+                self.__dropped += len(self.__pending) - max_pending
+                del self.__pending[:len(self.__pending) - max_pending]
+
+            if len(self.__pending) >= self.flush_size and not self.__flush_failed:
+                self.flush()
+            else:
+                self.tick()
+
+    def tick(self):
+        """Schreibt den Puffer, wenn der älteste Eintrag älter als SQLITE_FLUSH_INTERVAL ist."""
+        with self.__lock:
+            if self.__pending_since is not None and time.time() - self.__pending_since >= self.flush_interval:
+                self.flush()
+
+    def flush(self):
         """
-        Löscht alle Datensätze aus der Tabelle sensor_readings.
+        Schreibt alle gepufferten Sensor-Daten mit einem executemany in einer Transaktion.
 
         Raises:
-            sqlite3.Error: Bei Fehlern in der Datenbankoperation.
+            sqlite3.Error: Bei Fehlern in der Datenbankoperation. Die Daten bleiben dann im Puffer, der nächste
+                Versuch folgt nach SQLITE_FLUSH_INTERVAL. Der Puffer hält höchstens MAX_PENDING_FLUSHES * SQLITE_FLUSH_SIZE
+                Einträge, ältere werden verworfen.
         """
-        try:
-            # Verbindung zur Datenbank herstellen
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
 
-            # SQL-Befehl zum Löschen aller Datensätze
-            delete_query = '''
-            DELETE FROM sensor_readings
-            '''
-            cursor.execute(delete_query)
+        # SQL-Statement für das Einfügen der Daten
+        insert_query = '''
+        INSERT INTO sensor_readings (sensor_id, value, created_at)
+        VALUES (?, ?, ?)
+        '''
 
-            # Änderungen speichern
-            conn.commit()
-            get_logger().info(f"Alle Datensätze wurden gelöscht. Anzahl der betroffenen Zeilen: {cursor.rowcount}")
+        with self.__lock:
+            if len(self.__pending) == 0:
+                return
 
-        except sqlite3.Error as e:
-            get_logger().error(f"Fehler beim Löschen der Datensätze: {e}")
+            try:
+                self.__conn.executemany(insert_query, self.__pending)
 
-        finally:
-            if conn:
-                conn.close()
+                # Änderungen speichern
+                self.__conn.commit()
+                get_logger().debug(f"{len(self.__pending)} Einträge erfolgreich gespeichert.")
 
+                self.__pending = []
+                self.__pending_since = None
+                self.__flush_failed = False
+                if self.__dropped:
+                    get_logger().warning(f"{self.__dropped} Sensor-Daten wurden verworfen, bevor wieder geschrieben werden konnte.")
+                    self.__dropped = 0
 
+            except sqlite3.Error as e:
+                self.__conn.rollback()
+                get_logger().error(f"Fehler beim Speichern der Sensor-Daten: {e}")
 
-if __name__ == "__main__":
+                # nächster Versuch erst nach SQLITE_FLUSH_INTERVAL, nicht bei jedem tick() und jedem neuen Messwert
+                self.__pending_since = time.time()
+                self.__flush_failed = True
+                raise e
 
-    # Erzeuge dem Pfad -----------------------------------------
+    def get_sensor_readings(self, limit: int, after_id: int = 0, until_id: Union[int, None] = None) -> List[Dict]:
+        """
+        Ruft eine Seite von Sensor-Daten in der Reihenfolge ihrer id ab. Gepufferte Daten werden vorher geschrieben.
 
-    # Absoluter Pfad zum aktuellen Python-Skript
-    script_dir = os.path.dirname(os.path.abspath(__file__))
+        Args:
+            limit (int): Maximale Anzahl der Einträge dieser Seite.
+            after_id (int): Nur Einträge mit einer größeren id werden geliefert (Cursor der letzten Seite).
+            until_id (int, optional): Nur Einträge bis einschließlich dieser id werden geliefert (High-Water-Mark).
 
-    # Relativer Pfad zur Datenbank (basierend auf dem Ort der Python-Datei)
-    db_path = os.path.join(script_dir, '../data/example.db')
+        Returns:
+            List[Dict]: Eine Liste von Dictionaries mit den Spaltenwerten der Tabelle.
+        """
+        try:
+            self.flush()
+        except sqlite3.Error:
+            pass # der Fehler wurde schon geloggt, die Daten bleiben im Puffer
+
+        # Abfrage der Sensor-Daten über den Primärschlüssel, damit nur die Seite gelesen wird
+        query = '''
+        SELECT id, value, sensor_id, created_at
+        FROM sensor_readings
+        WHERE id > ? AND id <= ?
+        ORDER BY id
+        LIMIT ?
+        '''
+
+        if until_id is None:
+            until_id = 2**63 - 1 # größte mögliche id in SQLite
+
+        with self.__lock:
+            try:
+                rows = self.__conn.execute(query, (after_id, until_id, limit)).fetchall()
+
+            except sqlite3.Error as e:
+                get_logger().error(f"Fehler beim Abrufen der Daten: {e}")
+                return []
+
+        # Ergebnisse als Liste von Dictionaries formatieren
+        return [
+            {"id": row[0], "value": row[1], "sensorId": row[2], "createdAt": row[3]}
+            for row in rows
+        ]
+
+    def get_last_sensor_reading_id(self) -> int:
+        """
+        Gibt die höchste gespeicherte id zurück (High-Water-Mark). Gepufferte Daten werden vorher geschrieben.
 
-    # Ordner erstellen, falls nicht vorhanden
-    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        Returns:
+            int: Die höchste id oder 0 wenn die Tabelle leer ist.
+        """
+        try:
+            self.flush()
+        except sqlite3.Error:
+            pass # der Fehler wurde schon geloggt, die Daten bleiben im Puffer
 
-    # Verbindung zur SQLite-Datenbank herstellen (Datei wird erstellt, falls sie nicht existiert)
-    conn = sqlite3.connect(db_path)
+        with self.__lock:
+            try:
+                row = self.__conn.execute('SELECT MAX(id) FROM sensor_readings').fetchone()
 
-    # Cursor-Objekt erstellen, um SQL-Befehle auszuführen
-    cursor = conn.cursor()
+            except sqlite3.Error as e:
+                get_logger().error(f"Fehler beim Abrufen der Daten: {e}")
+                return 0
 
+        return row[0] or 0
 
-    # Tabelle erstellen (falls nicht existiert)
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS users (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        age INTEGER NOT NULL
-    )
-    ''')
+    def delete_sensor_readings_until(self, last_id: int):
+        """
+        Löscht alle Datensätze bis einschließlich last_id aus der Tabelle sensor_readings.
+        Da die ids streng aufsteigend vergeben werden, bleiben Einträge die nach dem Lesen der Seite
+        gespeichert wurden erhalten.
 
-    # Änderungen speichern
-    conn.commit()
+        Args:
+            last_id (int): Die id des letzten vom Server bestätigten Eintrags.
+        """
+        # SQL-Befehl zum Löschen der bestätigten Datensätze
+        delete_query = '''
+        DELETE FROM sensor_readings
+        WHERE id <= ?
+        '''
 
-    # Daten Speichern -----------------------------------------
+        with self.__lock:
+            try:
+                cursor = self.__conn.execute(delete_query, (last_id,))
 
-    # Einzelnen Datensatz einfügen
-    cursor.execute('INSERT INTO users (name, age) VALUES (?, ?)', ('Alice', 25))
+                # Änderungen speichern
+                self.__conn.commit()
+                get_logger().debug(f"Datensätze bis id {last_id} wurden gelöscht. Anzahl der betroffenen Zeilen: {cursor.rowcount}")
 
-    # Mehrere Datensätze einfügen
-    users = [('Bob', 30), ('Charlie', 22)]
-    cursor.executemany('INSERT INTO users (name, age) VALUES (?, ?)', users)
+            except sqlite3.Error as e:
+                self.__conn.rollback()
+                get_logger().error(f"Fehler beim Löschen der Datensätze: {e}")
 
-    # Änderungen speichern
-    conn.commit()
+    def on_destroy(self):
+        """Schreibt den Puffer und schließt die Verbindung zur Datenbank."""
+        with self.__lock:
+            if self.__conn is not None:
+                try:
+                    self.flush()
+                finally:
+                    self.__conn.close()
+                    self.__conn = None
 
-    # Daten Abrufen -----------------------------------------
 
-    cursor.execute('SELECT * FROM users')
-    rows = cursor.fetchall()
 
-    # Ergebnisse ausgeben
-    for row in rows:
-        print(row)
+if __name__ == "__main__":
 
+    # Micro-Benchmark: Verbindung pro Aufruf öffnen/schließen vs. eine dauerhafte WAL Verbindung
+    # Aufruf aus dem Projektordner: python3 -m core.lokal_db
 
-    # Verbindung schließen -----------------------------------------
+    TICKS = 500                                          # Anzahl der simulierten Modul-Ticks
+    READINGS = [{"sensorId": 1, "value": 21.5}, {"sensorId": 2, "value": 48.2}, {"sensorId": 3, "value": 1013.2}]
 
-    conn.close()
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    old_path = os.path.join(script_dir, '../data/benchmark_open_close.db')
+    new_path = os.path.join(script_dir, '../data/benchmark_persistent.db')
 
-    # Fehlerbehandlung -----------------------------------------
+    def remove_db(path):
+        for suffix in ('', '-wal', '-shm', '-journal'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
 
-    try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        # SQL-Operationen...
-    except sqlite3.Error as e:
-        print(f"Ein Fehler ist aufgetreten: {e}")
-    finally:
-        if conn:
-            conn.close()
+    remove_db(old_path)
+    remove_db(new_path)
+    os.makedirs(os.path.dirname(old_path), exist_ok=True)
 
-    # Kontextmanager verwenden -----------------------------------------
+    # bisheriges Muster: jede Speicherung öffnet und schließt eine eigene Verbindung
+    conn = sqlite3.connect(old_path)
+    conn.execute('CREATE TABLE sensor_readings (id INTEGER PRIMARY KEY AUTOINCREMENT, value REAL NOT NULL, sensor_id INTEGER NOT NULL, created_at INTEGER NOT NULL)')
+    conn.commit()
+    conn.close()
 
-    with sqlite3.connect(db_path) as conn:
+    start = time.perf_counter()
+    for _ in range(TICKS):
+        conn = sqlite3.connect(old_path)
         cursor = conn.cursor()
-        cursor.execute('SELECT * FROM users')
-        print(cursor.fetchall())
+        for reading in READINGS:
+            cursor.execute('INSERT INTO sensor_readings (sensor_id, value, created_at) VALUES (?, ?, ?)', (reading['sensorId'], reading['value'], int(time.time() * 1000)))
+        conn.commit()
+        conn.close()
+    old_duration = time.perf_counter() - start
+
+    # neues Muster: eine dauerhafte Verbindung im WAL Modus, ohne Puffer (jeder Tick wird sofort geschrieben)
+    db = LokalDB(new_path)
+    db.flush_size = 1
+    start = time.perf_counter()
+    for _ in range(TICKS):
+        db.safe_sensor_readings(READINGS)
+    new_duration = time.perf_counter() - start
+
+    # mit Write-Behind Puffer (executemany in einer Transaktion)
+    db.flush_size = DEFAULT_FLUSH_SIZE
+    start = time.perf_counter()
+    for _ in range(TICKS):
+        db.safe_sensor_readings(READINGS)
+    db.flush()
+    buffered_duration = time.perf_counter() - start
+    db.on_destroy()
+
+    inserts = TICKS * len(READINGS)
+    print(f"open/close pro Aufruf:     {inserts / old_duration:10.0f} inserts/s ({old_duration * 1000 / TICKS:.3f} ms pro Tick)")
+    print(f"dauerhafte WAL Verbindung: {inserts / new_duration:10.0f} inserts/s ({new_duration * 1000 / TICKS:.3f} ms pro Tick)")
+    print(f"mit Write-Behind Puffer:   {inserts / buffered_duration:10.0f} inserts/s ({buffered_duration * 1000 / TICKS:.3f} ms pro Tick)")
+
+    remove_db(old_path)
+    remove_db(new_path)
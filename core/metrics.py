@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+import threading
+from typing import Dict, Union
+
+from abstract_base_classes.singleton_meta import SingletonMeta
+
+class Metrics(metaclass=SingletonMeta):
+    """
+    Collects runtime metrics of all components in one place.
+    The names are dotted paths like 'upload.drain_rows_per_second'.
+    Counters are increased with increment() and gauges are overwritten with set().
+    """
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__values: Dict[str, float] = {}
+
+    def set(self, name: str, value: float):
+        """Set a gauge to the given value"""
+        with self.__lock:
+            self.__values[name] = value
+
+    def increment(self, name: str, amount: float = 1):
+        """Increase a counter by the given amount"""
+        with self.__lock:
+            self.__values[name] = self.__values.get(name, 0) + amount
+
+    def get(self, name: str, default: Union[float, None] = None) -> Union[float, None]:
+        """Returns the current value of a metric or the default"""
+        with self.__lock:
+            return self.__values.get(name, default)
+
+    def get_all(self) -> Dict[str, float]:
+        """Returns a snapshot of all metrics"""
+        with self.__lock:
+            return dict(self.__values)
+
+
+if __name__ == "__main__":
+
+    Metrics().increment('example.counter')
+    Metrics().increment('example.counter', 2)
+    Metrics().set('example.gauge', 0.5)
+    print(Metrics().get_all())  # Ausgabe: {'example.counter': 3, 'example.gauge': 0.5}
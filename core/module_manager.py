@@ -1,7 +1,12 @@
 #!/usr/bin/env python3
 # -*- coding: utf8 -*-
 
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Union
+
 from core.logger import get_logger
+from core.metrics import Metrics
 
 from abstract_base_classes.module_base import ModuleBase
 from entities.config_entity import DeviceConfig, ModuleConfig
@@ -17,26 +22,103 @@ from hardware_modules.display_info_module import DisplayInfoModule
 from hardware_modules.hc_sr04_module import HCSR04Module
 from entities.config_entity import ModuleConfig
 from abstract_base_classes.singleton_meta import SingletonMeta
+from core.scheduler import Scheduler, ScheduledTask
 
-class ModuleManager(metaclass=SingletonMeta):
+EXECUTION_MODES = ('inline', 'pool')
+DEFAULT_EXECUTION_MODE = 'inline'   # module ticks run on the main loop one after another
+DEFAULT_POOL_SIZE = 4               # threads that run module ticks in the pool mode
+DEFAULT_TICK_TIMEOUT = 30           # seconds a module tick may run in the pool mode before the module is restarted
 
+class ModuleManager(metaclass=SingletonMeta):
+    """
+    Creates the modules from the device config and runs their ticks on the scheduler.
+    The env MODULE_EXECUTION_MODE selects where the ticks run:
+    - inline: on the main loop one after another (Default)
+    - pool: on a thread pool of MODULE_POOL_SIZE threads, so slow reads do not wait for each other.
+      Errors and MODULE_TICK_TIMEOUT are handled on the main loop by restarting the module.
+    """
     def __init__(self) -> None:
         self.__modules: list[ModuleBase] = []
+        self.__tasks: dict[ModuleBase, ScheduledTask] = {}
+        self.__running: dict[ModuleBase, Future] = {}
+        self.__scheduler = Scheduler()
+        self.__executor: Union[ThreadPoolExecutor, None] = None
+
+        self.execution_mode = os.getenv('MODULE_EXECUTION_MODE', DEFAULT_EXECUTION_MODE)
+        if self.execution_mode not in EXECUTION_MODES:
+            raise ValueError(f"Environment Variable 'MODULE_EXECUTION_MODE' has to be one of {EXECUTION_MODES}.")
+
+        try:
+            self.pool_size = int(os.getenv('MODULE_POOL_SIZE', DEFAULT_POOL_SIZE))
+            self.tick_timeout = float(os.getenv('MODULE_TICK_TIMEOUT', DEFAULT_TICK_TIMEOUT))
+        except ValueError:
+            raise ValueError("Environment Variables 'MODULE_POOL_SIZE' and 'MODULE_TICK_TIMEOUT' have to be numbers.")
 
     def get_modules(self) -> list[ModuleBase]:
         return self.__modules
 
-    def tick(self):
-        for module in self.__modules:
-            try:
-                module.tick()
-            except Exception as error:
-                get_logger().error(f"Error on module tick for module id: {module.get_config().get_id()}: {error}")
-                module.on_destroy()
-                self.__modules.remove(module)
-                new_module = self.__create_module(module.get_config())
-                self.__modules.append(new_module)
-                get_logger().debug(f"Module with  id: {module.get_config().get_id()} restarted")
+    def get_scheduler(self) -> Scheduler:
+        """The scheduler that runs the module ticks. The main loop drives it with run_pending() and wait()"""
+        return self.__scheduler
+
+    def __start_module(self, module: ModuleBase, delay: float = 0):
+        self.__modules.append(module)
+        self.__tasks[module] = self.__scheduler.call_later(delay, lambda: self.__tick_module(module), interval=module.get_config().get_interval())
+
+    def __stop_module(self, module: ModuleBase):
+        self.__tasks.pop(module).cancel()
+        # a tick running on the pool can not be interrupted. its result is ignored
+        self.__running.pop(module, None)
+        module.on_destroy()
+        self.__modules.remove(module)
+
+    def __restart_module(self, module: ModuleBase, error: BaseException):
+        get_logger().error(f"Error on module tick for module id: {module.get_config().get_id()}: {error}")
+        self.__stop_module(module)
+        # the first tick of the new module waits one interval so a broken module is not restarted in a busy loop
+        self.__start_module(self.__create_module(module.get_config()), delay=module.get_config().get_interval())
+        get_logger().debug(f"Module with  id: {module.get_config().get_id()} restarted")
+
+    def __tick_module(self, module: ModuleBase):
+        if self.execution_mode == 'pool':
+            self.__submit_tick(module)
+            return
+
+        try:
+            module.tick()
+        except Exception as error:
+            self.__restart_module(module, error)
+
+    def __submit_tick(self, module: ModuleBase):
+        if module in self.__running:
+            # the last tick is still running. skip this one instead of queueing up behind it
+            Metrics().increment('modules.skipped_ticks')
+            return
+
+        if self.__executor is None:
+            self.__executor = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix='module_tick')
+
+        future = self.__executor.submit(module.tick)
+        self.__running[module] = future
+        timeout = self.__scheduler.call_later(self.tick_timeout, lambda: self.__on_tick_timeout(module, future))
+        # the result is handled on the main loop. scheduling it wakes the loop up
+        future.add_done_callback(lambda done: self.__scheduler.call_later(0, lambda: self.__collect_tick(module, done, timeout)))
+
+    def __collect_tick(self, module: ModuleBase, future: Future, timeout: ScheduledTask):
+        timeout.cancel()
+        if self.__running.get(module) is not future: return    # the module was stopped meanwhile
+        del self.__running[module]
+
+        error = future.exception()
+        if error is not None:
+            self.__restart_module(module, error)
+
+    def __on_tick_timeout(self, module: ModuleBase, future: Future):
+        if self.__running.get(module) is not future: return
+        del self.__running[module]
+
+        Metrics().increment('modules.tick_timeouts')
+        self.__restart_module(module, TimeoutError(f"Tick did not finish within {self.tick_timeout}s"))
 
 
     def setup_modules(self, deviceConfig: DeviceConfig):
@@ -44,13 +126,12 @@ class ModuleManager(metaclass=SingletonMeta):
         module_configs = deviceConfig.get_all_configs()
 
         # stop modules that are not on the config
-        for existing_module in self.__modules:
+        for existing_module in list(self.__modules):
             # find a config by module id
             configExists = any(existing_module.get_config().get_id() == config.get_id() for config in module_configs)
             get_logger().debug(F"Module: {existing_module.get_config().type} with id: {existing_module.get_config().id} -> configExists: {configExists}")
             if not configExists:
-                existing_module.on_destroy()
-                self.__modules.remove(existing_module)
+                self.__stop_module(existing_module)
 
         # create new modules or patch module configs
         for config in module_configs:
@@ -60,11 +141,11 @@ class ModuleManager(metaclass=SingletonMeta):
 
             if module is not None: # update config of module
                 module.set_config(config)
+                self.__tasks[module].interval = config.get_interval()
                 # get_logger().debug(F"Module: {config.module_type} with id: {config.module_id} updates config")
 
             else: # create module
-                new_module = self.__create_module(config)
-                self.__modules.append(new_module)
+                self.__start_module(self.__create_module(config))
                 get_logger().info(f"Module: {config.type} with id: {config.id} initialized!")
 
 
@@ -86,10 +167,60 @@ class ModuleManager(metaclass=SingletonMeta):
         raise ValueError("Module type '%s' not supported" %(moduleConf.type) )
 
     def on_destroy(self):
-        for existing_module in self.__modules:
-            existing_module.on_destroy()
-            self.__modules.remove(existing_module)
+        for existing_module in list(self.__modules):
+            self.__stop_module(existing_module)
+
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=False, cancel_futures=True)
+            self.__executor = None
 
 
 if __name__ == "__main__":
-   pass
+
+    # Benchmark: latency of one round of N slow modules inline vs. on the thread pool
+    import time
+
+    class SlowModule(ModuleBase):
+        """Simulates a sensor read that blocks like the DHT or HC-SR04 modules"""
+        def __init__(self, module_config: ModuleConfig, duration: float, done: list):
+            self.module_config = module_config
+            self.duration = duration
+            self.done = done
+
+        def get_config(self) -> ModuleConfig:
+            return self.module_config
+
+        def set_config(self, module_config: ModuleConfig):
+            self.module_config = module_config
+
+        def tick(self):
+            time.sleep(self.duration)
+            self.done.append(self)
+
+        def on_destroy(self):
+            pass
+
+    def measure_round(manager: ModuleManager, count: int, duration: float) -> float:
+        done = []
+        for i in range(count):
+            config = ModuleConfig({"name": f"slow {i}", "moduleId": i + 1, "type": "SLOW", "readingInterval": 3600000,
+                                   "interface": None, "sensors": [], "controllers": []})
+            manager._ModuleManager__start_module(SlowModule(config, duration, done))
+
+        start = time.monotonic()
+        scheduler = manager.get_scheduler()
+        while len(done) < count:
+            scheduler.run_pending()
+            scheduler.wait(timeout=0.1)
+        latency = time.monotonic() - start
+
+        # let the last results be collected before the modules are stopped
+        scheduler.run_pending()
+        manager.on_destroy()
+        return latency
+
+    manager = ModuleManager()
+    for count in (1, 6, 12):
+        for mode in EXECUTION_MODES:
+            manager.execution_mode = mode
+            print(f"{count:3} modules a 0.5s {mode:6} (pool size {manager.pool_size}): {measure_round(manager, count, 0.5):.2f}s per round")
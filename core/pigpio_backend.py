@@ -0,0 +1,12 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+import pigpio
+
+from abstract_base_classes.gpio_backend import GPIOBackend
+
+class PigpioBackend(pigpio.pi, GPIOBackend):
+    """
+    The gpio of the Raspberry Pi through the pigpio daemon. All calls go straight to pigpio.pi, the
+    GPIOBackend base only marks it as a backend. Connects to the daemon on PIGPIO_ADDR and PIGPIO_PORT.
+    """
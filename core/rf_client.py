@@ -1,69 +1,26 @@
+import itertools
 import math
+import queue
 import threading
-from typing import Callable, Union
+from typing import Callable, Iterable, Union
 import pigpio
 import time
 
-BIT_SEND_TIME = 0.0001  # seconds
-BODY_SIZE     = 8      # bytes
-SEND_TIME_OUT = 30      # seconds
+from abstract_base_classes.gpio_backend import GPIOBackend
+from helper.package_check import PROTOCOL_PARITY, PackageCheck, get_package_check
+
+BIT_SEND_TIME   = 0.0001  # seconds
+BODY_SIZE       = 8       # bytes
+SEND_TIME_OUT   = 30      # seconds
+WAVE_MAX_PULSES = 2000    # pulses per wave, pigpio has room for 12000 pulses in all waves together
+CHAIN_MAX_WAVES = 5       # waves per wave_chain(), a chain is built while no other chain of the client exists
+BUSY_POLL       = 0.001   # seconds between two checks if the chain is sent
+WATCHDOG_TIME   = 20      # milliseconds without edge until the 0 bits at the end of a burst are decoded, longer than a package
 
 def print_bits(bytes):
     bit_string = bin(bytes)[2:]
     print(bit_string.replace('0', '_'))
 
-class BitBuffer:
-    def __init__(self, max_bytes:int=1):
-        self.buffer = 0                 # Store bits as an integer
-        self.bit_length = 0             # Number of valid bits
-        self.max_bits = max_bytes * 8   # Maximum bits allowed
-
-    def append(self, bit):
-        """Appends a single bit and shifts if exceeding max size."""
-        self.buffer = (self.buffer << 1) | (bit & 1)  # Append bit
-        self.bit_length += 1
-        
-        # If buffer exceeds max size, discard the oldest bits
-        if self.bit_length > self.max_bits:
-            self.buffer &= (1 << self.max_bits) - 1
-            self.bit_length = self.max_bits
-            
-    def to_bytes(self) -> bytes:
-        """Converts the buffer to a bytearray."""
-        num_bytes = (self.bit_length + 7) // 8  # Round up to full bytes
-        return self.buffer.to_bytes(num_bytes, 'big')
-    
-    def get_byte(self, index: int):
-        """Returns the byte at the given index or raises an EOFError if out of bounds."""
-        num_bytes = (self.bit_length + 7) // 8  # Total bytes in buffer
-
-        if index < 0 or index >= num_bytes:
-            raise EOFError("Byte index out of range")
-
-        shift_amount = (num_bytes - 1 - index) * 8  # Calculate shift
-        return (self.buffer >> shift_amount) & 0xFF  # Extract the byte
-    
-    def starts_with(self, prefix: bytes) -> bool:
-        """Checks if the buffer starts with the given byte sequence efficiently."""
-        prefix_bits = len(prefix) * 8
-        if self.bit_length < prefix_bits:
-            return False  # Not enough bits to compare
-
-        mask = (1 << prefix_bits) - 1  # Mask to extract only the first N bits
-        buffer_start = (self.buffer >> (self.bit_length - prefix_bits)) & mask
-        prefix_value = int.from_bytes(prefix, 'big')
-
-        return buffer_start == prefix_value
-    
-    def is_full(self) -> bool:
-        """Checks if the buffer has reached its maximum size."""
-        return self.bit_length == self.max_bits
-    
-    def print_bits(self):
-        """Prints the bits in the buffer where 0 is '_' and 1 is '#'."""
-        bit_string = bin(self.buffer)[2:].zfill(self.bit_length)  # Convert to binary string
-        print(bit_string.replace('0', '_'))
-
 class Package:
     def __init__(self,
             target_address: bytes,
@@ -71,11 +28,13 @@ class Package:
             total_packages: int,
             package_number: int,
             body: bytes,
-            parity: Union[bytes, None] = None
+            parity: Union[bytes, None] = None,
+            check: PackageCheck = get_package_check(PROTOCOL_PARITY)
         ):
         """
         This class represents a package that is sent over the serial line.
         It has attributes for target address, source address, total packages, package number, body, and parity.
+        The parity is the check value of the protocol version of check, the XOR parity byte or a CRC.
         """
         
         if len(body) < BODY_SIZE:
@@ -86,6 +45,7 @@ class Package:
         self.__total_packages   = total_packages.to_bytes(2, 'big') # two bytes
         self.__package_number   = package_number.to_bytes(2, 'big') # two bytes
         self.__body             = body                              # a lot of bytes
+        self.__check            = check
 
         if parity is not None: 
             self.__parity       = parity                            # store parity byte
@@ -93,11 +53,11 @@ class Package:
             self.__parity       = self.__calc_parity()              # or calculate it if not provided
         
     @classmethod
-    def from_bytes(cls, data: bytes) -> 'Package':
+    def from_bytes(cls, data: bytes, check: PackageCheck = get_package_check(PROTOCOL_PARITY)) -> 'Package':
         """
         Creates a Package object from a byte array.
         """
-        if len(data) < 8 + BODY_SIZE + 1:
+        if len(data) < 8 + BODY_SIZE + check.size:
             raise ValueError(f"Body cannot be created from the given data. {len(data)} bytes is too short.")
         
         return cls(
@@ -106,7 +66,8 @@ class Package:
             int.from_bytes(data[4:6], 'big'),  # total_packages
             int.from_bytes(data[6:8], 'big'),  # package_number
             data[8: 8 + BODY_SIZE],            # body
-            data[-1:]                          # parity
+            data[-check.size:],                # parity
+            check
         )
            
     def get_target_address(self):
@@ -130,6 +91,9 @@ class Package:
     def get_body(self):
         return self.__body
     
+    def get_check(self) -> PackageCheck:
+        return self.__check
+
     def is_valid(self) -> bool:
         """
         Validate the package by checking the parity.
@@ -153,85 +117,109 @@ class Package:
         
     def __calc_parity(self) -> bytes:
         """
-        Generates a parity byte from the header and the body of the Package.
-        The parity byte is computed using XOR over all bytes in the Package.
+        Generates the check value of the protocol version from the header and the body of the Package.
         """
-        package_bytes = b''.join([
+        return self.__check.compute(b''.join([
             self.__target_address,
             self.__src_address,
             self.__total_packages,
             self.__package_number,
             self.__body,
-        ])
-        parity = 0
-        for byte in package_bytes:
-            parity ^= byte  # XOR all bytes together
-        return bytes([parity])  # Return the single parity byte as a bytes object
+        ]))
 
 class PackageList:
+    """
+    The packages of a message by package number. Next to the dict a bitmap of the numbers in the list answers which
+    numbers of a message are still missing without looking at the packages.
+    """
+    NUMBER_BITMAP_BYTES = (1 << 16) // 8  # package numbers have two bytes
+
     def __init__(self):
-        self.__packages: list[Package] = []
+        self.__packages: dict[int, Package] = {}
+        self.__numbers = bytearray(self.NUMBER_BITMAP_BYTES)
 
     def add(self, package: Package):
         """add a package to the list, if the number don't exist."""
-        package_number = package.get_package_number()
-        found = [package for package in self.__packages if package.get_package_number() == package_number]
-        if len(found) <= 0:
-            self.__packages.append(package)
-        # self.__packages = list({package.get_package_number(): package for package in self.__packages}.values())
-        
+        package_number = package.get_package_number_int()
+        if package_number not in self.__packages:
+            self.__packages[package_number] = package
+            self.__numbers[package_number >> 3] |= 1 << (package_number & 7)
+
     def has(self, package_number: int) -> bool:
-        return len([package for package in self.__packages if package.get_package_number_int() == package_number]) > 0
-    
+        return package_number in self.__packages
+
     def remove(self, package_number: int):
         """remove a package from the list by package number"""
-        self.__packages = [package for package in self.__packages if package.get_package_number_int()!= package_number]
-    
+        if self.__packages.pop(package_number, None) is not None:
+            self.__numbers[package_number >> 3] &= ~(1 << (package_number & 7))
+
+    def remove_all(self, package_numbers: Iterable[int]):
+        """remove the packages with the numbers, numbers that are not in the list are skipped"""
+        for package_number in package_numbers:
+            self.remove(package_number)
+
     def concatenate(self, package_list: 'PackageList') -> 'PackageList':
         """concatenate this package list with another package list and return the result"""
         result = PackageList()
-        result.__packages = self.__packages.copy()
-        result.__packages.extend(package_list.get_packages())
+        for package in itertools.chain(self.__packages.values(), package_list.get_packages()):
+            result.add(package)
         return result
-    
+
     def get_packages(self) -> list[Package]:
-        return self.__packages
-    
+        return list(self.__packages.values())
+
     def get_length(self) -> int:
         return len(self.__packages)
-    
+
     def get_package_numbers(self) -> list[bytes]:
         """return a list of all existing package numbers"""
-        return [package.get_package_number() for package in self.__packages] # create a list of arrived packages as body
-    
+        return [package.get_package_number() for package in self.__packages.values()] # create a list of arrived packages as body
+
     def get_package_numbers_int(self) -> list[int]:
         """return a list of all existing package numbers"""
-        return [package.get_package_number_int() for package in self.__packages] # create a list of arrived packages as body
-    
+        return list(self.__packages)
+
+    def get_missing_numbers(self, total_packages: Union[int, None] = None) -> list[int]:
+        """return the numbers below total_packages that are not in the list. Default is the total packages of the message"""
+        if total_packages is None:
+            if len(self.__packages) == 0: return []
+            total_packages = next(iter(self.__packages.values())).get_total_packages_int()
+
+        numbers = self.__numbers
+        missing = []
+        for index in range((total_packages + 7) >> 3):
+            byte = numbers[index]
+            if byte == 0xFF: continue
+            for bit in range(8):
+                package_number = index << 3 | bit
+                if not (byte >> bit) & 1 and package_number < total_packages:
+                    missing.append(package_number)
+        return missing
+
     def is_valid_message(self) -> bool:
         """check if all packages have arrived and the total number of packages matches the total packages attribute of the first package"""
         
         if len(self.__packages) == 0:
             return False
         
-        first_package = self.__packages[0]
+        first_package = next(iter(self.__packages.values()))
         if len(self.__packages) != first_package.get_total_packages_int():
             return False
         
         # Check if all packages have the same target address
-        src_addresses = [package.get_src_address() for package in self.__packages]
-        if len(set(src_addresses))!= 1:
+        src_addresses = {package.get_src_address() for package in self.__packages.values()}
+        if len(src_addresses) != 1:
             return False
         
         # Check if all packages have the same total_number
-        total_packages = [package.get_total_packages() for package in self.__packages]
-        if len(set(total_packages))!= 1:
+        total_packages = {package.get_total_packages() for package in self.__packages.values()}
+        if len(total_packages) != 1:
             return False
         
         return True
     
     @classmethod
-    def from_message( cls, target_address: bytes, src_address: bytes, message: bytes, fill_byte= b'\x00' ) -> 'PackageList':
+    def from_message( cls, target_address: bytes, src_address: bytes, message: bytes, fill_byte= b'\x00', check: PackageCheck = get_package_check(PROTOCOL_PARITY) ) -> 'PackageList':
         package_list: PackageList = cls()
 
         total_message_length = len(message)
@@ -248,7 +236,8 @@ class PackageList:
                 src_address,
                 total_packages,
                 package_number,
-                message[body_start : body_end].ljust(BODY_SIZE, fill_byte)  # get the body of the package
+                message[body_start : body_end].ljust(BODY_SIZE, fill_byte),  # get the body of the package
+                check=check
             )
                         
             package_list.add(package)
@@ -258,38 +247,285 @@ class PackageList:
     def to_message(self) -> bytes:
         """Accepts a array of packages. Returns a Message if all packages have arrived"""
         
-        # Construct the message by concatenating all package bodies in the order of his numbers
-        self.__sort()
-        return b''.join([p.get_body() for p in self.__packages])
-        
-    def __sort(self) -> None:
-        self.__packages = sorted(self.__packages, key=lambda package: package.get_package_number_int())
+        # the bodies are written in the order of the package numbers into the message. Without gaps in the numbers
+        # the number is the position, else the numbers are sorted
+        total_packages = len(self.__packages)
+        if self.get_missing_numbers(total_packages):
+            package_numbers = sorted(self.__packages)
+        else:
+            package_numbers = range(total_packages)
+
+        message = bytearray(total_packages * BODY_SIZE)
+        position = 0
+        for package_number in package_numbers:
+            body = self.__packages[package_number].get_body()
+            message[position : position + len(body)] = body
+            position += len(body)
+        del message[position:]
+        return bytes(message)
         
     def to_bytes(self) -> bytes:
         """
         Serialize the PackageList into a byte array.
         """
-        return b''.join([package.to_bytes() for package in self.__packages])
+        return b''.join([package.to_bytes() for package in self.__packages.values()])
+
+class WaveTransmitter:
+    """
+    Sends packages with the DMA waveforms of pigpio, so the bit timing does not depend on how long sleep()
+    and the write to the daemon take on the host. The bits are encoded like the receiver reads them: a 1 toggles
+    the level of the line, a 0 keeps it, every bit is BIT_SEND_TIME long. Bits with the same level become one pulse.
+    Long messages are cut into waves at package boundaries and the waves are sent by wave_chain() without gap.
+    Between two chains the line keeps its level, the receiver only sees some 0 bits between two packages.
+    """
+    BIT_MICROS = round(BIT_SEND_TIME * 1000000)
+
+    def __init__(self, pi: GPIOBackend, gpio: int):
+        self.__pi: GPIOBackend = pi
+        self.__gpio: int = gpio
+        self.__level: int = 0   # level of the line after the last sent bit
+
+    def send(self, package_list: PackageList):
+        """Sends all packages of the list and returns when the last bit is on the line"""
+        waves, level = self.__compile(package_list.get_packages(), self.__level)
+        for first in range(0, len(waves), CHAIN_MAX_WAVES):
+            chain = waves[first : first + CHAIN_MAX_WAVES]
+            wave_ids: list[int] = []
+            try:
+                for pulses, _ in chain:
+                    self.__pi.wave_add_generic(pulses)
+                    wave_ids.append(self.__pi.wave_create())
+                self.__pi.wave_chain(wave_ids)
+                time.sleep(sum(micros for _, micros in chain) / 1000000)
+                while self.__pi.wave_tx_busy():
+                    time.sleep(BUSY_POLL)
+            finally:
+                for wave_id in wave_ids:
+                    self.__pi.wave_delete(wave_id)
+        self.__level = level
+
+    def __compile(self, packages: list[Package], level: int) -> tuple[list[tuple[list, int]], int]:
+        """Returns the waves as (pulses, microseconds) and the level of the line after the last bit"""
+        mask = 1 << self.__gpio
+        waves: list[tuple[list, int]] = []
+        wave: list = []
+        for package in packages:
+            pulses = []
+            bits = 0                # bits with the current level
+            for byte in package.to_bytes():
+                for i in range(7, -1, -1):
+                    if (byte >> i) & 1:
+                        if bits > 0:
+                            pulses.append(self.__pulse(mask, level, bits))
+                        level ^= 1  # alternate bit
+                        bits = 0
+                    bits += 1
+            pulses.append(self.__pulse(mask, level, bits))
+
+            if len(wave) + len(pulses) > WAVE_MAX_PULSES:
+                waves.append((wave, sum(pulse.delay for pulse in wave)))
+                wave = []
+            wave.extend(pulses)
+        if wave:
+            waves.append((wave, sum(pulse.delay for pulse in wave)))
+        return waves, level
+
+    def __pulse(self, mask: int, level: int, bits: int) -> pigpio.pulse:
+        if level: return pigpio.pulse(mask, 0, bits * self.BIT_MICROS)
+        return pigpio.pulse(0, mask, bits * self.BIT_MICROS)
+
+def _zero_fold_steps() -> bytes:
+    """
+    Shifting a bit into the window rotates the XOR of its bytes left by one and XORs the low bit with the new bit
+    and the bit that leaves the window. After the 8 bits of a byte the fold is fold ^ d with d = new byte ^ leaving
+    byte, after j bits it is rotl(fold, j) ^ (d >> 8 - j). The table has a bit j - 1 set for every j where that is 0.
+    Index is fold << 8 | d.
+    """
+    table = bytearray(1 << 16)
+    for j in range(1, 9):
+        for fold in range(256):
+            rotated = ((fold << j) | (fold >> (8 - j))) & 0xFF
+            if rotated >> j: continue
+            for low in range(1 << (8 - j)):
+                table[fold << 8 | rotated << (8 - j) | low] |= 1 << (j - 1)
+    return bytes(table)
+
+class PackageDecoder:
+    """
+    Finds packages in a bit stream with a ring of the last bytes as wide as one package. The XOR of all bytes of the
+    window is kept up to date byte by byte. A table tells after which bits of a byte it is 0, that is where the parity
+    byte matches the bytes before it. Only there the window is built and compared with the address of the device.
+    Before the first bit the ring holds 0 bits like an idle line. Bits that do not fill a byte yet are decoded with
+    the next bits.
+    Other checks than the parity do not fold, they keep a register per bit position in the byte that slides over the
+    window with the table of the check. The windows are built where a register shows a valid check value.
+    """
+    ZERO_FOLD_STEPS = _zero_fold_steps()
+
+    def __init__(self, device_address: bytes, package_bytes: int, check: PackageCheck = get_package_check(PROTOCOL_PARITY)):
+        self.width = package_bytes * 8
+        self.__check = check
+        self.__ring = bytearray(package_bytes)
+        self.__position = 0   # index of the oldest byte, it leaves the window with the next byte
+        self.__fold = 0       # XOR of the bytes of the ring
+        self.__bits = 0       # bits since the last package before the next byte, a package needs a full window of new bits
+        self.__pending = 0    # bits that do not fill a byte yet
+        self.__pending_count = 0
+        self.__address = int.from_bytes(device_address, 'big')
+        self.__address_shift = self.width - len(device_address) * 8
+
+        if check.name != PROTOCOL_PARITY:
+            self.__device_address = device_address
+            self.__leaving, self.__valid = check.window_tables(package_bytes)
+            self.__byte_ring = bytearray(self.width)    # the byte that ends with the bit, for every bit of the window
+            self.__bit_position = 0
+            self.__registers = [0] * 8
+            self.__last_byte = 0
+
+    def append_bits(self, bits: int, count: int) -> list[Package]:
+        """Shifts in the lowest count bits of bits, the highest first. Returns the packages that ended in them"""
+        if self.__check.name != PROTOCOL_PARITY:
+            return self.__append_bits_rolling(bits, count)
+
+        pending = (self.__pending << count) | (bits & ((1 << count) - 1))
+        pending_count = self.__pending_count + count
+        packages = []
+        if pending_count >= 8:
+            ring, position, fold, bits_since = self.__ring, self.__position, self.__fold, self.__bits
+            zero_fold_steps, size = self.ZERO_FOLD_STEPS, len(ring)
+            while pending_count >= 8:
+                pending_count -= 8
+                byte = (pending >> pending_count) & 0xFF
+                d = byte ^ ring[position]
+                steps = zero_fold_steps[fold << 8 | d]
+                if steps:
+                    bits_since = self.__match(steps, ring, position, byte, bits_since, packages)
+                fold ^= d
+                ring[position] = byte
+                position += 1
+                if position == size: position = 0
+                bits_since += 8
+            pending &= (1 << pending_count) - 1
+            self.__position, self.__fold, self.__bits = position, fold, bits_since
+        self.__pending, self.__pending_count = pending, pending_count
+        return packages
+
+    def __match(self, steps: int, ring: bytearray, position: int, byte: int, bits_since: int, packages: list[Package]) -> int:
+        """Builds the windows that end after the steps of byte, adds the packages and returns the new bits_since"""
+        stream = int.from_bytes(ring[position:] + ring[:position] + bytes([byte]), 'big')
+        for j in range(1, 9):
+            if not (steps >> (j - 1)) & 1 or bits_since + j < self.width: continue
+            window = (stream >> (8 - j)) & ((1 << self.width) - 1)
+            if window >> self.__address_shift != self.__address: continue
+            packages.append(Package.from_bytes(window.to_bytes(self.width // 8, 'big')))
+            bits_since = -j
+        return bits_since
+
+    def __append_bits_rolling(self, bits: int, count: int) -> list[Package]:
+        packages = []
+        check, width = self.__check, self.width
+        table, leaving, valid = check.table, self.__leaving, self.__valid
+        shift, mask = check.size * 8 - 8, (1 << check.size * 8) - 1
+        ring, registers = self.__byte_ring, self.__registers
+        position, last_byte, bits_since = self.__bit_position, self.__last_byte, self.__bits
+        for i in range(count - 1, -1, -1):
+            last_byte = ((last_byte << 1) | ((bits >> i) & 1)) & 0xFF
+            # the byte that ended a window ago on this bit position leaves the window
+            register = registers[position & 7]
+            register = ((register << 8) & mask) ^ table[(register >> shift) ^ last_byte] ^ leaving[ring[position]]
+            registers[position & 7] = register
+            ring[position] = last_byte
+            position += 1
+            if position == width: position = 0
+            bits_since += 1
+            if register == valid and bits_since >= width:
+                window = bytes(ring[(position - 1 - byte * 8) % width] for byte in range(width // 8 - 1, -1, -1))
+                if window.startswith(self.__device_address):
+                    packages.append(Package.from_bytes(window, check))
+                    bits_since = 0
+        self.__bit_position, self.__last_byte, self.__bits = position, last_byte, bits_since
+        return packages
+
+class EdgeReceiver:
+    """
+    Reads packages from the ticks of the edges on the read gpio instead of sampling the level every bit time.
+    Every edge is a 1 bit, every further BIT_SEND_TIME until the next edge a 0 bit, so the bits stay in sync with
+    the sender for as long as its clock is exact. The watchdog of the gpio decodes the 0 bits at the end of a burst.
+    It is only armed while edges arrive, an idle channel does not wake up any thread.
+    Packages with the device address and a valid check value are put into the queue packages.
+    """
+    def __init__(self, pi: GPIOBackend, gpio: int, device_address: bytes, check: PackageCheck = get_package_check(PROTOCOL_PARITY)):
+        self.packages: queue.Queue[Package] = queue.Queue()
+
+        self.__pi: GPIOBackend = pi
+        self.__gpio: int = gpio
+        self.__decoder = PackageDecoder(device_address, RFClient.HEADER_BYTES + BODY_SIZE + check.size, check)
+        self.__last_tick: int = 0
+        self.__idle: bool = True  # the line did not change for longer than the watchdog, as if only 0 bits arrived
+
+        self.__callback = pi.callback(gpio, pigpio.EITHER_EDGE, self.on_edge)
+
+    def on_edge(self, gpio: int, level: int, tick: int):
+        """Callback of the gpio, level is pigpio.TIMEOUT when the watchdog fired"""
+        if level == pigpio.TIMEOUT:
+            if self.__idle: return
+            self.__append(self.__bit_times(tick) - 1, edge=False)
+            self.__pi.set_watchdog(self.__gpio, 0)
+            self.__idle = True
+            return
+
+        if self.__idle:
+            self.__pi.set_watchdog(self.__gpio, WATCHDOG_TIME)
+            self.__idle = False
+            zeros = self.__decoder.width
+        else:
+            zeros = self.__bit_times(tick) - 1
+        self.__last_tick = tick
+        self.__append(zeros, edge=True)
+
+    def clear(self):
+        """Drops the packages nobody has taken from the queue yet"""
+        while True:
+            try:
+                self.packages.get_nowait()
+            except queue.Empty:
+                return
+
+    def cancel(self):
+        self.__callback.cancel()
+        self.__pi.set_watchdog(self.__gpio, 0)
+
+    def __bit_times(self, tick: int) -> int:
+        """Bit times since the last edge"""
+        return round(pigpio.tickDiff(self.__last_tick, tick) / WaveTransmitter.BIT_MICROS)
+
+    def __append(self, zeros: int, edge: bool):
+        """Decodes the 0 bits since the last edge and the 1 bit of the edge"""
+        zeros = min(zeros, self.__decoder.width)
+        for package in self.__decoder.append_bits(1 if edge else 0, zeros + 1 if edge else zeros):
+            self.packages.put(package)
 
 class RFClient:
     HEADER_BYTES = 8  # target address, source address, total packages, package number
-    PARITY_BYTES = 1  # parity hash 1 byte on the end of each package
     SILENCE_TIME = BIT_SEND_TIME * 2000 # the silence time between between messages is 2000 times the BIT_SEND_TIME
 
-    def __init__(self, pi: pigpio.pi, send_gpio: int, read_gpio: int, device_address: bytes):
+    def __init__(self, pi: GPIOBackend, send_gpio: int, read_gpio: int, device_address: bytes, protocol_version: str = PROTOCOL_PARITY):
         """
-        - pi: a pigpio.pi object
+        - pi: the GPIOBackend of IO().get_gpio()
         - the send_gpio can be the same as the read_gpio
         - the device_address has two bytes
+        - the protocol_version is the check value on the end of each package, see helper.package_check.
+          Sender and receiver have to use the same, 'parity' is the one byte XOR of the first clients
         """
-        self.__pi: pigpio.pi = pi
+        self.__pi: GPIOBackend = pi
         
         self.__read_gpio: int = read_gpio
         self.__send_gpio: int = send_gpio
         self.__device_address: bytes = device_address
+        self.__check: PackageCheck = get_package_check(protocol_version)
         
-        self.__last_bit_send = 0
-        self.__last_bit_read = 0
+        self.__transmitter = WaveTransmitter(pi, send_gpio)
+        self.__receiver = EdgeReceiver(pi, read_gpio, device_address, self.__check)
         
         # Callback gets the message as bytes and the number if lost_packages
         self.__subscribers: list[Callable[[bytes, int],None]] = []
@@ -314,7 +550,8 @@ class RFClient:
         package_list: PackageList = PackageList.from_message(
             target_address, 
             self.__device_address, 
-            message
+            message,
+            check=self.__check
         )
         
         lost_packages = 0
@@ -324,9 +561,8 @@ class RFClient:
         # repeat sending until all packages arrive the target
         while package_list.get_length() > 0:
             self.__activate_writing_mode()
-                        
-            for package in package_list.get_packages():
-                self.__send_package(package)
+            self.__receiver.clear()
+            self.__transmitter.send(package_list)
             
             # this starts the listening loop that runs until no package arrives for a given time (timeout)
             
@@ -348,19 +584,22 @@ class RFClient:
                 # divide the body to chunks of 2 bytes because package numbers are 2 bytes long
                 successful_numbers: list[int] = [int.from_bytes(byte_pair, 'big') for byte_pair in zip(response_body[::2], response_body[1::2])]
                 
-                current_numbers = package_list.get_package_numbers_int()
-                successful_numbers: list[int] = [number for number in successful_numbers if number != 0xFFFF and number in current_numbers]
+                successful_numbers = {number for number in successful_numbers if number != 0xFFFF and package_list.has(number)}
                 
                 lost_packages += package_list.get_length() - len(successful_numbers)
                                 
                 # remove successful packages from the list to send
-                {package_list.remove(package_number) for package_number in successful_numbers}
+                package_list.remove_all(successful_numbers)
                             
             if time.time() - start_time > SEND_TIME_OUT: return None
             
         self.__start_listening()
         return lost_packages
 
+    def on_destroy(self):
+        self.__stop_listening()
+        self.__receiver.cancel()
+
     def __start_listening(self):
         self.thread = threading.Thread(name='rf_client_loop', target=self.__read_bit_stream, daemon=False)
         self.thread.start()
@@ -398,15 +637,15 @@ class RFClient:
                     target_address  = packages.get_packages()[0].get_src_address(),
                     src_address     = self.__device_address,
                     message         = b"".join(packages.get_package_numbers()),
-                    fill_byte=b'\xFF'  # fill rest of the package with 255
+                    fill_byte=b'\xFF',  # fill rest of the package with 255
+                    check=self.__check
                 )
                 
                 # if more packages are expected
                 if not packages.is_valid_message():
                     
                     # receiver sends response packages
-                    for package in response.get_packages():
-                        self.__send_package(package)
+                    self.__transmitter.send(response)
                     time.sleep(self.SILENCE_TIME) # wait for sender to detect silence
 
                 # else message is ready
@@ -414,8 +653,7 @@ class RFClient:
                     
                     # receiver sends response packages multiple times to make sure the sender stops sending
                     for _ in range(3):  # repeat
-                        for package in response.get_packages():
-                            self.__send_package(package)
+                        self.__transmitter.send(response)
                     
                     # built message and send it to the subscribers
                     message = packages.to_message()
@@ -429,196 +667,242 @@ class RFClient:
                     lost_packages = 0
 
     def __wait_for_next_package(self, timeout: float) -> Union[Package, None]:
-        """Read the stream until a package with this address of the device is on the bit_buffer or timeout is exceeded ."""        
-        timeout_counter = int(timeout / BIT_SEND_TIME)
-        
-        bit_buffer = BitBuffer(BODY_SIZE + self.HEADER_BYTES + self.PARITY_BYTES)
-        self.listening = True
-        while self.listening:
-            bit = self.__read_bit()
-            bit_buffer.append(bit)
+        """Waits until the receiver decoded a package with the address of this device or timeout is exceeded."""
+        try:
+            return self.__receiver.packages.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+
+if __name__ == "__main__":
+
+    # 1. Replays edge traces through the EdgeReceiver. The trace of a message sent by the WaveTransmitter is
+    #    recorded on the simulated gpio and played back on the read gpio unchanged, with jitter, with a lost edge
+    #    and with the bit time of the old write/sleep sender.
+    # 2. CPU of a listening RFClient on an idle channel compared to the old receiver that polled every bit time.
+    # 3. Sends a long message with the old sender (write and sleep per bit) and with the WaveTransmitter.
+    #    Measures the achieved bits/s, the packages the EdgeReceiver lost by timing errors and the CPU of the sender.
+    # 4. Bits/s the BitBuffer search of the old receiver and the PackageDecoder decode on this CPU, on a stream of
+    #    random bits with the packages of a message in between.
+    # 5. Time of the PackageList operations of a transfer for messages with 1k and 64k packages: split the message,
+    #    add the packages in random order on the receiver, ask for the missing numbers, remove the acknowledged
+    #    numbers on the sender and reassemble the message.
+    # Runs on the simulated gpio.
+    import os
+    import random
+    from core.io import IO
+
+    TX_GPIO = 5
+    RX_GPIO = 6
+    ROUNDS = 3
+    IDLE_TIME = 2       # seconds
+    TARGET_ADDRESS = int.to_bytes(1234, 2, 'big')
+    SRC_ADDRESS = int.to_bytes(5678, 2, 'big')
+    MESSAGE = ("Lorem ipsum dolor sit amet, consetetur sadipscing elitr, sed diam nonumy eirmod tempor invidunt ut labore "
+               "et dolore magna aliquyam erat, sed diam voluptua. At vero eos et accusam et justo duo dolores et ea rebum. "
+               "Stet clita kasd gubergren, no sea takimata sanctus est Lorem ipsum dolor sit amet.").encode()
+    PACKAGE_BYTES = RFClient.HEADER_BYTES + BODY_SIZE + get_package_check(PROTOCOL_PARITY).size
+
+    os.environ['GPIO_BACKEND'] = 'simulated'
+    pi = IO().get_gpio()
+    pi.set_mode(TX_GPIO, pigpio.OUTPUT)
+    pi.write(TX_GPIO, 0)
+
+    def receive(receiver: EdgeReceiver, timeout: float) -> set[int]:
+        numbers = set()
+        try:
+            while True:
+                numbers.add(receiver.packages.get(timeout=timeout).get_package_number_int())
+        except queue.Empty:
+            return numbers
+
+    # 1. replay
+
+    trace: list[tuple[int, int]] = []
+    recorder = pi.callback(TX_GPIO, pigpio.EITHER_EDGE, lambda gpio, level, tick: trace.append((level, tick)))
+    WaveTransmitter(pi, TX_GPIO).send(PackageList.from_message(TARGET_ADDRESS, SRC_ADDRESS, b"Hallo Welt! Replay"))
+    time.sleep(0.05)
+    recorder.cancel()
+    pi.write(TX_GPIO, 0)
+    # (level, microseconds) until the next edge
+    recorded = [(level, pigpio.tickDiff(tick, next_tick)) for (level, tick), (_, next_tick) in zip(trace, trace[1:] + [trace[-1]])]
+
+    def jitter(pulses, micros):
+        edges = list(itertools.accumulate(duration for _, duration in pulses))
+        edges = [edge + random.randint(-micros, micros) for edge in edges[:-1]] + edges[-1:]
+        return [(level, end - start) for (level, _), start, end in zip(pulses, [0] + edges, edges)]
+
+    def lose_edge(pulses, index):
+        merged = pulses[:index - 1] + [(pulses[index - 1][0], pulses[index - 1][1] + pulses[index][1])]
+        return merged + [(level ^ 1, duration) for level, duration in pulses[index + 1:]]
+
+    lost_edge = len(recorded) // 2
+    lost_package = sum(duration for _, duration in recorded[:lost_edge]) // (PACKAGE_BYTES * 8 * WaveTransmitter.BIT_MICROS)
+    cases = (
+        ("recorded", recorded, {0, 1, 2}),
+        ("jitter +-20us", jitter(recorded, 20), {0, 1, 2}),
+        ("edge lost", lose_edge(recorded, lost_edge), {0, 1, 2} - {lost_package}),
+        ("old bit time", [(level, round(duration * 1.65)) for level, duration in recorded], set()),
+    )
+    failed = False
+    for name, pulses, expected in cases:
+        receiver = EdgeReceiver(pi, RX_GPIO, TARGET_ADDRESS)
+        pi.play(RX_GPIO, pulses)
+        received = receive(receiver, sum(duration for _, duration in pulses) / 1000000 + 0.05)
+        receiver.cancel()
+        pi.play(RX_GPIO, [(0, 0)])
+        time.sleep(WATCHDOG_TIME / 1000 * 2)
+        failed |= received != expected
+        print(f"replay {name:14} {len(pulses):4} edges, packages {sorted(received)}, expected {sorted(expected)}: "
+              f"{'ok' if received == expected else 'FAILED'}")
+
+    # 2. idle channel
+
+    def poll_receiver(stop: threading.Event, cpu: list[float]):
+        """The receiver of RFClient before the EdgeReceiver"""
+        while not stop.is_set():
+            pi.read(RX_GPIO)
             time.sleep(BIT_SEND_TIME)
-            
-            if timeout_counter <= 0:
-                return None  # timeout reached, stop listening and return None
-            timeout_counter -= 1
-            
-            if bit_buffer.is_full() and bit_buffer.starts_with(self.__device_address):
+        cpu.append(time.thread_time())
+
+    stop, cpu = threading.Event(), []
+    poller = threading.Thread(target=poll_receiver, args=(stop, cpu))
+    poller.start()
+    time.sleep(IDLE_TIME)
+    stop.set()
+    poller.join()
+    print(f"idle channel: polling receiver {cpu[0] / IDLE_TIME * 100:5.1f}% CPU", end=', ')
+
+    client = RFClient(pi, RX_GPIO, RX_GPIO, TARGET_ADDRESS)
+    cpu_start = time.process_time()
+    time.sleep(IDLE_TIME)
+    print(f"listening RFClient {(time.process_time() - cpu_start) / IDLE_TIME * 100:5.1f}% CPU of the process")
+    client.on_destroy()
+
+    # 3. sender
+
+    def bit_bang(package_list: PackageList):
+        """The sender of RFClient before the WaveTransmitter"""
+        last_bit_send = 0
+        for package in package_list.get_packages():
+            for byte in package.to_bytes():
+                for i in range(7, -1, -1):
+                    if (byte >> i) & 1:
+                        last_bit_send ^= 1
+                    pi.write(TX_GPIO, last_bit_send)
+                    time.sleep(BIT_SEND_TIME)
+
+    package_list = PackageList.from_message(TARGET_ADDRESS, SRC_ADDRESS, MESSAGE)
+    bits = package_list.get_length() * PACKAGE_BYTES * 8
+    print(f"{package_list.get_length()} packages, {bits} bits, nominal {1 / BIT_SEND_TIME:.0f} bits/s")
+
+    for name, send in (("write/sleep", bit_bang), ("waveform", WaveTransmitter(pi, TX_GPIO).send)):
+        for _ in range(ROUNDS):
+            receiver = EdgeReceiver(pi, TX_GPIO, TARGET_ADDRESS)
+            start, cpu_start = time.monotonic(), time.thread_time()
+            send(package_list)
+            duration, cpu = time.monotonic() - start, time.thread_time() - cpu_start
+            lost = package_list.get_length() - len(receive(receiver, 0.05))
+            receiver.cancel()
+            print(f"{name:12} {bits / duration:7.0f} bits/s, {lost / package_list.get_length() * 100:5.1f}% packages lost, "
+                  f"{cpu / duration * 100:5.1f}% CPU")
+    pi.stop()
+
+    # 4. decoder throughput
+
+    random.seed(1)
+    stream: list[int] = []
+    for package in package_list.get_packages():
+        stream.extend(random.getrandbits(1) for _ in range(random.randrange(200)))
+        stream.extend((byte >> i) & 1 for byte in package.to_bytes() for i in range(7, -1, -1))
+
+    class BitBuffer:
+        """The bit buffer of RFClient before the PackageDecoder, the last max_bytes bits as an integer"""
+        def __init__(self, max_bytes: int):
+            self.buffer = 0
+            self.bit_length = 0
+            self.max_bits = max_bytes * 8
+
+        def append(self, bit):
+            self.buffer = (self.buffer << 1) | (bit & 1)
+            self.bit_length += 1
+            if self.bit_length > self.max_bits:
+                self.buffer &= (1 << self.max_bits) - 1
+                self.bit_length = self.max_bits
+
+        def to_bytes(self) -> bytes:
+            return self.buffer.to_bytes((self.bit_length + 7) // 8, 'big')
+
+        def starts_with(self, prefix: bytes) -> bool:
+            prefix_bits = len(prefix) * 8
+            if self.bit_length < prefix_bits:
+                return False
+            return self.buffer >> (self.bit_length - prefix_bits) == int.from_bytes(prefix, 'big')
+
+        def is_full(self) -> bool:
+            return self.bit_length == self.max_bits
+
+    def bit_buffer_search(stream: list[int]) -> int:
+        """The search of RFClient before the PackageDecoder"""
+        found = 0
+        bit_buffer = BitBuffer(PACKAGE_BYTES)
+        for bit in stream:
+            bit_buffer.append(bit)
+            if bit_buffer.is_full() and bit_buffer.starts_with(TARGET_ADDRESS):
                 package = Package.from_bytes(bit_buffer.to_bytes())
                 if package.is_valid():
-                    return package
-        return None
-
-    def __read_bit(self) -> int:
-        bit = self.__pi.read(self.__read_gpio)
-        if self.__last_bit_read != bit:
-            self.__last_bit_read = bit
-            return 1
-        else:
-            return 0
-
-    def __send_package(self, package: Package):
-        for byte in package.to_bytes():
-            for i in range(7, -1, -1):  # Restliche Bits
-                bit = (byte >> i) & 1
-                if bit == 1:  # Nur wenn Änderung
-                    self.__last_bit_send = self.__last_bit_send ^ 1 # alternate bit
-                self.__pi.write(self.__send_gpio, self.__last_bit_send)
-                time.sleep(BIT_SEND_TIME)
-
-
-# import json
-
-# HEADER_BYTES = 8  # target address, source address, total packages, package number
-# PARITY_BYTES = 1  # parity hash 1 byte on the end of each package
-# BIT_TIME = 5
-
-# # Initialize pigpio
-# pi = pigpio.pi()
-# if not pi.connected:
-#     exit()
-
-
-# RX_GPIO = 13  # Receiving GPIO
-
-# received_data = PackageList()
-# bit_buffer = BitBuffer(BODY_SIZE + HEADER_BYTES + PARITY_BYTES)
-# last_tick = (time.time_ns() // 1000)
-# message_counter = 0
-
-# message_as_bytes = "Hallo Welt!".encode()
-
-# message_as_bytes = "Lorem ipsum dolor sit amet, consetetur sadipscing elitr, sed diam nonumy eirmod tempor invidunt ut labore et dolore magna aliquyam erat, sed diam voluptua. At vero eos et accusam et justo duo dolores et ea rebum. Stet clita kasd gubergren, no sea takimata sanctus est Lorem ipsum dolor sit amet. Lorem ipsum dolor sit amet, consetetur sadipscing elitr, sed diam nonumy eirmod tempor invidunt ut labore et dolore magna aliquyam erat".encode()
-
-# # Example bytes object to send
-# package_list = PackageList.from_message(int.to_bytes(1234, 2, 'big'), int.to_bytes(5678, 2, 'big'), message_as_bytes)
-# print(f'Message length: {package_list.get_length()}')
-# data = package_list.to_bytes()
-
-# def rx_callback(gpio, level, tick):
-#     global last_tick, bit_buffer, received_data, data, message_counter
-#     dif = tick - last_tick
-#     last_tick = tick
-#     for _ in range(min(dif // BIT_TIME, bit_buffer.max_bits)):
-#         bit_buffer.append(level^1)
-#         if bit_buffer.is_full() and bit_buffer.starts_with(int.to_bytes(1234, 2, 'big')):
-#             package = Package.from_bytes(bit_buffer.to_bytes())
-#             if package.is_valid():
-#                 received_data.add(package)
-#                 bit_buffer = BitBuffer(BODY_SIZE + HEADER_BYTES + PARITY_BYTES)
-#                 if received_data.is_valid_message():
-#                     message_counter += 1
-#                     print(f'Received message {message_counter}: {received_data.to_message().decode()}')
-#                     received_data = PackageList()
-
-
-# pi.set_mode(RX_GPIO, pigpio.INPUT)
-# pi.callback(RX_GPIO, pigpio.EITHER_EDGE, rx_callback)
-
-# TX_GPIO = 5  # Sending GPIO
-
-# # Ensure the TX GPIO is set as OUTPUT
-# pi.set_mode(TX_GPIO, pigpio.OUTPUT)
-
-# # Convert bytes to waveform
-# last_bit_send = 0
-# wave = []
-# for byte in data:
-#     for i in range(8):
-#         bit = (byte >> (7 - i)) & 1  # Extract each bit
-#         if bit:
-#             wave.append(pigpio.pulse(1 << TX_GPIO, 0, BIT_TIME))  # HIGH
-#         else:
-#             wave.append(pigpio.pulse(0, 1 << TX_GPIO, BIT_TIME))  # LOW
-        
-# # wave.append(pigpio.pulse(0, 1 << TX_GPIO, 100000)) # LOW
-
-# # Send the waveform
-# pi.wave_clear()
-# pi.wave_add_generic(wave)
-# wave_id = pi.wave_create()
-
-# # Transmit the waveform
-# # for _ in range(100):  # repeat
-# pi.wave_send_repeat(wave_id)
-
-# # Wait for completion
-# while pi.wave_tx_busy():
-#     time.sleep(0.001)
-
-# # Clean up
-# pi.wave_delete(wave_id)
-
-# pi.stop()
-
-# exit()
-
-
-
-# # Beispielverwendung:
-# # if __name__ == "__main__":
-
-from core.io import IO
-import json
-
-# message subscriber
-client1 = RFClient(IO().get_pigpio(), 5, 5, int.to_bytes(5678, 2, 'big'))
-client1.on_message(lambda payload, lost_packages: print(f"Receiver1 detects lost_packages: {lost_packages}. Message: {payload.decode('utf-8')}"))
-
-# client2 = RFClient(IO().get_pigpio(), 13, 13, int.to_bytes(1234, 2, 'big'))
-# client2.on_message(lambda payload, lost_packages: print(f"Receiver2 detects lost_packages: {lost_packages}. Message: {payload.decode('utf-8')}"))
-
-counter = 0
-
-time.sleep(0.5)
-
-while True:
-    
-    start_time = time.time()
-    
-    lost_packages1 = client1.send_message(int.to_bytes(1234, 2, 'big'), f'{counter}. Hallo!'.encode('utf-8'))
-    print(f"sender1 lost_packages: {lost_packages1}")
-    
-    # lost_packages2 = client2.send_message(
-    #     int.to_bytes(5678, 2, 'big'),
-    #     json.dumps([
-    #         {
-    #         "name": "John",
-    #         "age": 10,
-    #         "address": {
-    #                 "street": "Main Street",
-    #                 "number": 123,
-    #                 "zip_code": "12345",
-    #                 "country": "USA"
-    #             }
-    #         },
-    #         {
-    #         "name": "Wick",
-    #         "age": 20,
-    #         "address": {
-    #                 "street": "Broadway",
-    #                 "number": 456,
-    #                 "zip_code": "67890",
-    #                 "country": "Germany"
-    #             }
-    #         },
-    #         {
-    #         "name": "Max",
-    #         "age": 30,
-    #         "address": {
-    #                 "street": "Hauptstraße",
-    #                 "number": 789,
-    #                 "zip_code": "23456",
-    #                 "country": "Austria"
-    #             }
-    #         },
-    #     ]).encode()
-    # )
-    # print(f"sender2 lost_packages: {lost_packages2}")
-
-    print(f"send duration: {time.time() - start_time}")
-    counter += 1
-    
-    time.sleep(0.5)
-
-exit()
\ No newline at end of file
+                    found += 1
+                    bit_buffer = BitBuffer(PACKAGE_BYTES)
+        return found
+
+    # the EdgeReceiver passes the 0 bits since the last edge and the 1 of the edge at once, the watchdog the 0 bits
+    # at the end of the stream
+    edges: list[tuple[int, int]] = [(1, len(zeros) + 1) for zeros in bytes(stream).split(b'\x01')]
+    edges[-1] = (0, edges[-1][1] - 1 + PACKAGE_BYTES * 8)
+
+    def package_decoder(edges: list[tuple[int, int]]) -> int:
+        decoder = PackageDecoder(TARGET_ADDRESS, PACKAGE_BYTES)
+        return sum(len(decoder.append_bits(bits, count)) for bits, count in edges)
+
+    for name, decode, bits in (("BitBuffer", bit_buffer_search, stream), ("PackageDecoder", package_decoder, edges)):
+        start = time.perf_counter()
+        for _ in range(ROUNDS):
+            found = decode(bits)
+        duration = (time.perf_counter() - start) / ROUNDS
+        print(f"{name:14} {len(stream) / duration:9.0f} bits/s decoded, {found} of {package_list.get_length()} packages found")
+
+    # 5. PackageList
+
+    for total_packages in (1000, 65535):
+        message = random.randbytes(total_packages * BODY_SIZE)
+        times: dict[str, float] = {}
+
+        start = time.perf_counter()
+        sent = PackageList.from_message(TARGET_ADDRESS, SRC_ADDRESS, message)
+        times['split'] = time.perf_counter() - start
+
+        packages = sent.get_packages()
+        random.shuffle(packages)
+        received = PackageList()
+        start = time.perf_counter()
+        for package in packages:
+            received.add(package)
+        times['add'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        missing = received.get_missing_numbers()
+        times['missing'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        sent.remove_all(received.get_package_numbers_int())
+        times['acknowledge'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        reassembled = received.to_message()
+        times['reassemble'] = time.perf_counter() - start
+
+        assert reassembled == message and not missing and sent.get_length() == 0
+        print(f"PackageList {total_packages:5} packages: " + ", ".join(f"{name} {duration * 1000:7.2f} ms" for name, duration in times.items()))
+
+    if failed: exit(1)
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+import heapq
+import itertools
+import math
+import os
+import threading
+import time
+from typing import Callable, List, Tuple, Union
+
+from core.logger import get_logger
+from core.metrics import Metrics
+
+MISSED_POLICIES = ('skip', 'catch_up', 'reset')
+DEFAULT_MISSED_POLICY = 'skip'  # drop missed runs of a periodic task and stay on its interval grid
+
+class ScheduledTask:
+    """
+    Handle of a task on the Scheduler. The interval is read again on every reschedule and may be changed.
+    """
+    def __init__(self, deadline: float, callback: Callable[[], None], interval: Union[float, None]):
+        self.deadline = deadline
+        self.callback = callback
+        self.interval = interval
+        self.cancelled = False
+
+    def cancel(self):
+        """The task is not run anymore. A running callback is not interrupted."""
+        self.cancelled = True
+
+class Scheduler:
+    """
+    Runs callbacks at deadlines ordered in a heap. The owner calls run_pending() and then wait(),
+    which sleeps exactly until the next deadline or until wake() is called from another thread.
+    All deadlines are on the time.monotonic() clock so system time jumps (e.g. the first NTP sync) do not matter.
+
+    A periodic task that missed deadlines, because the loop was stalled, is handled by the policy
+    from the env SCHEDULER_MISSED_POLICY:
+    - skip: run once and continue on the original interval grid (Default)
+    - catch_up: run once for every missed deadline. After a long stall a single run_pending() runs all
+      missed deadlines back to back
+    - reset: run once and count the next interval from now
+    """
+    def __init__(self, missed_policy: Union[str, None] = None):
+        self.missed_policy = missed_policy or os.getenv('SCHEDULER_MISSED_POLICY', DEFAULT_MISSED_POLICY)
+        if self.missed_policy not in MISSED_POLICIES:
+            raise ValueError(f"Environment Variable 'SCHEDULER_MISSED_POLICY' has to be one of {MISSED_POLICIES}.")
+
+        self.__heap: List[Tuple[float, int, ScheduledTask]] = []
+        self.__sequence = itertools.count()    # keeps tasks with the same deadline in insertion order
+        self.__lock = threading.Lock()
+        self.__wake = threading.Event()
+
+    def call_at(self, deadline: float, callback: Callable[[], None], interval: Union[float, None] = None) -> ScheduledTask:
+        """
+        :param deadline: time.monotonic() value the callback is due.
+        :param callback: Runs on the thread that calls run_pending().
+        :param interval: Seconds between the runs of a periodic task, greater than 0. None runs it once.
+        """
+        if interval is not None and interval <= 0:
+            raise ValueError(f"Interval of a periodic task has to be greater than 0, got {interval}.")
+        task = ScheduledTask(deadline, callback, interval)
+        self.__push(task)
+        return task
+
+    def call_later(self, delay: float, callback: Callable[[], None], interval: Union[float, None] = None) -> ScheduledTask:
+        """Same as call_at() with a deadline delay seconds from now"""
+        return self.call_at(time.monotonic() + delay, callback, interval)
+
+    def __push(self, task: ScheduledTask):
+        with self.__lock:
+            heapq.heappush(self.__heap, (task.deadline, next(self.__sequence), task))
+            is_next = self.__heap[0][2] is task
+
+        # an earlier deadline than the one the owner sleeps for
+        if is_next: self.__wake.set()
+
+    def __pop_due(self, now: float) -> Union[ScheduledTask, None]:
+        with self.__lock:
+            while self.__heap:
+                deadline, _, task = self.__heap[0]
+                if task.cancelled:
+                    heapq.heappop(self.__heap)
+                    continue
+                if deadline > now: return None
+                heapq.heappop(self.__heap)
+                return task
+            return None
+
+    def run_pending(self):
+        """Runs all tasks that are due now. Exceptions of a callback are logged and do not stop other tasks."""
+        now = time.monotonic()
+        while True:
+            task = self.__pop_due(now)
+            if task is None: return
+
+            try:
+                task.callback()
+            except Exception as error:
+                get_logger().error(f"Scheduled task {task.callback} failed! {error}")
+
+            if task.interval is not None and not task.cancelled:
+                task.deadline = self.__next_deadline(task, time.monotonic())
+                self.__push(task)
+
+    def __next_deadline(self, task: ScheduledTask, now: float) -> float:
+        deadline = task.deadline + task.interval
+        if deadline > now or self.missed_policy == 'catch_up':
+            return deadline
+
+        if self.missed_policy == 'reset':
+            Metrics().increment('scheduler.missed_deadlines')
+            return now + task.interval
+
+        # skip: the next deadline on the grid that is still in the future
+        missed = math.floor((now - deadline) / task.interval) + 1
+        Metrics().increment('scheduler.missed_deadlines', missed)
+        return deadline + missed * task.interval
+
+    def time_until_next(self) -> Union[float, None]:
+        """Seconds until the next task is due. 0 if one is overdue and None if nothing is scheduled."""
+        with self.__lock:
+            while self.__heap and self.__heap[0][2].cancelled:
+                heapq.heappop(self.__heap)
+            if not self.__heap: return None
+            return max(0.0, self.__heap[0][0] - time.monotonic())
+
+    def wait(self, timeout: Union[float, None] = None):
+        """
+        Sleeps until the next task is due, wake() is called or the timeout passes.
+
+        :param timeout: Maximum seconds to sleep. None sleeps until the next task or wake().
+        """
+        self.__wake.clear()
+        delay = self.time_until_next()
+        if delay is None or (timeout is not None and timeout < delay):
+            delay = timeout
+        if delay is not None and delay <= 0: return
+        self.__wake.wait(delay)
+
+    def wake(self):
+        """Lets a waiting wait() return early, e.g. to react on a MQTT message"""
+        self.__wake.set()
+
+
+if __name__ == "__main__":
+
+    # Beispiel: zwei periodische Tasks und ein einmaliger, der den ersten stoppt
+    scheduler = Scheduler()
+    start = time.monotonic()
+
+    fast = scheduler.call_later(0, lambda: print(f"{time.monotonic() - start:5.2f}s fast"), interval=0.5)
+    scheduler.call_later(0, lambda: print(f"{time.monotonic() - start:5.2f}s slow"), interval=1.5)
+    scheduler.call_later(2.2, lambda: fast.cancel())
+
+    while time.monotonic() - start < 4:
+        scheduler.run_pending()
+        scheduler.wait(timeout=4 - (time.monotonic() - start))
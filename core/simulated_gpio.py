@@ -0,0 +1,474 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Tuple, Union
+
+import pigpio
+
+from abstract_base_classes.gpio_backend import GPIOBackend
+from core.logger import get_logger
+
+TICK_MASK = 0xFFFFFFFF          # ticks wrap around like the 32 bit ticks of pigpio
+DEFAULT_PWM_RANGE = 255         # defaults of pigpio
+DEFAULT_PWM_FREQUENCY = 800     # Hz
+STOP_TIMEOUT = 2                # seconds stop() waits for a running callback
+
+class SimulatedCallback:
+    """Handle returned by SimulatedGPIO.callback()"""
+    def __init__(self, gpio: int, edge: int, func: Union[Callable[[int, int, int], None], None], callbacks: List['SimulatedCallback']):
+        self.gpio = gpio
+        self.edge = edge
+        self.func = func
+        self.count = 0
+        self.__callbacks = callbacks
+
+    def wants(self, level: int) -> bool:
+        if level == pigpio.TIMEOUT: return self.func is not None
+        return self.edge == pigpio.EITHER_EDGE or (self.edge == pigpio.RISING_EDGE) == (level == 1)
+
+    def cancel(self):
+        if self in self.__callbacks: self.__callbacks.remove(self)
+
+    def tally(self) -> int:
+        return self.count
+
+    def reset_tally(self):
+        self.count = 0
+
+
+class SimulatedGPIO(GPIOBackend):
+    """
+    GPIO backend without hardware for load tests and headless runs (GPIO_BACKEND=simulated).
+    Needs no pigpio daemon, but the pigpio Python package for its constants and tickDiff().
+    Models the levels of the gpio, internal pull resistors, edge callbacks with ticks, watchdogs and PWM.
+    Sensors are simulated by scripted waveforms: play() drives a gpio with a list of (level, microseconds)
+    pulses, add_dht22() and add_hc_sr04() attach sensors that answer the trigger of their module.
+    The edges of a waveform are delivered in real time on the 'gpio' thread like pigpio does, their ticks
+    are exact, so a late callback thread does not change the decoded values.
+    PWM is modelled as duty cycle and frequency: read() returns the level of the current phase, the PWM
+    edges are not sent to callbacks.
+    Waves are transmitted with exact timing like the DMA of pigpio. wave_chain() takes wave ids only, the
+    loop and delay commands of pigpio are not supported.
+    Exceptions of callbacks are logged and the 'gpio' thread goes on. pigpio does not catch them, there an
+    exception ends its callback thread and all callbacks of the process, so callbacks have to catch their errors.
+    """
+    def __init__(self):
+        self.connected = True
+
+        self.__condition = threading.Condition()
+        self.__levels: Dict[int, int] = {}
+        self.__modes: Dict[int, int] = {}
+        self.__pulls: Dict[int, int] = {}
+        self.__idle: Dict[int, int] = {}          # level of a released line with an external pull resistor
+        self.__pwm: Dict[int, List[int]] = {}     # gpio -> [range, frequency, dutycycle]
+        self.__callbacks: Dict[int, List[SimulatedCallback]] = {}
+        self.__watchdogs: Dict[int, Tuple[float, float]] = {}    # gpio -> (timeout in seconds, next due time)
+        self.__sensors: Dict[int, 'SimulatedSensor'] = {}
+
+        self.__waveform: List[tuple] = []         # heap of (due time, sequence, tick, gpio, level)
+        self.__sequence = itertools.count()
+        self.__edges: deque = deque()             # (gpio, level, tick) waiting for the callback thread
+        self.__wave_pulses: List[Tuple[int, int, int]] = []     # (gpio_on, gpio_off, delay) for the next wave
+        self.__waves: Dict[int, List[Tuple[int, int, int]]] = {}
+        self.__wave_sequences: set = set()        # sequences of the waveform entries the transmitted wave made
+        self.__wave_end = 0.0                     # time the transmitted wave ends
+        self.__running = True
+
+        self.__thread = threading.Thread(name='gpio', target=self.__run, daemon=True)
+        self.__thread.start()
+
+    # pigpio.pi interface
+
+    def set_mode(self, gpio: int, mode: int) -> int:
+        with self.__condition:
+            self.__modes[gpio] = mode
+            self.__pwm.pop(gpio, None)
+            if mode == pigpio.INPUT:
+                level = self.__released_level(gpio)
+                if level is not None: self.__set_level(gpio, level, self.get_current_tick())
+        sensor = self.__sensors.get(gpio)
+        if sensor is not None: sensor.on_mode(gpio, mode)
+        return 0
+
+    def get_mode(self, gpio: int) -> int:
+        return self.__modes.get(gpio, pigpio.INPUT)
+
+    def set_pull_up_down(self, gpio: int, pud: int) -> int:
+        with self.__condition:
+            self.__pulls[gpio] = pud
+            if self.get_mode(gpio) == pigpio.INPUT:
+                level = self.__released_level(gpio)
+                if level is not None: self.__set_level(gpio, level, self.get_current_tick())
+        return 0
+
+    def read(self, gpio: int) -> int:
+        pwm = self.__pwm.get(gpio)
+        if pwm is not None:
+            range_, frequency, dutycycle = pwm
+            return 1 if (time.monotonic() * frequency) % 1 < dutycycle / range_ else 0
+        return self.__levels.get(gpio, 0)
+
+    def write(self, gpio: int, level: int) -> int:
+        level = 1 if level else 0
+        with self.__condition:
+            self.__modes[gpio] = pigpio.OUTPUT
+            self.__pwm.pop(gpio, None)
+            self.__set_level(gpio, level, self.get_current_tick())
+        sensor = self.__sensors.get(gpio)
+        if sensor is not None: sensor.on_write(gpio, level)
+        return 0
+
+    def callback(self, user_gpio: int, edge: int = pigpio.RISING_EDGE, func: Union[Callable[[int, int, int], None], None] = None) -> SimulatedCallback:
+        with self.__condition:
+            callbacks = self.__callbacks.setdefault(user_gpio, [])
+            handle = SimulatedCallback(user_gpio, edge, func, callbacks)
+            callbacks.append(handle)
+        return handle
+
+    def set_watchdog(self, user_gpio: int, wdog_timeout: int) -> int:
+        with self.__condition:
+            if wdog_timeout > 0:
+                self.__watchdogs[user_gpio] = (wdog_timeout / 1000, time.monotonic() + wdog_timeout / 1000)
+            else:
+                self.__watchdogs.pop(user_gpio, None)
+            self.__condition.notify()
+        return 0
+
+    def set_PWM_range(self, user_gpio: int, range_: int) -> int:
+        self.__get_pwm(user_gpio)[0] = range_
+        return range_
+
+    def set_PWM_frequency(self, user_gpio: int, frequency: int) -> int:
+        self.__get_pwm(user_gpio)[1] = frequency
+        return frequency
+
+    def set_PWM_dutycycle(self, user_gpio: int, dutycycle: int) -> int:
+        self.__modes[user_gpio] = pigpio.OUTPUT
+        self.__get_pwm(user_gpio)[2] = dutycycle
+        return 0
+
+    def get_PWM_dutycycle(self, user_gpio: int) -> int:
+        return self.__get_pwm(user_gpio)[2]
+
+    def get_PWM_frequency(self, user_gpio: int) -> int:
+        return self.__get_pwm(user_gpio)[1]
+
+    def get_current_tick(self) -> int:
+        return int(time.monotonic() * 1000000) & TICK_MASK
+
+    def wave_add_generic(self, pulses: list) -> int:
+        self.__wave_pulses.extend((pulse.gpio_on, pulse.gpio_off, pulse.delay) for pulse in pulses)
+        return len(self.__wave_pulses)
+
+    def wave_create(self) -> int:
+        # like pigpio the lowest free id is used
+        wave_id = next(i for i in itertools.count() if i not in self.__waves)
+        self.__waves[wave_id] = self.__wave_pulses
+        self.__wave_pulses = []
+        return wave_id
+
+    def wave_delete(self, wave_id: int) -> int:
+        return 0 if self.__waves.pop(wave_id, None) is not None else pigpio.PI_BAD_WAVE_ID
+
+    def wave_chain(self, data: list) -> int:
+        if any(wave_id not in self.__waves for wave_id in data): return pigpio.PI_BAD_CHAIN_CMD
+        self.wave_tx_stop()
+        start_time, start_tick = time.monotonic(), self.get_current_tick()
+        offset = 0
+        with self.__condition:
+            for wave_id in data:
+                for gpio_on, gpio_off, delay in self.__waves[wave_id]:
+                    for mask, level in ((gpio_off, 0), (gpio_on, 1)):
+                        gpio = 0
+                        while mask:
+                            if mask & 1:
+                                sequence = next(self.__sequence)
+                                self.__wave_sequences.add(sequence)
+                                heapq.heappush(self.__waveform, (start_time + offset / 1000000, sequence,
+                                                                 (start_tick + offset) & TICK_MASK, gpio, level))
+                            mask >>= 1
+                            gpio += 1
+                    offset += delay
+            self.__wave_end = start_time + offset / 1000000
+            self.__condition.notify()
+        return 0
+
+    def wave_tx_busy(self) -> int:
+        return 1 if time.monotonic() < self.__wave_end else 0
+
+    def wave_tx_stop(self) -> int:
+        with self.__condition:
+            if self.__wave_sequences:
+                # the edges that are due are on the line already, even if the gpio thread did not deliver them yet
+                now = time.monotonic()
+                self.__waveform = [entry for entry in self.__waveform if entry[0] <= now or entry[1] not in self.__wave_sequences]
+                heapq.heapify(self.__waveform)
+                self.__wave_sequences.clear()
+            self.__wave_end = 0.0
+        return 0
+
+    def stop(self):
+        with self.__condition:
+            self.__running = False
+            self.__condition.notify()
+        self.__thread.join(STOP_TIMEOUT)
+        self.connected = False
+
+    # simulation
+
+    def play(self, gpio: int, pulses: List[Tuple[int, int]], delay: int = 0):
+        """
+        Drives gpio with a waveform like a sensor would.
+
+        :param pulses: (level, microseconds) one after another.
+        :param delay: Microseconds until the first pulse starts.
+        """
+        start_time, start_tick = time.monotonic(), self.get_current_tick()
+        offset = delay
+        with self.__condition:
+            for level, duration in pulses:
+                heapq.heappush(self.__waveform, (start_time + offset / 1000000, next(self.__sequence),
+                                                 (start_tick + offset) & TICK_MASK, gpio, level))
+                offset += duration
+            self.__condition.notify()
+
+    def set_level(self, gpio: int, level: int):
+        """Drives an input from outside, e.g. a pressed button"""
+        with self.__condition:
+            self.__set_level(gpio, level, self.get_current_tick())
+
+    def add_dht22(self, gpio: int, temperature: float = 21.5, humidity: float = 45.0) -> 'SimulatedDHT22':
+        sensor = SimulatedDHT22(self, temperature, humidity)
+        self.__attach(gpio, sensor, idle=1)
+        return sensor
+
+    def add_hc_sr04(self, trigger_gpio: int, echo_gpio: int, distance: float = 1000) -> 'SimulatedHCSR04':
+        sensor = SimulatedHCSR04(self, echo_gpio, distance)
+        self.__attach(trigger_gpio, sensor)
+        with self.__condition:
+            self.__idle[echo_gpio] = 0
+        return sensor
+
+    def __attach(self, gpio: int, sensor: 'SimulatedSensor', idle: Union[int, None] = None):
+        with self.__condition:
+            self.__sensors[gpio] = sensor
+            if idle is not None:
+                self.__idle[gpio] = idle
+                # the line is at this level since power up, there is no edge
+                if self.get_mode(gpio) == pigpio.INPUT: self.__levels[gpio] = idle
+
+    def __get_pwm(self, gpio: int) -> List[int]:
+        pwm = self.__pwm.get(gpio)
+        if pwm is None:
+            pwm = self.__pwm[gpio] = [DEFAULT_PWM_RANGE, DEFAULT_PWM_FREQUENCY, 0]
+        return pwm
+
+    def __released_level(self, gpio: int) -> Union[int, None]:
+        """Level of an input nobody drives. None keeps the last level"""
+        if gpio in self.__idle: return self.__idle[gpio]
+        pud = self.__pulls.get(gpio, pigpio.PUD_OFF)
+        if pud == pigpio.PUD_UP: return 1
+        if pud == pigpio.PUD_DOWN: return 0
+        return None
+
+    def __set_level(self, gpio: int, level: int, tick: int):
+        """Has to be called with the condition held"""
+        if self.__levels.get(gpio, 0) == level: return
+        self.__levels[gpio] = level
+        watchdog = self.__watchdogs.get(gpio)
+        if watchdog is not None:
+            self.__watchdogs[gpio] = (watchdog[0], time.monotonic() + watchdog[0])
+        self.__edges.append((gpio, level, tick))
+        self.__condition.notify()
+
+    def __next_edges(self) -> Union[List[Tuple[int, int, int]], None]:
+        """Waits for edges and watchdog timeouts to deliver. None if stopped"""
+        with self.__condition:
+            while True:
+                if not self.__running: return None
+
+                now = time.monotonic()
+                while self.__waveform and self.__waveform[0][0] <= now:
+                    _, sequence, tick, gpio, level = heapq.heappop(self.__waveform)
+                    self.__wave_sequences.discard(sequence)
+                    self.__set_level(gpio, level, tick)
+                for gpio, (timeout, due) in list(self.__watchdogs.items()):
+                    if due <= now:
+                        self.__watchdogs[gpio] = (timeout, now + timeout)
+                        self.__edges.append((gpio, pigpio.TIMEOUT, self.get_current_tick()))
+
+                if self.__edges:
+                    edges = list(self.__edges)
+                    self.__edges.clear()
+                    return edges
+
+                dues = [due for _, due in self.__watchdogs.values()]
+                if self.__waveform: dues.append(self.__waveform[0][0])
+                self.__condition.wait(min(dues) - now if dues else None)
+
+    def __run(self):
+        while True:
+            edges = self.__next_edges()
+            if edges is None: return
+
+            for gpio, level, tick in edges:
+                for handle in list(self.__callbacks.get(gpio, ())):
+                    if not handle.wants(level): continue
+                    handle.count += 1
+                    if handle.func is None: continue
+                    try:
+                        handle.func(gpio, level, tick)
+                    except Exception as error:
+                        get_logger().error(f"Simulated gpio callback on gpio {gpio} failed! {error}")
+
+
+class SimulatedSensor:
+    """A sensor on a SimulatedGPIO. Gets the writes and mode changes of the gpio it is attached to"""
+    def on_write(self, gpio: int, level: int):
+        pass
+
+    def on_mode(self, gpio: int, mode: int):
+        pass
+
+
+class SimulatedDHT22(SimulatedSensor):
+    """
+    Answers the start signal of the host (line held low, then released to input) with the 40 bit
+    message of the DHT22: 80µs low, 80µs high, then per bit 50µs low and 26µs (0) or 70µs (1) high.
+    """
+    def __init__(self, gpio: SimulatedGPIO, temperature: float, humidity: float):
+        self.gpio = gpio
+        self.temperature = temperature
+        self.humidity = humidity
+        self.readings = 0
+        self.__start_signal = False
+
+    def on_write(self, gpio: int, level: int):
+        self.__start_signal = level == 0
+
+    def on_mode(self, gpio: int, mode: int):
+        if mode != pigpio.INPUT or not self.__start_signal: return
+        self.__start_signal = False
+        self.readings += 1
+        self.gpio.play(gpio, self.waveform(), delay=30)
+
+    def waveform(self) -> List[Tuple[int, int]]:
+        humidity = round(self.humidity * 10)
+        temperature = round(abs(self.temperature) * 10) | (0x8000 if self.temperature < 0 else 0)
+        data = [humidity >> 8, humidity & 0xFF, temperature >> 8, temperature & 0xFF]
+        data.append(sum(data) & 0xFF)
+
+        pulses = [(0, 80), (1, 80)]
+        for byte in data:
+            for bit in range(7, -1, -1):
+                pulses.append((0, 50))
+                pulses.append((1, 70 if byte >> bit & 1 else 26))
+        pulses.append((0, 50))
+        pulses.append((1, 0))
+        return pulses
+
+
+class SimulatedHCSR04(SimulatedSensor):
+    """
+    Answers a falling edge on the trigger gpio with an echo pulse on the echo gpio. The pulse is as long as
+    the sound needs for twice the distance in mm, 38ms without obstacle (distance None).
+    """
+    SOUND_SPEED = 0.343         # mm per µs
+    NO_ECHO = 38000             # µs
+
+    def __init__(self, gpio: SimulatedGPIO, echo_gpio: int, distance: Union[float, None]):
+        self.gpio = gpio
+        self.echo_gpio = echo_gpio
+        self.distance = distance
+        self.__level = 1
+
+    def on_write(self, gpio: int, level: int):
+        if self.__level == 1 and level == 0:
+            echo = self.NO_ECHO if self.distance is None else round(self.distance * 2 / self.SOUND_SPEED)
+            self.gpio.play(self.echo_gpio, [(1, echo), (0, 0)], delay=450)
+        self.__level = level
+
+
+if __name__ == "__main__":
+
+    # Load test: a ModuleManager with 54 modules on the simulated gpio for a few seconds.
+    # 10 DHT22 every 3s, 4 HC-SR04 and 40 gpio reads every second, all sensors answer through their waveforms.
+    # Measures the CPU, how long the main loop is blocked and the tick latency per module type for both execution modes.
+    import os
+    import statistics
+    from core.io import IO
+    from core.metrics import Metrics
+    from core.module_manager import EXECUTION_MODES, ModuleManager
+    from entities.config_entity import DeviceConfig
+    from helper.pin_to_gpio import map_gpio_for
+
+    DURATION = 10
+    PROBE_INTERVAL = 0.01       # seconds between the probes that measure how long the main loop is blocked
+    DHT_PINS = (3, 5, 7, 8, 10, 11, 12, 13, 15, 16)
+    HC_SR04_PINS = ((18, 19), (21, 22), (23, 24), (26, 29))
+    READ_PINS = (31, 32, 33, 35, 36, 37, 38, 40)
+
+    os.environ['GPIO_BACKEND'] = 'simulated'
+    gpio = IO().get_gpio()
+
+    def module(module_id, type, interval, interface, sensors):
+        return {"name": f"{type} {module_id}", "moduleId": module_id, "type": type, "readingInterval": interval,
+                "interface": interface, "sensors": [{"id": module_id * 10 + i, "type": s} for i, s in enumerate(sensors)],
+                "controllers": []}
+
+    modules = []
+    for pin in DHT_PINS:
+        gpio.add_dht22(map_gpio_for(pin), temperature=20 + pin / 10, humidity=40 + pin / 10)
+        modules.append(module(len(modules) + 1, "DHT", 3000, {"PIN": pin}, ["Temperatur", "Relative Luftfeuchtigkeit"]))
+    for trigger_pin, echo_pin in HC_SR04_PINS:
+        gpio.add_hc_sr04(map_gpio_for(trigger_pin), map_gpio_for(echo_pin), distance=trigger_pin * 50)
+        modules.append(module(len(modules) + 1, "HC-SR04", 1000, {"trigger_pin": trigger_pin, "echo_pin": echo_pin}, ["Distanz"]))
+    for i in range(40):
+        modules.append(module(len(modules) + 1, "BOOLEAN_READ", 1000, {"PIN": READ_PINS[i % len(READ_PINS)]}, ["Boolean"]))
+    device_config = DeviceConfig({"id": 1, "name": "load test", "modules": modules})
+
+    manager = ModuleManager()
+    for mode in EXECUTION_MODES:
+        manager.execution_mode = mode
+        manager.setup_modules(device_config)
+
+        tick_times: Dict[str, List[float]] = {}
+        for running in manager.get_modules():
+            def timed_tick(tick=running.tick, times=tick_times.setdefault(running.get_config().type, [])):
+                start = time.perf_counter()
+                tick()
+                times.append(time.perf_counter() - start)
+            running.tick = timed_tick
+
+        blocked = []
+        last_probe = time.monotonic()
+        def probe():
+            global last_probe
+            now = time.monotonic()
+            blocked.append(max(0, now - last_probe - PROBE_INTERVAL))
+            last_probe = now
+        scheduler = manager.get_scheduler()
+        probe_task = scheduler.call_later(0, probe, interval=PROBE_INTERVAL)
+
+        start, cpu_start = time.monotonic(), time.process_time()
+        while time.monotonic() - start < DURATION:
+            scheduler.run_pending()
+            scheduler.wait(timeout=0.1)
+        cpu = time.process_time() - cpu_start
+        probe_task.cancel()
+        manager.on_destroy()
+
+        dht_reads = [Metrics().get(f"modules.{i + 1}.dht_read_seconds") for i in range(len(DHT_PINS))]
+        blocked.sort()
+        print(f"{mode:6} {len(modules)} modules: {cpu / DURATION * 100:5.1f}% CPU, main loop blocked "
+              f"p50 {blocked[len(blocked) // 2] * 1000:5.1f} ms p99 {blocked[int(len(blocked) * 0.99)] * 1000:5.1f} ms "
+              f"max {blocked[-1] * 1000:5.1f} ms, "
+              f"DHT read {statistics.mean(d for d in dht_reads if d is not None) * 1000:.1f} ms")
+        for type, times in tick_times.items():
+            print(f"       {type:13} {len(times):4} ticks mean {statistics.mean(times) * 1000:7.2f} ms max {max(times) * 1000:7.2f} ms")
+    gpio.stop()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+import threading
+from typing import Callable, Union
+
+from abstract_base_classes.singleton_meta import SingletonMeta
+from core.logger import get_logger
+from core.scheduler import ScheduledTask, Scheduler
+
+STOP_TIMEOUT = 2                # seconds on_destroy waits for a running callback
+
+class TimerService(metaclass=SingletonMeta):
+    """
+    Shared replacement for threading.Timer. All timers are deadlines on one Scheduler that is run by a
+    single daemon thread, so a timer costs no thread of its own. call_later() returns the ScheduledTask
+    as handle, its cancel() stops the timer.
+    The callbacks run on the timer thread one after another and have to return quickly. Longer work is
+    handed to the thread that owns it, e.g. SystemUI.renderer.submit() or the Uploader.
+    """
+    def __init__(self):
+        self.scheduler = Scheduler()
+        self.__running = True
+
+        self.__thread = threading.Thread(name='timer', target=self.__run, daemon=True)
+        self.__thread.start()
+
+    def call_later(self, delay: float, callback: Callable[[], None], interval: Union[float, None] = None) -> ScheduledTask:
+        """
+        :param delay: Seconds until callback runs.
+        :param callback: Runs on the timer thread.
+        :param interval: Seconds between the runs of a periodic timer, greater than 0. None runs it once.
+        """
+        return self.scheduler.call_later(delay, callback, interval)
+
+    def __run(self):
+        while True:
+            self.scheduler.run_pending()
+            if not self.__running: return
+            self.scheduler.wait()
+
+    def on_destroy(self):
+        """Stops the timer thread. Pending timers do not run anymore."""
+        self.__running = False
+        # a due task cannot get lost like a wake() right before wait() clears it
+        self.scheduler.call_later(0, lambda: None)
+        self.__thread.join(STOP_TIMEOUT)
+        if self.__thread.is_alive():
+            get_logger().warning(f"Timer callback still running after {STOP_TIMEOUT}s. Leaving it behind")
+
+
+if __name__ == "__main__":
+
+    # Stress test: threads created for one hour of a typical device, compressed by SPEEDUP.
+    # 10 minutes of menu navigation with one draw per second (display dark and auto off timer on every draw),
+    # 10 minutes on the system info screen (one timer per CPU temperature update before the render thread)
+    # and the light blinking on every server contact once a minute.
+    import time
+
+    SPEEDUP = 1000
+    MENU_DRAWS = 600
+    SYSTEM_INFO_UPDATES = 600
+    CONTACTS = 60
+
+    started = 0
+    thread_start = threading.Thread.start
+    def counting_start(self):
+        global started
+        started += 1
+        thread_start(self)
+    threading.Thread.start = counting_start
+
+    def threading_timer(delay, callback):
+        timer = threading.Timer(delay / SPEEDUP, callback)
+        timer.start()
+        return timer
+
+    def timer_service(delay, callback):
+        return TimerService().call_later(delay / SPEEDUP, callback)
+
+    def simulate_hour(start_timer):
+        done = threading.Event()
+        updates = SYSTEM_INFO_UPDATES
+        def draw_cpu():
+            nonlocal updates
+            updates -= 1
+            if updates > 0: start_timer(1.0, draw_cpu)
+            else: done.set()
+        draw_cpu()
+
+        dark_timer = off_timer = None
+        for second in range(3600):
+            if second < MENU_DRAWS:
+                if dark_timer is not None: dark_timer.cancel()
+                if off_timer is not None: off_timer.cancel()
+                dark_timer = start_timer(5.0, lambda: None)
+                off_timer = start_timer(60.0, lambda: None)
+            if second % (3600 // CONTACTS) == 0:
+                start_timer(0.1, lambda: None)      # Light.blink
+            time.sleep(1 / SPEEDUP)
+        done.wait()
+
+    for name, start_timer in (("threading.Timer", threading_timer), ("TimerService", timer_service)):
+        started = 0
+        simulate_hour(start_timer)
+        print(f"{name:16} {started:5} threads created per hour")
+    TimerService().on_destroy()
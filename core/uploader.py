@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+import queue
+import threading
+import time
+from typing import Set, Union
+
+from abstract_base_classes.singleton_meta import SingletonMeta
+from core.api_client import APIClient
+from core.logger import get_logger
+from core.metrics import Metrics
+from exceptions.api_exception import ServerNotReachableException
+
+STOP_TIMEOUT = 15               # seconds on_destroy waits for a running request before leaving the worker behind
+
+class Uploader(metaclass=SingletonMeta):
+    """
+    Runs the pings and sensor reading uploads on a background thread so the tick loop never waits for the server.
+    Tasks are queued with request_ping() and request_sync(). A task that is already waiting is not queued twice.
+    The queue depth and the time of the last task that succeeded, a ping the server accepted or a sync that
+    uploaded all readings, are published as 'uploader.queue_depth' and 'uploader.last_success' on Metrics.
+    """
+    PING = 'ping'
+    SYNC = 'sync'
+
+    def __init__(self):
+        self.api_client = APIClient()
+        self.__queue: queue.Queue = queue.Queue()
+        self.__waiting: Set[str] = set()
+        self.__lock = threading.Lock()
+
+        self.__thread = threading.Thread(name='uploader', target=self.__run, daemon=True)
+        self.__thread.start()
+
+    def request_ping(self):
+        self.__enqueue(self.PING)
+
+    def request_sync(self):
+        self.__enqueue(self.SYNC)
+
+    def __enqueue(self, task: Union[str, None]):
+        with self.__lock:
+            if task in self.__waiting: return
+            if task is not None: self.__waiting.add(task)
+            self.__queue.put(task)
+            Metrics().set('uploader.queue_depth', self.__queue.qsize())
+
+    def __run(self):
+        while True:
+            task = self.__queue.get()
+            with self.__lock:
+                self.__waiting.discard(task)
+                Metrics().set('uploader.queue_depth', self.__queue.qsize())
+
+            if task is None: return
+
+            try:
+                succeeded = False
+                if task == self.PING:
+                    succeeded = self.api_client.send_ping()
+                elif task == self.SYNC:
+                    succeeded = self.api_client.sync_sensor_readings()
+                if succeeded: Metrics().set('uploader.last_success', time.time())
+
+            except ServerNotReachableException as error:
+                get_logger().error(f"{error}")
+
+            except Exception as error:
+                get_logger().error(f"Uploader task '{task}' failed! {error}")
+
+    def on_destroy(self):
+        """Lets the worker finish the running task and stops it. Waiting tasks are dropped."""
+        with self.__lock:
+            self.__waiting.clear()
+            while not self.__queue.empty():
+                self.__queue.get_nowait()
+        self.__enqueue(None)
+        self.__thread.join(STOP_TIMEOUT)
+        if self.__thread.is_alive():
+            get_logger().warning(f"Uploader still busy after {STOP_TIMEOUT}s. Leaving it behind")
@@ -75,6 +75,7 @@
 
 import time
 from custom_libs.adafruit_framebuf import FrameBuffer, MVLSB, MHMSB
+from custom_libs.dirty_region import DirtyRegion
 
 
 # a few register definitions
@@ -86,9 +87,11 @@ _SET_SEG_REMAP       = 0xa0
 _LOW_COLUMN_ADDRESS  = 0x00
 _HIGH_COLUMN_ADDRESS = 0x10
 _SET_PAGE_ADDRESS    = 0xB0
+_COLUMN_OFFSET       = 2        # the controller has 132 columns, the panel starts at column 2
+_GAP_BYTES           = 6        # resend up to this many unchanged bytes instead of 3 more commands
 
 
-class SH1106(FrameBuffer):
+class SH1106(DirtyRegion, FrameBuffer):
 
     def __init__(self, width, height, external_vcc, rotate=0):
         self.width = width
@@ -98,17 +101,19 @@ class SH1106(FrameBuffer):
         self.rotate90 = rotate == 90 or rotate == 270
         self.pages = self.height // 8
         self.bufsize = self.pages * self.width
-        self.renderbuf = bytearray(self.bufsize)
-        self.pages_to_update = 0
+        # one spare byte in front of the display buffer, see SH1106_I2C.write_display_data()
+        self.databuf = bytearray(self.bufsize + 1)
+        self.displaybuf = memoryview(self.databuf)[1:]
+        self.init_dirty_region(self.pages, self.width, transposed=self.rotate90)
 
         if self.rotate90:
-            self.displaybuf = bytearray(self.bufsize)
+            self.renderbuf = bytearray(self.bufsize)
             # HMSB is required to keep the bit order in the render buffer
             # compatible with byte-for-byte remapping to the display buffer,
             # which is in VLSB. Else we'd have to copy bit-by-bit!
             super().__init__(self.renderbuf, self.height, self.width, MHMSB)
         else:
-            self.displaybuf = self.renderbuf
+            self.renderbuf = self.displaybuf
             super().__init__(self.renderbuf, self.width, self.height, MVLSB)
 
         # flip() was called rotate() once, provide backwards compatibility.
@@ -153,81 +158,22 @@ class SH1106(FrameBuffer):
         self.write_cmd(_SET_NORM_INV | (invert & 1))
 
     def show(self, full_update = False):
-        # self.* lookups in loops take significant time (~4fps).
-        (w, p, db, rb) = (self.width, self.pages, self.displaybuf, self.renderbuf)
-        if self.rotate90:
-            for i in range(self.bufsize):
-                db[w * (i % p) + (i // p)] = rb[i]
+        # self.width is the render width, which differs with rotate90
+        (w, p, db, rb) = (self.bufsize // self.pages, self.pages, self.displaybuf, self.renderbuf)
         if full_update:
-            pages_to_update = (1 << self.pages) - 1
-        else:
-            pages_to_update = self.pages_to_update
-        #print("Updating pages: {:08b}".format(pages_to_update))
-        for page in range(self.pages):
-            if (pages_to_update & (1 << page)):
+            self.invalidate_shadow()
+        if self.rotate90:
+            # column c of a display page is byte <page> of render row c, a strided slice
+            for page in self.dirty_pages():
+                db[w*page:w*page + w] = rb[page::p]
+        windows = self.pop_changed_windows(db, _GAP_BYTES)
+        for (page_start, page_end, column_start, column_end) in windows:
+            column = _COLUMN_OFFSET + column_start
+            for page in range(page_start, page_end + 1):
                 self.write_cmd(_SET_PAGE_ADDRESS | page)
-                self.write_cmd(_LOW_COLUMN_ADDRESS | 2)
-                self.write_cmd(_HIGH_COLUMN_ADDRESS | 0)
-                self.write_data(db[(w*page):(w*page+w)])
-        self.pages_to_update = 0
-
-    def pixel(self, x, y, color=None):
-        if color is None:
-            return super().pixel(x, y)
-        else:
-            super().pixel(x, y , color)
-            page = y // 8
-            self.pages_to_update |= 1 << page
-
-    def text(self, text, x, y, color=1, size=1):
-        super().text(text, x, y, color, size=size)
-        self.register_updates(y, y+7)
-
-    def line(self, x0, y0, x1, y1, color):
-        super().line(x0, y0, x1, y1, color)
-        self.register_updates(y0, y1)
-
-    def hline(self, x, y, w, color):
-        super().rect(x, y, w, 1, color, fill=True)
-        self.register_updates(y)
-
-    def vline(self, x, y, h, color):
-        super().rect(x, y, 1, h, color, fill=True)
-        self.register_updates(y, y+h-1)
-
-    def fill(self, color):
-        super().fill(color)
-        self.pages_to_update = (1 << self.pages) - 1
-
-    def blit(self, fbuf, x, y, key=-1, palette=None):
-        super().blit(fbuf, x, y, key, palette)
-        self.register_updates(y, y+self.height)
-
-    def scroll(self, x, y):
-        # my understanding is that scroll() does a full screen change
-        super().scroll(x, y)
-        self.pages_to_update =  (1 << self.pages) - 1
-
-    def fill_rect(self, x, y, w, h, color):
-        # super().fill_rect(x, y, w, h, color)
-        super().rect(x, y, w, h, color, fill=True)
-        self.register_updates(y, y+h-1)
-
-    def rect(self, x, y, w, h, color):
-        super().rect(x, y, w, h, color)
-        self.register_updates(y, y+h-1)
-
-    def register_updates(self, y0, y1=None):
-        # this function takes the top and optional bottom address of the changes made
-        # and updates the pages_to_change list with any changed pages
-        # that are not yet on the list
-        start_page = max(0, y0 // 8)
-        end_page = max(0, y1 // 8) if y1 is not None else start_page
-        # rearrange start_page and end_page if coordinates were given from bottom to top
-        if start_page > end_page:
-            start_page, end_page = end_page, start_page
-        for page in range(start_page, end_page+1):
-            self.pages_to_update |= 1 << page
+                self.write_cmd(_LOW_COLUMN_ADDRESS | (column & 0x0f))
+                self.write_cmd(_HIGH_COLUMN_ADDRESS | (column >> 4))
+                self.write_display_data(w*page + column_start, w*page + column_end + 1)
 
     def reset(self, res):
         if res is not None:
@@ -258,6 +204,16 @@ class SH1106_I2C(SH1106):
     def write_data(self, buf:FrameBuffer):
         self.i2c.writeto(self.addr, b'\x40'+buf)
 
+    def write_display_data(self, start, end):
+        # send displaybuf[start:end] without copying it. the byte in front
+        # of the data is borrowed for the control byte.
+        saved = self.databuf[start]
+        self.databuf[start] = 0x40  # Co=0, D/C#=1
+        try:
+            self.i2c.writeto(self.addr, self.databuf, start=start, end=end + 1)
+        finally:
+            self.databuf[start] = saved
+
     def reset(self):
         super().reset(self.res)
 
@@ -314,5 +270,8 @@ class SH1106_SPI(SH1106):
             self.dc(1)
             self.spi.write(buf)
 
+    def write_display_data(self, start, end):
+        self.write_data(self.displaybuf[start:end])
+
     def reset(self):
         super().reset(self.res)
@@ -11,12 +11,16 @@ MicroPython SSD1306 OLED driver, I2C and SPI interfaces
 * Author(s): Tony DiCola, Michael McWethy
 """
 
+# the typing imports below are missing without Blinka (simulated display), keep the annotations unevaluated
+from __future__ import annotations
+
 import time
 
 from micropython import const
 from adafruit_bus_device import i2c_device, spi_device
 
 from custom_libs.adafruit_framebuf import FrameBuffer, MVLSB, MHMSB
+from custom_libs.dirty_region import DirtyRegion
 _FRAMEBUF_FORMAT = MVLSB
 
 # try:
@@ -35,7 +39,8 @@ try:
     from typing import Optional
     import busio
     import digitalio
-except ImportError:
+except (ImportError, NotImplementedError):
+    # Blinka raises NotImplementedError on boards it does not know
     pass
 
 __version__ = "2.12.17"
@@ -60,10 +65,16 @@ SET_DISP_CLK_DIV = const(0xD5)
 SET_PRECHARGE = const(0xD9)
 SET_VCOM_DESEL = const(0xDB)
 SET_CHARGE_PUMP = const(0x8D)
+SET_PAGE_START = const(0xB0)
+
+# Unchanged bytes are resent to join two changed runs if that costs at most this many bytes.
+# A separate window costs 6 commands of 2 bytes each, a separate page write 3 commands.
+WINDOW_MERGE_BYTES = 12
+PAGE_GAP_BYTES = 6
 
 
-class _SSD1306(FrameBuffer):
-    """Base class for SSD1306 display driver"""
+class _SSD1306(DirtyRegion, FrameBuffer):
+    """Base class for SSD1306 display driver. show() only sends what changed since the last call."""
 
     # pylint: disable-msg=too-many-arguments
     def __init__(
@@ -86,6 +97,7 @@ class _SSD1306(FrameBuffer):
         if self.reset_pin:
             self.reset_pin.switch_to_output(value=0)
         self.pages = self.height // 8
+        self.init_dirty_region(self.pages, self.width)
         # Note the subclass must initialize self.framebuf to a framebuffer.
         # This is necessary because the underlying data buffer is different
         # between I2C and SPI implementations (I2C needs an extra byte).
@@ -93,14 +105,15 @@ class _SSD1306(FrameBuffer):
         # Parameters for efficient Page Addressing Mode (typical of U8Glib libraries)
         # Important as not all screens appear to support Horizontal Addressing Mode
         if self.page_addressing:
-            self.pagebuffer = bytearray(width + 1)  # type: Optional[bytearray]
-            self.pagebuffer[0] = 0x40  # Set first byte of data buffer to Co=0, D/C=1
             self.page_column_start = bytearray(2)  # type: Optional[bytearray]
             self.page_column_start[0] = self.width % 32
             self.page_column_start[1] = 0x10 + self.width // 32
+            self.page_column = (
+                (self.page_column_start[1] & 0x0F) << 4
+            ) + self.page_column_start[0]
         else:
-            self.pagebuffer = None
             self.page_column_start = None
+            self.page_column = 0
         # Let's get moving!
         self.poweron()
         self.init_display()
@@ -182,11 +195,18 @@ class _SSD1306(FrameBuffer):
         self.write_cmd(SET_SEG_REMAP | (rotate & 1))
         # com output (vertical mirror) is changed immediately
         # you need to call show() for the seg remap to be visible
+        self.invalidate_shadow()
 
     def write_framebuf(self) -> None:
         """Derived class must implement this"""
         raise NotImplementedError
 
+    def write_window(
+        self, page_start: int, page_end: int, column_start: int, column_end: int
+    ) -> None:
+        """Derived class must implement this"""
+        raise NotImplementedError
+
     def write_cmd(self, cmd: int) -> None:
         """Derived class must implement this"""
         raise NotImplementedError
@@ -203,23 +223,41 @@ class _SSD1306(FrameBuffer):
         self.write_cmd(SET_DISP | 0x01)
         self._power = True
 
+    def set_window(
+        self, page_start: int, page_end: int, column_start: int, column_end: int
+    ) -> None:
+        """Set the RAM window the following data is written to (Horizontal Addressing Mode)"""
+        xpos0 = column_start
+        xpos1 = column_end
+        if self.width != 128:
+            # narrow displays use centered columns
+            col_offset = (128 - self.width) // 2
+            xpos0 += col_offset
+            xpos1 += col_offset
+        self.write_cmd(SET_COL_ADDR)
+        self.write_cmd(xpos0)
+        self.write_cmd(xpos1)
+        self.write_cmd(SET_PAGE_ADDR)
+        self.write_cmd(page_start)
+        self.write_cmd(page_end)
+
+    def set_page_column(self, page: int, column_start: int) -> None:
+        """Set the page and column the following data is written to (Page Addressing Mode)"""
+        column = self.page_column + column_start
+        self.write_cmd(SET_PAGE_START + page)
+        self.write_cmd(column & 0x0F)
+        self.write_cmd(0x10 | (column >> 4))
+
     def show(self) -> None:
-        """Update the display"""
-        if not self.page_addressing:
-            xpos0 = 0
-            xpos1 = self.width - 1
-            if self.width != 128:
-                # narrow displays use centered columns
-                col_offset = (128 - self.width) // 2
-                xpos0 += col_offset
-                xpos1 += col_offset
-            self.write_cmd(SET_COL_ADDR)
-            self.write_cmd(xpos0)
-            self.write_cmd(xpos1)
-            self.write_cmd(SET_PAGE_ADDR)
-            self.write_cmd(0)
-            self.write_cmd(self.pages - 1)
-        self.write_framebuf()
+        """Update the display. Only the bytes that differ from the last sent frame are sent."""
+        if self.page_addressing:
+            windows = self.pop_changed_windows(self.buf, PAGE_GAP_BYTES)
+        else:
+            windows = self.pop_changed_windows(
+                self.buf, WINDOW_MERGE_BYTES, WINDOW_MERGE_BYTES
+            )
+        for window in windows:
+            self.write_window(*window)
 
 
 class SSD1306_I2C(_SSD1306):
@@ -272,23 +310,50 @@ class SSD1306_I2C(_SSD1306):
         with self.i2c_device:
             self.i2c_device.write(self.temp)
 
+    def write_data(self, start: int, end: int) -> None:
+        """Send self.buffer[start:end] in one I2C transaction without copying it.
+        The byte in front of the data is borrowed for the control byte."""
+        control = start - 1
+        saved = self.buffer[control]
+        self.buffer[control] = 0x40  # Co=0, D/C=1
+        try:
+            with self.i2c_device:
+                self.i2c_device.write(self.buffer, start=control, end=end)
+        finally:
+            self.buffer[control] = saved
+
     def write_framebuf(self) -> None:
         """Blast out the frame buffer using a single I2C transaction to support
         hardware I2C interfaces."""
         if self.page_addressing:
             for page in range(self.pages):
-                self.write_cmd(0xB0 + page)
-                self.write_cmd(self.page_column_start[0])
-                self.write_cmd(self.page_column_start[1])
-                self.pagebuffer[1:] = self.buffer[
-                    1 + self.width * page : 1 + self.width * (page + 1)
-                ]
-                with self.i2c_device:
-                    self.i2c_device.write(self.pagebuffer)
+                self.set_page_column(page, 0)
+                self.write_data(
+                    1 + self.width * page, 1 + self.width * (page + 1)
+                )
         else:
             with self.i2c_device:
                 self.i2c_device.write(self.buffer)
 
+    def write_window(
+        self, page_start: int, page_end: int, column_start: int, column_end: int
+    ) -> None:
+        """Send one window of the frame buffer. A window over the full width is
+        one I2C transaction, else every page is sent on its own."""
+        if not self.page_addressing:
+            self.set_window(page_start, page_end, column_start, column_end)
+            if column_start == 0 and column_end == self.width - 1:
+                self.write_data(
+                    1 + self.width * page_start, 1 + self.width * (page_end + 1)
+                )
+                return
+
+        for page in range(page_start, page_end + 1):
+            if self.page_addressing:
+                self.set_page_column(page, column_start)
+            start = 1 + self.width * page
+            self.write_data(start + column_start, start + column_end + 1)
+
 
 # pylint: disable-msg=too-many-arguments
 class SSD1306_SPI(_SSD1306):
@@ -332,6 +397,7 @@ class SSD1306_SPI(_SSD1306):
             spi, cs, baudrate=baudrate, polarity=polarity, phase=phase
         )
         self.dc_pin = dc
+        self.cmd = bytearray(1)
         self.buffer = bytearray((height // 8) * width)
         super().__init__(
             memoryview(self.buffer),
@@ -345,11 +411,24 @@ class SSD1306_SPI(_SSD1306):
     def write_cmd(self, cmd: int) -> None:
         """Send a command to the SPI device"""
         self.dc_pin.value = 0
+        self.cmd[0] = cmd
         with self.spi_device as spi:
-            spi.write(bytearray([cmd]))
+            spi.write(self.cmd)
 
     def write_framebuf(self) -> None:
         """write to the frame buffer via SPI"""
         self.dc_pin.value = 1
         with self.spi_device as spi:
             spi.write(self.buffer)
+
+    def write_window(
+        self, page_start: int, page_end: int, column_start: int, column_end: int
+    ) -> None:
+        """Send one window of the frame buffer. The controller continues the window
+        with every page, so the rows are written straight out of the buffer."""
+        self.set_window(page_start, page_end, column_start, column_end)
+        self.dc_pin.value = 1
+        with self.spi_device as spi:
+            for page in range(page_start, page_end + 1):
+                start = self.width * page + column_start
+                spi.write(self.buffer, start=start, end=start + column_end - column_start + 1)
@@ -28,7 +28,6 @@ Implementation Notes
 __version__ = "0.0.0+auto.0"
 __repo__ = "https://github.com/adafruit/Adafruit_CircuitPython_framebuf.git"
 
-import os
 import struct
 
 from core.logger import get_logger
@@ -117,12 +116,8 @@ class MHMSBFormat:
     @staticmethod
     def fill(framebuf: 'FrameBuffer', color):
         """completely fill/clear the buffer with a color"""
-        if color:
-            fill = 0xFF
-        else:
-            fill = 0x00
-        for i in range(len(framebuf.buf)):  # pylint: disable=consider-using-enumerate
-            framebuf.buf[i] = fill
+        fill = b"\xff" if color else b"\x00"
+        framebuf.buf[:] = fill * len(framebuf.buf)
 
     @staticmethod
     def fill_rect(framebuf: 'FrameBuffer', x, y, width, height, color):
@@ -160,27 +155,54 @@ class MVLSBFormat:
     @staticmethod
     def fill(framebuf: 'FrameBuffer', color):
         """completely fill/clear the buffer with a color"""
-        if color:
-            fill = 0xFF
-        else:
-            fill = 0x00
-        for i in range(len(framebuf.buf)):  # pylint: disable=consider-using-enumerate
-            framebuf.buf[i] = fill
+        fill = b"\xff" if color else b"\x00"
+        framebuf.buf[:] = fill * len(framebuf.buf)
+
+    # mask -> translation table that sets (OR) or clears (AND NOT) the masked bits of a byte
+    _set_tables = {}
+    _clear_tables = {}
+
+    @staticmethod
+    def _table(mask, color):
+        tables = MVLSBFormat._set_tables if color else MVLSBFormat._clear_tables
+        table = tables.get(mask)
+        if table is None:
+            if color:
+                table = bytes(value | mask for value in range(256))
+            else:
+                table = bytes(value & ~mask & 0xFF for value in range(256))
+            tables[mask] = table
+        return table
 
     @staticmethod
     def fill_rect(framebuf: 'FrameBuffer', x, y, width, height, color):
         """Draw a rectangle at the given location, size and color. The ``fill_rect`` method draws
-        both the outline and interior."""
+        both the outline and interior. Pages covered by all 8 rows are written as whole bytes,
+        the partial top and bottom pages are masked with a translation table."""
         # pylint: disable=too-many-arguments
-        while height > 0:
-            index = (y >> 3) * framebuf.stride + x
-            offset = y & 0x07
-            for w_w in range(width):
-                framebuf.buf[index + w_w] = (
-                    framebuf.buf[index + w_w] & ~(0x01 << offset)
-                ) | ((color != 0) << offset)
-            y += 1
-            height -= 1
+        if width < 1 or height < 1:
+            return
+        buf = framebuf.buf
+        y_end = y + height
+        full = (b"\xff" if color else b"\x00") * width
+
+        for page in range(y >> 3, ((y_end - 1) >> 3) + 1):
+            page_top = page << 3
+            top = max(y, page_top) - page_top
+            bottom = min(y_end, page_top + 8) - page_top
+            mask = ((1 << bottom) - 1) & ~((1 << top) - 1)
+
+            index = page * framebuf.stride + x
+            if mask == 0xFF:
+                buf[index : index + width] = full
+            elif width <= 8:
+                # a table lookup does not pay off for a few bytes (e.g. pixels)
+                for i in range(index, index + width):
+                    buf[i] = buf[i] | mask if color else buf[i] & ~mask
+            else:
+                buf[index : index + width] = bytes(buf[index : index + width]).translate(
+                    MVLSBFormat._table(mask, color)
+                )
 
 
 class RGB565Format:
@@ -435,6 +457,13 @@ class FrameBuffer:
     def line(self, x_0, y_0, x_1, y_1, color):
         # pylint: disable=too-many-arguments
         """Bresenham's line algorithm"""
+        # horizontal and vertical lines are filled rectangles
+        if y_0 == y_1:
+            self.hline(min(x_0, x_1), y_0, abs(x_1 - x_0) + 1, color)
+            return
+        if x_0 == x_1:
+            self.vline(x_0, min(y_0, y_1), abs(y_1 - y_0) + 1, color)
+            return
         d_x = abs(x_1 - x_0)
         d_y = abs(y_1 - y_0)
         x, y = x_0, y_0
@@ -559,9 +588,13 @@ class FrameBuffer:
 # Author: Tony DiCola
 # License: MIT License (https://opensource.org/licenses/MIT)
 class BitmapFont:
-    """A helper class to read binary font tiles and 'seek' through them as a
-    file to display in a framebuffer. We use file access so we dont waste 1KB
-    of RAM on a font!"""
+    """A helper class to read binary font tiles and draw them into a framebuffer.
+    The font file is read once and its glyphs are shared by all instances, so
+    drawing text does no file access (a 5x8 font costs about 1.3KB of RAM)."""
+
+    # font_name -> (font_width, font_height, glyphs). Every glyph holds one
+    # MVLSB byte per pixel column, bit 0 is the top row.
+    _cache = {}
 
     def __init__(self, font_name="font5x8.bin"):
         # Specify the drawing area width and height, and the pixel function to
@@ -576,31 +609,37 @@ class BitmapFont:
         #            data (i.e. a 5x8 font has 5 bytes per character).
         self.font_name = font_name
 
-        # Open the font file and grab the character width and height values.
+        if font_name not in BitmapFont._cache:
+            BitmapFont._cache[font_name] = self._load(font_name)
+        self.font_width, self.font_height, self._glyphs = BitmapFont._cache[font_name]
+
+    @staticmethod
+    def _load(font_name):
+        """Read the font file and split it into one bytes object per character."""
         # Note that only fonts up to 8 pixels tall are currently supported.
         try:
-            self._font = open(  # pylint: disable=consider-using-with
-                self.font_name, "rb"
-            )
-            self.font_width, self.font_height = struct.unpack("BB", self._font.read(2))
-            # simple font file validation check based on expected file size
-            if 2 + 256 * self.font_width != os.stat(font_name)[6]:
-                raise RuntimeError("Invalid font file: " + font_name)
+            with open(font_name, "rb") as font_file:
+                data = font_file.read()
         except OSError:
-            get_logger().error("Could not find font file", font_name)
+            get_logger().error(f"Could not find font file {font_name}")
             raise
-        except OverflowError:
-            # os.stat can throw this on boards without long int support
-            # just hope the font file is valid and press on
-            pass
+
+        font_width, font_height = struct.unpack("BB", data[:2])
+        # simple font file validation check based on expected file size
+        if 2 + 256 * font_width != len(data):
+            raise RuntimeError("Invalid font file: " + font_name)
+
+        glyphs = tuple(
+            data[2 + index * font_width : 2 + (index + 1) * font_width]
+            for index in range(256)
+        )
+        return font_width, font_height, glyphs
 
     def deinit(self):
-        """Close the font file as cleanup."""
-        self._font.close()
+        """Nothing to clean up. The font data is cached in memory."""
 
     def __enter__(self):
-        """Initialize/open the font file"""
-        self.__init__()
+        """Initialize the font"""
         return self
 
     def __exit__(self, exception_type, exception_value, traceback):
@@ -611,19 +650,22 @@ class BitmapFont:
         self, char, x, y, framebuffer, color, size=1
     ):  # pylint: disable=too-many-arguments
         """Draw one character at position (x,y) to a framebuffer in a given color"""
+        code = ord(char)
+        if code > 255:
+            return  # character isnt there
+        glyph = self._glyphs[code]
+
+        if (
+            size <= 1
+            and framebuffer.rotation == 0
+            and isinstance(framebuffer.format, MVLSBFormat)
+        ):
+            self._draw_glyph_mvlsb(glyph, x, y, framebuffer, color)
+            return
+
         size = max(size, 1)
-        # Don't draw the character if it will be clipped off the visible area.
-        # if x < -self.font_width or x >= framebuffer.width or \
-        #   y < -self.font_height or y >= framebuffer.height:
-        #    return
         # Go through each column of the character.
-        for char_x in range(self.font_width):
-            # Grab the byte for the current column of font data.
-            self._font.seek(2 + (ord(char) * self.font_width) + char_x)
-            try:
-                line = struct.unpack("B", self._font.read(1))[0]
-            except RuntimeError:
-                continue  # maybe character isnt there? go to next
+        for char_x, line in enumerate(glyph):
             # Go through each row in the column byte.
             for char_y in range(self.font_height):
                 # Draw a pixel for each bit that's flipped on.
@@ -632,6 +674,38 @@ class BitmapFont:
                         x + char_x * size, y + char_y * size, size, size, color
                     )
 
+    @staticmethod
+    def _draw_glyph_mvlsb(glyph, x, y, framebuffer, color):
+        """Draw the column bytes of a glyph into an unrotated MVLSB buffer.
+        Each column touches at most two pages, which are OR-ed (color) or
+        AND-ed (no color) with the column shifted to the y offset."""
+        # pylint: disable=too-many-arguments
+        buf = framebuffer.buf
+        stride = framebuffer.stride
+        width = framebuffer.width
+        height = framebuffer.height
+
+        for page in (y >> 3, (y >> 3) + 1):
+            page_top = page << 3
+            if page < 0 or page_top >= height:
+                continue
+            shift = y - page_top
+
+            # rows of this page that exist on the display
+            mask = 0xFF if page_top + 8 <= height else (1 << (height - page_top)) - 1
+
+            index = page * stride
+            for column_x, line in enumerate(glyph, x):
+                if column_x < 0 or column_x >= width:
+                    continue
+                bits = ((line << shift) if shift >= 0 else (line >> -shift)) & mask
+                if not bits:
+                    continue
+                if color:
+                    buf[index + column_x] |= bits
+                else:
+                    buf[index + column_x] &= ~bits & 0xFF
+
     def width(self, text):
         """Return the pixel width of the specified text message."""
         return len(text) * (self.font_width + 1)
@@ -639,3 +713,106 @@ class BitmapFont:
 
 class FrameBuffer1(FrameBuffer):  # pylint: disable=abstract-method
     """FrameBuffer1 object. Inherits from FrameBuffer."""
+
+
+if __name__ == "__main__":
+
+    # Benchmark: text() calls per second with the font read from the file per column
+    # (like before) vs. the cached glyphs drawn as masked column bytes
+    import time
+
+    class FileBitmapFont(BitmapFont):
+        """Draws like the former BitmapFont: one seek and read per glyph column and one fill_rect per pixel"""
+
+        def __init__(self, font_name="font5x8.bin"):
+            super().__init__(font_name)
+            self._font = open(font_name, "rb")  # pylint: disable=consider-using-with
+
+        def draw_char(self, char, x, y, framebuffer, color, size=1):  # pylint: disable=too-many-arguments
+            for char_x in range(self.font_width):
+                self._font.seek(2 + (ord(char) * self.font_width) + char_x)
+                line = struct.unpack("B", self._font.read(1))[0]
+                for char_y in range(self.font_height):
+                    if (line >> char_y) & 0x1:
+                        framebuffer.fill_rect(x + char_x * size, y + char_y * size, size, size, color)
+
+    LINES = [("Geraete Info", 8, 3), ("Modul Config Anzeigen", 8, 16), ("System Einstellungen", 8, 29), ("Abbr  Okay", 10, 50)]
+    CALLS = 2000
+
+    def measure(font):
+        framebuffer = FrameBuffer(bytearray(128 * 64 // 8), 128, 64, MVLSB)
+        framebuffer._font = font  # pylint: disable=protected-access
+        start = time.perf_counter()
+        for call in range(CALLS):
+            text, x, y = LINES[call % len(LINES)]
+            framebuffer.text(text, x, y, call % 2)
+        duration = time.perf_counter() - start
+
+        # one screen with white and inverted text to compare both renderers
+        framebuffer.fill(0)
+        framebuffer.fill_rect(0, 26, 128, 14, 1)
+        for text, x, y in LINES:
+            framebuffer.text(text, x, y, 0 if y == 29 else 1)
+        framebuffer.text("Rand", 110, 60, 1)
+        return CALLS / duration, bytes(framebuffer.buf)
+
+    before, expected = measure(FileBitmapFont())
+    after, result = measure(BitmapFont())
+    assert result == expected, "cached glyphs draw different pixels"
+
+    print(f"file per column: {before:8.0f} text() calls/s")
+    print(f"cached glyphs:   {after:8.0f} text() calls/s ({after / before:.1f}x)")
+
+    # Benchmark: menu frames per second (fill, highlight bar, markers, lines and text like Menu._draw)
+    # with the former per byte fill and per row fill_rect vs. slice assignment
+    class RowMVLSBFormat(MVLSBFormat):
+        """Fills like the former MVLSBFormat: byte by byte and one read-modify-write per row and column"""
+
+        @staticmethod
+        def fill(framebuf, color):
+            for i in range(len(framebuf.buf)):  # pylint: disable=consider-using-enumerate
+                framebuf.buf[i] = 0xFF if color else 0x00
+
+        @staticmethod
+        def fill_rect(framebuf, x, y, width, height, color):  # pylint: disable=too-many-arguments
+            while height > 0:
+                index = (y >> 3) * framebuf.stride + x
+                offset = y & 0x07
+                for w_w in range(width):
+                    framebuf.buf[index + w_w] = (framebuf.buf[index + w_w] & ~(0x01 << offset)) | ((color != 0) << offset)
+                y += 1
+                height -= 1
+
+    ITEMS = ["Geraete Info", "Modul Config Anzeigen", "System Einstellungen", "Neustart", "Display aus", "Info"]
+    FRAMES = 300
+
+    def draw_menu(framebuffer, pointer):
+        framebuffer.fill(0)
+        for index, name in enumerate(ITEMS):
+            row_top = index * 12 - 2
+            color = 0 if index == pointer else 1
+            if index == pointer:
+                framebuffer.fill_rect(0, row_top, framebuffer.width, 12, 1)
+            if index % 2:
+                framebuffer.line(2, row_top + 5, 5, row_top + 5, color)
+            else:
+                framebuffer.fill_rect(3, row_top + 4, 2, 2, color)
+            framebuffer.text(name, 8, row_top + 2, color)
+        framebuffer.vline(126, 0, 64, 1)
+
+    def measure_menu(buf_format):
+        framebuffer = FrameBuffer(bytearray(128 * 64 // 8), 128, 64, MVLSB)
+        framebuffer.format = buf_format
+        start = time.perf_counter()
+        for frame in range(FRAMES):
+            draw_menu(framebuffer, frame % len(ITEMS))
+        duration = time.perf_counter() - start
+        draw_menu(framebuffer, 2)
+        return FRAMES / duration, bytes(framebuffer.buf)
+
+    before, expected = measure_menu(RowMVLSBFormat())
+    after, result = measure_menu(MVLSBFormat())
+    assert result == expected, "slice fills draw different pixels"
+
+    print(f"per row fills:   {before:8.0f} menu frames/s")
+    print(f"slice fills:     {after:8.0f} menu frames/s ({after / before:.1f}x)")
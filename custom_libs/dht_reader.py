@@ -2,9 +2,12 @@
 # -*- coding: utf8 -*-
 
 import atexit
+import threading
 import time
 import pigpio
 
+from abstract_base_classes.gpio_backend import GPIOBackend
+
 
 class DHTSensor:
    """
@@ -33,7 +36,7 @@ class DHTSensor:
    gpio ------------+
    """
 
-   def __init__(self, pi: pigpio.pi, gpio, LED=None, power=None):
+   def __init__(self, pi: GPIOBackend, gpio, LED=None, power=None):
       """
       Instantiate with the Pi and gpio to which the DHT22 output
       pin is connected.
@@ -78,6 +81,14 @@ class DHTSensor:
 
       self.tov = None
 
+      # Completion of the last trigger().
+      self.ready = threading.Event()
+      self.ready.set()
+      self.read_ok = False
+      self.read_time = None  # Seconds from trigger() to completion.
+      self._trigger_time = None
+      self._callback = None
+
       self.high_tick = 0
       self.bit = 40
 
@@ -138,10 +149,14 @@ class DHTSensor:
                   if self.LED is not None:
                      self.pi.write(self.LED, 0)
 
+                  self._complete(True)
+
                else:
 
                   self.bad_CS += 1
 
+                  self._complete(False)
+
          elif self.bit >= 24:  # in temp low byte
             self.tL = (self.tL << 1) + val
 
@@ -177,6 +192,7 @@ class DHTSensor:
             if self.no_response > self.MAX_NO_RESPONSE:
                self.no_response = 0
                self.bad_SR += 1  # Bump sensor reset count.
+               self._complete(False)  # Do not wait for the power cycle.
                if self.power is not None:
                   self.powered = False
                   self.pi.write(self.power, 0)
@@ -191,6 +207,23 @@ class DHTSensor:
          else:                  # Full message received.
             self.no_response = 0
 
+         self._complete(False)
+
+   def _complete(self, ok):
+      """
+      Finish the reading started by trigger() once. Sets the ready
+      event and calls the callback given to trigger().
+      """
+      if self.ready.is_set():
+         return
+
+      self.read_ok = ok
+      self.read_time = time.monotonic() - self._trigger_time
+      self.ready.set()
+
+      if self._callback is not None:
+         self._callback(self, ok)
+
    def temperature(self):
       """Return current temperature."""
       return self.temp
@@ -222,8 +255,26 @@ class DHTSensor:
       """Return count of power cycles because of sensor hangs."""
       return self.bad_SR
 
-   def trigger(self):
-      """Trigger a new relative humidity and temperature reading."""
+   def trigger(self, callback=None):
+      """
+      Trigger a new relative humidity and temperature reading.
+
+      Returns a threading.Event that is set as soon as the 40th bit
+      arrived or the watchdog gave up.  The optional callback is then
+      called with this sensor and True for a reading with a good
+      checksum.  It runs on the pigpio callback thread.  A reading
+      that is still running is completed as failed first.
+      """
+      # Stop the previous reading, so its watchdog or its last bits
+      # do not complete this one with stale data.
+      self.pi.set_watchdog(self.gpio, 0)
+      self.bit = 40
+      self._complete(False)
+
+      self.ready = threading.Event()
+      self._callback = callback
+      self._trigger_time = time.monotonic()
+
       if self.powered:
          if self.LED is not None:
             self.pi.write(self.LED, 1)
@@ -233,6 +284,11 @@ class DHTSensor:
          self.pi.set_mode(self.gpio, pigpio.INPUT)
          self.pi.set_watchdog(self.gpio, 200)
 
+      else:
+         self._complete(False)
+
+      return self.ready
+
    def isValid(self):
       """Checks the last readings vor plausibility."""
       return -40 <= self.temperature() <= 80 and 0 <= self.humidity() <= 99,9
@@ -0,0 +1,255 @@
+"""
+`dirty_region`
+====================================================
+
+Dirty region tracking for page based monochrome displays (SSD1306, SH1106).
+
+The display RAM of these controllers is organised in pages of 8 pixel rows with one
+byte per column, the same layout as the MVLSB FrameBuffer format. For every page the
+range of columns drawn since the last show() is recorded, so show() can send only
+these windows instead of the whole frame.
+
+Redrawing a screen often marks more than it changes (clear and repaint the same text).
+A shadow copy of the last frame sent to the panel is therefore compared with the dirty
+part of the frame and only the column runs that really differ are sent.
+The payload bytes are published as 'display.frame_bytes' (last show) and
+'display.sent_bytes' (total) on Metrics.
+"""
+
+from core.metrics import Metrics
+
+
+class DirtyRegion:
+    """Mixin for MVLSB FrameBuffer displays. Has to come before FrameBuffer in the bases.
+
+    Every FrameBuffer drawing method marks the area it touched. Code that writes to
+    ``buf`` directly has to call ``mark_dirty()`` or ``mark_all_dirty()`` itself.
+    """
+
+    def init_dirty_region(self, pages, columns, transposed=False):
+        """Has to be called before the first drawing.
+
+        :param pages: Number of pages of the display RAM.
+        :param columns: Number of columns of the display RAM.
+        :param transposed: The FrameBuffer renders the panel turned by 90 degrees (SH1106 rotate90):
+                           a buffer column x is in page x // 8 and a buffer row y is column y.
+        """
+        self._dirty_pages = pages
+        self._dirty_columns = columns
+        self._dirty_transposed = transposed
+        # first and last changed column per page. start > end means the page is clean
+        self._dirty_start = [columns] * pages
+        self._dirty_end = [-1] * pages
+        self._shadow = None  # last frame sent to the panel, None if the panel content is unknown
+        self.mark_all_dirty()
+
+    def invalidate_shadow(self):
+        """The next show() sends the whole frame without comparing, e.g. after a remap of the panel."""
+        self._shadow = None
+        self.mark_all_dirty()
+
+    def mark_all_dirty(self):
+        """The next show() sends the whole frame."""
+        self._dirty_start[:] = [0] * self._dirty_pages
+        self._dirty_end[:] = [self._dirty_columns - 1] * self._dirty_pages
+
+    def dirty_pages(self):
+        """Pages with changes since the last show()."""
+        return [
+            page
+            for page, (x_0, x_1) in enumerate(zip(self._dirty_start, self._dirty_end))
+            if x_0 <= x_1
+        ]
+
+    def mark_dirty(self, x, y, width, height):
+        """Mark a rectangle given in the coordinates of the current rotation as changed."""
+        # pylint: disable=too-many-arguments
+        if self.rotation == 1:
+            x, y = y, x
+            width, height = height, width
+            x = self.width - x - width
+        if self.rotation == 2:
+            x = self.width - x - width
+            y = self.height - y - height
+        if self.rotation == 3:
+            x, y = y, x
+            width, height = height, width
+            y = self.height - y - height
+
+        x_end = min(self.width, x + width) - 1
+        y_end = min(self.height, y + height) - 1
+        x = max(x, 0)
+        y = max(y, 0)
+        if x > x_end or y > y_end:
+            return
+        if self._dirty_transposed:
+            x, y, x_end, y_end = y, x, y_end, x_end
+
+        start, end = self._dirty_start, self._dirty_end
+        for page in range(y >> 3, (y_end >> 3) + 1):
+            if x < start[page]:
+                start[page] = x
+            if x_end > end[page]:
+                end[page] = x_end
+
+    def pop_changed_windows(self, frame, gap_bytes=0, merge_bytes=0):
+        """Return the windows that differ from the last sent frame and mark the frame as clean.
+        The shadow is updated, so the windows have to be sent.
+
+        :param frame: Buffer in the layout of the display RAM, one byte per column and page.
+        :param gap_bytes: Changed runs of a page are joined if at most this many unchanged
+                          bytes are between them. Worth it when every write costs commands.
+        :param merge_bytes: Runs on neighbouring pages are joined to one window if the union of
+                            their column ranges adds at most this many unchanged bytes.
+        :return: List of (first page, last page, first column, last column), all inclusive.
+        """
+        # pylint: disable=too-many-locals
+        columns = self._dirty_columns
+        shadow = self._shadow
+        windows = []
+        single_run_page = None  # last page sent as a single run, only these can grow downwards
+        sent = 0
+        start, end = self._dirty_start, self._dirty_end
+        for page in range(self._dirty_pages):
+            x_0, x_1 = start[page], end[page]
+            if x_0 > x_1:
+                continue
+            offset = page * columns
+            current = bytes(frame[offset + x_0 : offset + x_1 + 1])
+
+            if shadow is None:
+                runs = [(x_0, x_1)]
+            else:
+                previous = shadow[offset + x_0 : offset + x_1 + 1]
+                if current == previous:
+                    continue
+                changed = [
+                    x_0 + i for i, (a, b) in enumerate(zip(current, previous)) if a != b
+                ]
+                runs = []
+                run_start = run_end = changed[0]
+                for x in changed[1:]:
+                    if x - run_end - 1 > gap_bytes:
+                        runs.append((run_start, run_end))
+                        run_start = x
+                    run_end = x
+                runs.append((run_start, run_end))
+                shadow[offset + x_0 : offset + x_1 + 1] = current
+
+            for r_0, r_1 in runs:
+                sent += r_1 - r_0 + 1
+            if len(runs) == 1 and single_run_page == page - 1:
+                r_0, r_1 = runs[0]
+                page_0, _, w_0, w_1 = windows[-1]
+                u_0, u_1 = min(w_0, r_0), max(w_1, r_1)
+                added = (u_1 - u_0 + 1) * (page - page_0 + 1) - (w_1 - w_0 + 1) * (page - page_0)
+                if added - (r_1 - r_0 + 1) <= merge_bytes:
+                    sent += added - (r_1 - r_0 + 1)
+                    windows[-1] = (page_0, page, u_0, u_1)
+                    single_run_page = page
+                    continue
+            single_run_page = page if len(runs) == 1 else None
+            windows.extend((page, page, r_0, r_1) for r_0, r_1 in runs)
+
+        if shadow is None:
+            self._shadow = bytearray(frame[: self._dirty_pages * columns])
+        self._dirty_start[:] = [columns] * self._dirty_pages
+        self._dirty_end[:] = [-1] * self._dirty_pages
+
+        Metrics().set("display.frame_bytes", sent)
+        Metrics().increment("display.sent_bytes", sent)
+        return windows
+
+    def pixel(self, x, y, color=None):
+        """See FrameBuffer.pixel(). Setting a pixel marks it as changed."""
+        if color is None:
+            return super().pixel(x, y)
+        super().pixel(x, y, color)
+        self.mark_dirty(x, y, 1, 1)
+        return None
+
+    def rect(self, x, y, width, height, color, *, fill=False):
+        """See FrameBuffer.rect(). Also covers fill_rect(), hline() and vline()."""
+        # pylint: disable=too-many-arguments
+        super().rect(x, y, width, height, color, fill=fill)
+        self.mark_dirty(x, y, width, height)
+
+    def fill(self, color):
+        """See FrameBuffer.fill()."""
+        super().fill(color)
+        self.mark_all_dirty()
+
+    def scroll(self, delta_x, delta_y):
+        """See FrameBuffer.scroll()."""
+        super().scroll(delta_x, delta_y)
+        self.mark_all_dirty()
+
+    def text(self, string, x, y, color, *, font_name="font5x8.bin", size=1):
+        """See FrameBuffer.text(). The glyphs are written to the buffer directly."""
+        # pylint: disable=too-many-arguments
+        super().text(string, x, y, color, font_name=font_name, size=size)
+        if self._font is None:
+            return
+        width = self._font.font_width
+        height = self._font.font_height
+        for chunk in string.split("\n"):
+            self.mark_dirty(x, y, len(chunk) * (width + 1) * size, height * size)
+            y += height * size
+
+    def image(self, img):
+        """See FrameBuffer.image()."""
+        super().image(img)
+        self.mark_all_dirty()
+
+
+if __name__ == "__main__":
+
+    # Bytes on the I2C bus per show() in Horizontal Addressing Mode for two typical redraws:
+    # the CPU temperature line of the system info screen and a menu that is cleared and
+    # repainted with the cursor one line further down.
+    # Every I2C transaction costs the address byte, every command is its own 2 byte transaction.
+    import random
+    from custom_libs.adafruit_framebuf import FrameBuffer, MVLSB
+
+    WINDOW = 6 * 3 + 2  # addressing commands plus the address and control byte of the data
+
+    class Display(DirtyRegion, FrameBuffer):
+        def __init__(self):
+            super().__init__(bytearray(128 * 8), 128, 64, MVLSB)
+            self.init_dirty_region(8, 128)
+
+        def dirty_bytes(self):
+            """Bytes the dirty windows alone would send"""
+            return sum(
+                WINDOW + x_1 - x_0 + 1
+                for x_0, x_1 in zip(self._dirty_start, self._dirty_end)
+                if x_0 <= x_1
+            )
+
+        def show(self):
+            return sum(
+                WINDOW + (p_1 - p_0 + 1) * (x_1 - x_0 + 1)
+                for p_0, p_1, x_0, x_1 in self.pop_changed_windows(self.buf, WINDOW, WINDOW)
+            )
+
+    def system_info(display, step):
+        display.fill_rect(0, 20, 128, 8, 0)
+        display.text(f"CPU: {random.uniform(40, 60):.1f} C", 0, 20, 1)
+
+    def menu(display, step):
+        display.fill(0)
+        for line, label in enumerate(("Geraete Info", "Modul Config", "System", "Neustart", "Zurueck")):
+            display.text(("> " if line == step % 5 else "  ") + label, 0, line * 10, 1)
+
+    frames = 100
+    for name, draw in (("system info", system_info), ("menu", menu)):
+        display = Display()
+        draw(display, -1)
+        display.show()
+        dirty = sent = 0
+        for step in range(frames):
+            draw(display, step)
+            dirty += display.dirty_bytes()
+            sent += display.show()
+        print(f"{name:12} whole frame: {WINDOW + 128 * 8} bytes/show, "
+              f"dirty windows: {dirty / frames:.0f} bytes/show, changed runs: {sent / frames:.0f} bytes/show")
@@ -0,0 +1,163 @@
+"""
+`fake_bus`
+====================================================
+
+Stand-ins for busio.I2C, busio.SPI and the display pins to run the display drivers without
+hardware (DISPLAY_TYPE=SIMULATED_... of the SystemUI). Nothing is sent anywhere, the transactions
+and bytes are counted so the time on a real bus can be estimated with bus_time(). With
+record=True the payload of every transaction is kept in ``written`` as well.
+"""
+
+
+class FakeBus:
+    """Lock and counters shared by FakeI2C and FakeSPI"""
+
+    BITS_PER_BYTE = 8
+    BITS_PER_TRANSACTION = 0
+
+    def __init__(self, frequency, record=False):
+        self.frequency = frequency
+        self.record = record
+        self.transactions = 0
+        self.bytes = 0
+        self.written = []
+        self._locked = False
+
+    def try_lock(self):
+        if self._locked:
+            return False
+        self._locked = True
+        return True
+
+    def unlock(self):
+        self._locked = False
+
+    def deinit(self):
+        pass
+
+    def reset_counters(self):
+        self.transactions = 0
+        self.bytes = 0
+        self.written = []
+
+    def bus_time(self):
+        """Seconds the counted transactions take on a real bus at self.frequency"""
+        bits = self.bytes * self.BITS_PER_BYTE + self.transactions * self.BITS_PER_TRANSACTION
+        return bits / self.frequency
+
+    def _count(self, buffer, start, end):
+        data = memoryview(buffer)[start:end]
+        self.transactions += 1
+        self.bytes += len(data)
+        if self.record:
+            self.written.append(bytes(data))
+
+
+class FakeI2C(FakeBus):
+    """busio.I2C without a bus. Every byte has an ACK bit and every transaction an address byte."""
+
+    BITS_PER_BYTE = 9
+    BITS_PER_TRANSACTION = 9 + 2  # address byte, start and stop condition
+
+    def __init__(self, frequency=400000, record=False):
+        super().__init__(frequency, record)
+
+    def scan(self):
+        return []
+
+    def writeto(self, address, buffer, *, start=0, end=None, stop=True):
+        # pylint: disable=unused-argument
+        self._count(buffer, start, end)
+
+    def readfrom_into(self, address, buffer, *, start=0, end=None, stop=True):
+        # pylint: disable=unused-argument
+        self._count(buffer, start, end)
+
+
+class FakeSPI(FakeBus):
+    """busio.SPI without a bus"""
+
+    def __init__(self, frequency=8000000, record=False):
+        super().__init__(frequency, record)
+
+    def configure(self, *, baudrate=100000, polarity=0, phase=0, bits=8):
+        # pylint: disable=unused-argument
+        pass
+
+    def write(self, buffer, *, start=0, end=None):
+        self._count(buffer, start, end)
+
+
+class FakePin:
+    """A pin for digitalio.DigitalInOut users (SSD1306) and machine.Pin users (SH1106, PinAdapter)"""
+
+    OUT = 1
+
+    def __init__(self):
+        self.value = 0
+
+    def switch_to_output(self, value=False, drive_mode=None):
+        # pylint: disable=unused-argument
+        self.value = value
+
+    def init(self, mode=None, value=None):
+        # pylint: disable=unused-argument
+        if value is not None:
+            self.value = value
+
+    def __call__(self, value=None):
+        if value is None:
+            return self.value
+        self.value = value
+        return None
+
+
+if __name__ == "__main__":
+
+    # Benchmark: show() latency of the display drivers on fake buses and the bus time the
+    # same show() costs on a real bus. Three redraws: a menu repainted with the cursor one line
+    # further, the CPU temperature line of the system info screen and a show() without changes.
+    import time
+    from custom_libs.adafruid_ssd1306 import SSD1306_I2C, SSD1306_SPI
+    from custom_libs.SH1106.sh1106 import SH1106_I2C, SH1106_SPI
+
+    ROUNDS = 200
+
+    def menu(display, step):
+        display.fill(0)
+        for line, label in enumerate(("Geraete Info", "Modul Config", "System", "Neustart", "Zurueck")):
+            if line == step % 5:
+                display.fill_rect(0, line * 12, 128, 12, 1)
+            display.text(label, 8, line * 12 + 2, 0 if line == step % 5 else 1)
+
+    def cpu_line(display, step):
+        display.fill_rect(0, 50, 128, 10, 0)
+        display.text(f"CPU Temp: {40 + step % 20:.2f}'C", 0, 50, 1)
+
+    def unchanged(display, step):
+        pass
+
+    displays = (
+        ("SSD1306_I2C", FakeI2C, lambda bus: SSD1306_I2C(128, 64, bus)),
+        ("SSD1306_I2C page", FakeI2C, lambda bus: SSD1306_I2C(128, 64, bus, page_addressing=True)),
+        ("SSD1306_SPI", FakeSPI, lambda bus: SSD1306_SPI(128, 64, bus, FakePin(), None, FakePin())),
+        ("SH1106_I2C", FakeI2C, lambda bus: SH1106_I2C(128, 64, bus)),
+        ("SH1106_I2C rotate90", FakeI2C, lambda bus: SH1106_I2C(128, 64, bus, rotate=90)),
+        ("SH1106_SPI", FakeSPI, lambda bus: SH1106_SPI(128, 64, bus, FakePin(), cs=FakePin())),
+    )
+
+    for name, bus_type, create in displays:
+        bus = bus_type()
+        display = create(bus)
+        for redraw in (menu, cpu_line, unchanged):
+            redraw(display, 0)
+            display.show()
+            bus.reset_counters()
+            duration = 0.0
+            for step in range(1, ROUNDS + 1):
+                redraw(display, step)
+                start = time.perf_counter()
+                display.show()
+                duration += time.perf_counter() - start
+            print(f"{name:20} {redraw.__name__:10} show() {duration / ROUNDS * 1e6:7.0f} us "
+                  f"{bus.bytes / ROUNDS:6.0f} bytes {bus.bus_time() / ROUNDS * 1000:6.2f} ms on the bus")
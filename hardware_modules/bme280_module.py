@@ -3,8 +3,6 @@
 
 import time
 from typing import Union
-import board
-import busio
 
 from adafruit_bme280 import basic as adafruit_bme280
 
@@ -20,7 +18,6 @@ from core.lokal_db import LokalDB
 class BME280ReadingModule(ModuleBase):
     def __init__(self, config: ModuleConfig):
         self.config = config
-        self.next_time = time.time()
 
         try:
             self.bme280 = adafruit_bme280.Adafruit_BME280_I2C(IO().get_i2c(), address=0x76)
@@ -45,10 +42,6 @@ class BME280ReadingModule(ModuleBase):
 
     def tick(self):
 
-        now = time.time()
-
-        if self.next_time > now: return
-
         sensorValues = []
         for sensor in self.config.get_sensors():
 
@@ -71,7 +64,6 @@ class BME280ReadingModule(ModuleBase):
                 })
 
         self.db.safe_sensor_readings(sensorValues)
-        self.next_time += self.config.get_interval()
 
 
     def on_destroy(self):
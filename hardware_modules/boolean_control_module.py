@@ -22,7 +22,7 @@ class BooleanControlModule(ModuleBase):
 
         self.topic = f"/module/{self.module_config.get_id()}"
         self.mqtt_client = MQTTClient()
-        self.pi = IO().get_pigpio()
+        self.pi = IO().get_gpio()
 
         self.pin1 =  map_gpio_for(self.module_config.get_pin_by_key('PIN1'))
         if self.pin1: self.pi.set_mode(self.pin1, pigpio.OUTPUT)
@@ -19,9 +19,8 @@ from core.lokal_db import LokalDB
 class BooleanReadingModule(ModuleBase):
     def __init__(self, module_config: ModuleConfig):
         self.module_config = module_config
-        self.next_time = time.time()
         self.gpio_number = map_gpio_for(module_config.get_pin_by_key('PIN'))
-        self.pi = IO().get_pigpio()
+        self.pi = IO().get_gpio()
         self.pi.set_mode(self.gpio_number, pigpio.INPUT)
         self.db = LokalDB()
 
@@ -34,10 +33,6 @@ class BooleanReadingModule(ModuleBase):
 
     def tick(self):
 
-        now = time.time()
-
-        if self.next_time > now: return
-
         sensor = self.module_config.get_sensors()[0]
 
         sensorValues = [{
@@ -46,7 +41,6 @@ class BooleanReadingModule(ModuleBase):
         }]
 
         self.db.safe_sensor_readings(sensorValues)
-        self.next_time += self.module_config.get_interval()
 
 
     def _get_current_value(self) -> int:
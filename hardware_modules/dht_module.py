@@ -16,13 +16,13 @@ from helper.pin_to_gpio import map_gpio_for
 from core.logger import get_logger
 from core.io import IO
 from core.lokal_db import LokalDB
+from core.metrics import Metrics
 
 
 class DHTReadingModule(ModuleBase):
     def __init__(self, module_config: ModuleConfig):
         self.module_config = module_config
-        self.dht = DHTSensor(IO().get_pigpio(), map_gpio_for(module_config.get_pin_by_key('PIN')))
-        self.next_time = time.time()
+        self.dht = DHTSensor(IO().get_gpio(), map_gpio_for(module_config.get_pin_by_key('PIN')))
         self.db = LokalDB()
 
     def get_config(self) -> ModuleConfig:
@@ -32,33 +32,45 @@ class DHTReadingModule(ModuleBase):
         self.module_config = module_config
 
     def tick(self):
+        # the reading is stored by the callback as soon as the sensor answered. no need to wait here
+        self.dht.trigger(self.__store_reading)
 
-        now = time.time()
-
-        if self.next_time > now: return
-
-        self.dht.trigger()
-        time.sleep(0.5)
-
-        sensorValues = []
-        for sensor in self.module_config.get_sensors():
-
-            if sensor.is_type("Temperatur"):
-                sensorValues.append({
-                    "sensorId": sensor.get_id(),
-                    "value": round(self.dht.temperature(), 2)
-                })
-            if sensor.is_type("Relative Luftfeuchtigkeit"):
-                sensorValues.append({
-                    "sensorId": sensor.get_id(),
-                    "value": round(self.dht.humidity(), 2)
-                })
-
-        self.db.safe_sensor_readings(sensorValues)
-        self.next_time += self.module_config.get_interval()
+    def __store_reading(self, dht: DHTSensor, ok: bool):
+        # runs on the pigpio callback thread. pigpio does not catch exceptions of callbacks, an uncaught one (e.g. a
+        # sqlite3.Error of a full SD card) would stop that thread and with it every gpio callback of the process
+        try:
+            module_id = self.module_config.get_id()
+            metrics = Metrics()
+            metrics.set(f"modules.{module_id}.dht_read_seconds", dht.read_time)
+            metrics.set(f"modules.{module_id}.dht_bad_checksum", dht.bad_checksum())
+            metrics.set(f"modules.{module_id}.dht_short_message", dht.short_message())
+            metrics.set(f"modules.{module_id}.dht_missing_message", dht.missing_message())
+            metrics.set(f"modules.{module_id}.dht_sensor_resets", dht.sensor_resets())
+
+            if not ok:
+                get_logger().warning(f"DHT module id {module_id} got no valid reading")
+                return
+
+            sensorValues = []
+            for sensor in self.module_config.get_sensors():
+
+                if sensor.is_type("Temperatur"):
+                    sensorValues.append({
+                        "sensorId": sensor.get_id(),
+                        "value": round(dht.temperature(), 2)
+                    })
+                if sensor.is_type("Relative Luftfeuchtigkeit"):
+                    sensorValues.append({
+                        "sensorId": sensor.get_id(),
+                        "value": round(dht.humidity(), 2)
+                    })
+
+            self.db.safe_sensor_readings(sensorValues)
+        except Exception as error:
+            get_logger().error(f"Error on storing the DHT reading of module id: {self.module_config.get_id()}: {error}")
 
     def on_destroy(self):
-        pass
+        self.dht.cancel()
 
 if __name__ == "__main__":
 
@@ -1,18 +1,16 @@
 #!/usr/bin/python3
 # -*- coding: utf8 -*-
 
-import threading
 import time
 from typing import Callable
 
-import adafruit_ssd1306
-
 from abstract_base_classes.module_base import ModuleBase
 from entities.config_entity import ModuleConfig
 
 from core.logger import get_logger
 from entities.job_config_entity import JobEntity
 from core.mqtt_client import MQTTClient
+from core.timer_service import TimerService
 from system_ui.system_ui import SystemUI
 
 class DisplayInfoModule(ModuleBase):
@@ -22,10 +20,9 @@ class DisplayInfoModule(ModuleBase):
         self.ui = SystemUI()
         self.topic = f"/module/{self.module_config.get_id()}"
 
-        # init
+        # init. show the logo for 5 seconds without blocking the module tick
         self.show_logo()
-        time.sleep(5)
-        self.__use_default_value()
+        self.init_timer = TimerService().call_later(5.0, lambda: self.__use_default_value())
         self.mqtt_client.subscribe(self.topic, self.__execute_job)
 
     def get_config(self) -> ModuleConfig:
@@ -39,6 +36,7 @@ class DisplayInfoModule(ModuleBase):
         return None
 
     def __execute_job(self, payload: dict):
+        self.init_timer.cancel()
         job = JobEntity(payload)
 
         for task in job.get_tasks():
@@ -55,6 +53,7 @@ class DisplayInfoModule(ModuleBase):
         self.ui.show_menu()
 
     def on_destroy(self):
+        self.init_timer.cancel()
         get_logger().warning(f"Stop module")
 
 
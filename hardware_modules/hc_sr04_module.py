@@ -20,11 +20,10 @@ CONSTANT_SOUND_SPEED = 0.0343 # sound needs 0.0343µs to travel 1mm
 class HCSR04Module(ModuleBase):
     def __init__(self, module_config: ModuleConfig):
         self.module_config = module_config
-        self.next_time = time.time()
         self.trigger_pin = map_gpio_for(module_config.get_pin_by_key('trigger_pin'))
         self.echo_pin = map_gpio_for(module_config.get_pin_by_key('echo_pin'))
 
-        self.pi = IO().get_pigpio()
+        self.pi = IO().get_gpio()
 
         self.pi.set_mode(self.trigger_pin, pigpio.OUTPUT)
         self.pi.write(self.trigger_pin, pigpio.HIGH)
@@ -52,10 +51,6 @@ class HCSR04Module(ModuleBase):
         if self.errors > 0:
             raise Exception(f"HCSR04Module id {self.module_config.get_id()} has {self.errors} errors")
 
-        now = time.time()
-
-        if self.next_time > now: return
-
         sensor = self.module_config.get_sensors()[0]
 
         self.trigger()
@@ -72,7 +67,6 @@ class HCSR04Module(ModuleBase):
         }]
 
         self.db.safe_sensor_readings(sensorValues)
-        self.next_time += self.module_config.get_interval()
 
     def _get_current_value(self) -> float:
         if self.echo_time is None:
@@ -22,7 +22,7 @@ class OpenCloseControlModule(ModuleBase):
         self.module_config = module_config
         self.controller_config = module_config.get_controllers()[0]
         self.mqtt_client = MQTTClient()
-        self.pi = IO().get_pigpio()
+        self.pi = IO().get_gpio()
         self.topic = f"/module/{self.module_config.get_id()}"
 
         # example: {"button_open_pin":12,"button_close_pin":25,"control_open_pin":5,"control_close_pin":6}
@@ -23,7 +23,7 @@ class PWMControlModule(ModuleBase):
         self.topic = f"/module/{self.module_config.get_id()}"
         self.mqtt_client = MQTTClient()
         self.gpio_number = map_gpio_for(module_config.get_pin_by_key('PIN'))
-        self.pi = IO().get_pigpio()
+        self.pi = IO().get_gpio()
         self.pi.set_mode(self.gpio_number, pigpio.OUTPUT)
         self.pi.set_PWM_range(self.gpio_number, 100)
 
@@ -15,7 +15,6 @@ from core.lokal_db import LokalDB
 class RaspiBasicModule(ModuleBase):
     def __init__(self, module_config: ModuleConfig):
         self.module_config = module_config
-        self.next_time = time.time()
         self.db = LokalDB()
 
     def get_config(self) -> ModuleConfig:
@@ -25,10 +24,6 @@ class RaspiBasicModule(ModuleBase):
         self.module_config = module_config
 
     def tick(self):
-        now = time.time()
-
-        if self.next_time > now: return None
-
         sensorValues = []
         for sensor in self.module_config.get_sensors():
             if sensor.is_type("CPU Temp"):
@@ -38,7 +33,6 @@ class RaspiBasicModule(ModuleBase):
                 })
 
         self.db.safe_sensor_readings(sensorValues)
-        self.next_time += self.module_config.get_interval()
 
     def on_destroy(self):
         pass
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+import binascii
+from typing import Dict, List, Tuple
+
+PROTOCOL_PARITY = 'parity'              # 1 byte XOR of all bytes, the protocol of the first RFClient
+PROTOCOL_CRC8 = 'crc8'                  # CRC-8 polynomial 0x07, init 0x00
+PROTOCOL_CRC16 = 'crc16'                # CRC-16/CCITT-FALSE polynomial 0x1021, init 0xFFFF
+
+PROTOCOL_VERSIONS = (PROTOCOL_PARITY, PROTOCOL_CRC8, PROTOCOL_CRC16)
+
+def crc_table(width: int, polynomial: int) -> List[int]:
+    """Register values for every top byte of a CRC that shifts the most significant bit first"""
+    top_bit, mask = 1 << (width - 1), (1 << width) - 1
+    table = []
+    for byte in range(256):
+        register = byte << (width - 8)
+        for _ in range(8):
+            register = ((register << 1) ^ polynomial) if register & top_bit else (register << 1)
+        table.append(register & mask)
+    return table
+
+class PackageCheck:
+    """
+    The check value at the end of a package, computed one byte at a time with a 256 entry table.
+    The register runs over the bytes of the package and the check value, a valid package ends with the register at 0.
+    XOR parity is the same register with 8 bits and the identity as table, the CRCs shift the most significant bit
+    first and have no final XOR, so all protocol versions share the code.
+    """
+    def __init__(self, name: str, width: int, table: List[int], init: int = 0):
+        self.name = name
+        self.size = width // 8          # bytes of the check value
+        self.table = table
+        self.init = init
+        self.__shift = width - 8
+        self.__mask = (1 << width) - 1
+
+    def update(self, register: int, data: bytes) -> int:
+        table, shift, mask = self.table, self.__shift, self.__mask
+        if shift == 0:
+            for byte in data:
+                register = table[register ^ byte]
+            return register
+        for byte in data:
+            register = ((register << 8) & mask) ^ table[(register >> shift) ^ byte]
+        return register
+
+    def compute(self, data: bytes) -> bytes:
+        return self.update(self.init, data).to_bytes(self.size, 'big')
+
+    def is_valid(self, package: bytes) -> bool:
+        """package ends with its check value"""
+        return self.update(self.init, package) == 0
+
+    def window_tables(self, window_bytes: int) -> Tuple[List[int], int]:
+        """
+        For a register that slides over a window of window_bytes bytes and starts at 0 instead of init:
+        the value to XOR after a new byte for the byte that left the window, and the register of a valid window.
+        """
+        leaving = [self.update(0, bytes([byte]) + bytes(window_bytes)) for byte in range(256)]
+        return leaving, self.update(self.init, bytes(window_bytes))
+
+
+class ParityCheck(PackageCheck):
+    """XOR of all bytes. The bytes are folded as one int instead of one at a time"""
+    def __init__(self):
+        super().__init__(PROTOCOL_PARITY, 8, list(range(256)))
+
+    def update(self, register: int, data: bytes) -> int:
+        value = int.from_bytes(data, 'big')
+        # every byte reaches the lowest byte exactly once, by the shifts of the bits of its position
+        for step in range((len(data) - 1).bit_length() - 1, -1, -1):
+            value ^= value >> (8 << step)
+        return register ^ (value & 0xFF)
+
+class Crc16CcittCheck(PackageCheck):
+    """CRC-16/CCITT-FALSE. binascii.crc_hqx() runs the same register in C, the table is for the sliding window"""
+    def __init__(self):
+        super().__init__(PROTOCOL_CRC16, 16, crc_table(16, 0x1021), init=0xFFFF)
+
+    def update(self, register: int, data: bytes) -> int:
+        return binascii.crc_hqx(data, register)
+
+
+PACKAGE_CHECKS: Dict[str, PackageCheck] = {
+    PROTOCOL_PARITY: ParityCheck(),
+    PROTOCOL_CRC8: PackageCheck(PROTOCOL_CRC8, 8, crc_table(8, 0x07)),
+    PROTOCOL_CRC16: Crc16CcittCheck(),
+}
+
+def get_package_check(protocol_version: str) -> PackageCheck:
+    check = PACKAGE_CHECKS.get(protocol_version)
+    if check is None:
+        raise ValueError(f"Unknown protocol version '{protocol_version}'. Valid versions are {PROTOCOL_VERSIONS}")
+    return check
+
+
+if __name__ == "__main__":
+
+    # False accepts and CPU per package of every protocol version. Valid packages of random messages are corrupted
+    # by three kinds of noise, a false accept is a corrupted package whose check value still matches:
+    # - every bit flips with BIT_ERROR_RATE
+    # - two flips in the same bit of two different bytes, the blind spot of the XOR parity
+    # - a burst of 2 to 16 bits that are random between its first and last flipped bit
+    # The CPU is the time to build a Package (computes the check value) and to validate a received one.
+    import random
+    import time
+    from core.rf_client import BODY_SIZE, Package
+
+    TRIALS = 100000
+    BIT_ERROR_RATE = 0.01
+    ADDRESS = b'\x04\xd2'
+
+    def flip_random(package: bytearray):
+        for bit in range(len(package) * 8):
+            if random.random() < BIT_ERROR_RATE:
+                package[bit >> 3] ^= 0x80 >> (bit & 7)
+
+    def flip_column(package: bytearray):
+        first, second = random.sample(range(len(package)), 2)
+        mask = 1 << random.randrange(8)
+        package[first] ^= mask
+        package[second] ^= mask
+
+    def burst(package: bytearray):
+        length = random.randint(2, 16)
+        start = random.randrange(len(package) * 8 - length + 1)
+        pattern = (1 << (length - 1)) | random.getrandbits(length - 2) << 1 | 1 if length > 2 else 0b11
+        value = int.from_bytes(package, 'big') ^ (pattern << (len(package) * 8 - start - length))
+        package[:] = value.to_bytes(len(package), 'big')
+
+    random.seed(1)
+    for protocol_version in PROTOCOL_VERSIONS:
+        check = get_package_check(protocol_version)
+        packages = [Package(ADDRESS, b'\x16\x2e', 100, number, random.randbytes(BODY_SIZE), check=check).to_bytes()
+                    for number in range(100)]
+
+        results = []
+        for name, noise in (("random bits", flip_random), ("same column", flip_column), ("burst", burst)):
+            corrupted = accepted = 0
+            for trial in range(TRIALS):
+                package = bytearray(packages[trial % len(packages)])
+                noise(package)
+                if package == packages[trial % len(packages)]: continue
+                corrupted += 1
+                accepted += check.is_valid(package)
+            results.append(f"{name} {accepted / corrupted * 100:7.3f}% ({accepted:5})")
+
+        start = time.perf_counter()
+        for trial in range(TRIALS):
+            Package(ADDRESS, b'\x16\x2e', 100, trial & 0xFFFF, packages[0][8:8 + BODY_SIZE], check=check)
+        build = (time.perf_counter() - start) / TRIALS
+        start = time.perf_counter()
+        for trial in range(TRIALS):
+            Package.from_bytes(packages[trial % len(packages)], check).is_valid()
+        validate = (time.perf_counter() - start) / TRIALS
+
+        print(f"{protocol_version:6} false accepts of the corrupted packages: {', '.join(results)}; "
+              f"build {build * 1000000:5.2f} us, validate {validate * 1000000:5.2f} us per package")
@@ -1,12 +1,16 @@
 
 import pigpio
 
+from core.io import IO
+
 class PinAdapter():
     
     OUT = pigpio.OUTPUT
     IN = pigpio.INPUT
     
-    def __init__(self, gpio: int, pi = pigpio.pi()):
+    def __init__(self, gpio: int, pi = None):
+        # a pi() default would connect to the pigpio daemon on import
+        if pi is None: pi = IO().get_gpio()
         self.gpio = gpio
         self.pi = pi
         self.pigpio = pi
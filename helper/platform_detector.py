@@ -17,7 +17,7 @@ def get_cpu_temperature():
             temp_str = file.read()
             return float(temp_str) / 1000
     except FileNotFoundError as error:
-        get_logger().error("Kann die CPU-Temperatur nicht auslesen.", error)
+        get_logger().error(f"Kann die CPU-Temperatur nicht auslesen. {error}")
         return None
 
 
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+import gzip
+import json
+import zlib
+from typing import Dict, List, Tuple, Union
+
+FORMAT_JSON = 'json'                    # [{"value":..,"sensorId":..,"createdAt":..}, ...]
+FORMAT_COLUMNAR = 'columnar-v1'         # {"sensors":[{"sensorId":..,"createdAt":[first, delta, ...],"values":[...]}, ...]}
+ENCODING_GZIP = 'gzip'
+ENCODING_DEFLATE = 'deflate'            # zlib stream as defined for the HTTP Content-Encoding "deflate"
+
+COMPRESSION_LEVEL = 6                   # zlib default. higher levels cost much more CPU for a few percent
+
+SUPPORTED_FORMATS = (FORMAT_COLUMNAR, FORMAT_JSON)          # in order of preference
+SUPPORTED_ENCODINGS = (ENCODING_DEFLATE, ENCODING_GZIP)     # in order of preference. deflate has the smaller header
+
+CONTENT_TYPES = {
+    FORMAT_JSON: "application/json; charset=utf-8",
+    FORMAT_COLUMNAR: "application/vnd.sensor-readings.columnar-v1+json; charset=utf-8",
+}
+
+def encode_json(sensorReadings: list, time_offset: int = 0) -> list:
+    """
+    :param sensorReadings: Readings from LokalDB.get_sensor_readings().
+    :param time_offset: Milliseconds added to every createdAt.
+    :return: One object per reading.
+    """
+    return [{
+        "value": reading['value'],
+        "sensorId": reading['sensorId'],
+        "createdAt": int(reading['createdAt']) + time_offset,
+    } for reading in sensorReadings]
+
+def encode_columnar(sensorReadings: list, time_offset: int = 0) -> dict:
+    """
+    Groups the readings per sensor into a value and a createdAt array.
+    The first createdAt of a sensor is absolute, all following ones are the difference to their predecessor.
+
+    :param sensorReadings: Readings from LokalDB.get_sensor_readings().
+    :param time_offset: Milliseconds added to every createdAt.
+    :return: The columnar body.
+    """
+    sensors: Dict[int, Tuple[list, list, list]] = {}
+    for reading in sensorReadings:
+        created_at = int(reading['createdAt']) + time_offset
+        column = sensors.get(reading['sensorId'])
+        if column is None:
+            sensors[reading['sensorId']] = ([created_at], [reading['value']], [created_at])
+            continue
+        times, values, last = column
+        times.append(created_at - last[0])
+        values.append(reading['value'])
+        last[0] = created_at
+
+    return {"sensors": [
+        {"sensorId": sensor_id, "createdAt": times, "values": values}
+        for sensor_id, (times, values, _) in sensors.items()
+    ]}
+
+def decode_columnar(body: dict) -> list:
+    """
+    Reverses encode_columnar(). The readings are returned grouped per sensor.
+
+    :param body: The columnar body.
+    :return: One object per reading like encode_json() returns them.
+    """
+    readings = []
+    for sensor in body['sensors']:
+        created_at = 0
+        for delta, value in zip(sensor['createdAt'], sensor['values']):
+            created_at += delta
+            readings.append({"value": value, "sensorId": sensor['sensorId'], "createdAt": created_at})
+    return readings
+
+def compress(data: bytes, content_encoding: Union[str, None]) -> bytes:
+    if content_encoding is None:
+        return data
+    if content_encoding == ENCODING_GZIP:
+        return gzip.compress(data, compresslevel=COMPRESSION_LEVEL, mtime=0)
+    if content_encoding == ENCODING_DEFLATE:
+        return zlib.compress(data, COMPRESSION_LEVEL)
+    raise ValueError(f"Unsupported content encoding '{content_encoding}'")
+
+def encode(sensorReadings: list, format: str = FORMAT_JSON, content_encoding: Union[str, None] = None, time_offset: int = 0) -> Tuple[bytes, Dict[str, str]]:
+    """
+    Builds the request body for an upload of sensor readings.
+
+    :param sensorReadings: Readings from LokalDB.get_sensor_readings().
+    :param format: FORMAT_JSON or FORMAT_COLUMNAR.
+    :param content_encoding: ENCODING_GZIP, ENCODING_DEFLATE or None for an uncompressed body.
+    :param time_offset: Milliseconds added to every createdAt.
+    :return: The body and the headers describing it.
+    """
+    if format == FORMAT_COLUMNAR:
+        body = encode_columnar(sensorReadings, time_offset)
+    elif format == FORMAT_JSON:
+        body = encode_json(sensorReadings, time_offset)
+    else:
+        raise ValueError(f"Unsupported sensor reading format '{format}'")
+
+    data = compress(json.dumps(body, separators=(',', ':')).encode('utf-8'), content_encoding)
+
+    headers = {"Content-Type": CONTENT_TYPES[format]}
+    if content_encoding is not None:
+        headers["Content-Encoding"] = content_encoding
+    return data, headers
+
+def negotiate(offered_formats: List[str], offered_encodings: List[str]) -> Tuple[str, Union[str, None]]:
+    """
+    Picks the preferred format and content encoding both sides support.
+
+    :param offered_formats: Formats the server accepts.
+    :param offered_encodings: Content encodings the server accepts.
+    :return: The format and the content encoding or None for uncompressed bodies.
+    """
+    format = next((f for f in SUPPORTED_FORMATS if f in offered_formats), FORMAT_JSON)
+    content_encoding = next((e for e in SUPPORTED_ENCODINGS if e in offered_encodings), None)
+    return format, content_encoding
+
+
+if __name__ == "__main__":
+
+    # Benchmark: bytes per reading and encode CPU time of all format and encoding combinations
+    import random
+    import time
+
+    def generate(count: int, sensor_count: int = 8) -> list:
+        random.seed(count)
+        now = int(time.time() * 1000)
+        readings = []
+        values = [20.0] * sensor_count
+        for i in range(count):
+            sensor = i % sensor_count
+            values[sensor] = round(values[sensor] + random.uniform(-0.3, 0.3), 1)
+            readings.append({"id": i + 1, "value": values[sensor], "sensorId": sensor + 1, "createdAt": now + (i // sensor_count) * 60000 + random.randint(0, 50)})
+        return readings
+
+    combinations = [(format, content_encoding) for format in (FORMAT_JSON, FORMAT_COLUMNAR) for content_encoding in (None, ENCODING_DEFLATE, ENCODING_GZIP)]
+
+    for count in (1000, 100000, 1000000):
+        readings = generate(count)
+        print(f"{count} readings")
+        for format, content_encoding in combinations:
+            start = time.process_time()
+            data, _ = encode(readings, format, content_encoding)
+            duration = time.process_time() - start
+            print(f"  {format:12} {str(content_encoding):8} {len(data) / count:7.2f} bytes/reading {duration * 1000:9.1f} ms CPU")
+
+        # the compact body has to describe the same readings
+        assert sorted(decode_columnar(encode_columnar(readings)), key=lambda r: (r['sensorId'], r['createdAt'])) \
+            == sorted(encode_json(readings), key=lambda r: (r['sensorId'], r['createdAt']))
@@ -2,7 +2,9 @@
 # -*- coding: utf8 -*-
 
 import os
+import signal
 import subprocess
+import sys
 import threading
 import time
 from dotenv import load_dotenv
@@ -14,13 +16,17 @@ from core.api_client import APIClient
 from core.mqtt_client import MQTTClient
 from exceptions.module_exception import ModuleInitializationException
 from core.lokal_db import LokalDB
-from exceptions.api_exception import ServerNotReachableException
+from core.uploader import Uploader
 from exceptions.io_exception import IOInitializationException
 from core.light import Light
+from core.timer_service import TimerService
 from system_ui.system_ui import SystemUI
 from core.module_manager import ModuleManager
 from entities.config_entity import DeviceConfig
 
+CONTACT_INTERVAL = 60               # seconds between pings and uploads
+CONTROLS_REFRESH_INTERVAL = 60      # seconds between re-registering the gpio callbacks of the ui controls
+
 # listen for restart prompt
 def handle_restart():
     get_logger().warning("App restart command received")
@@ -55,42 +61,36 @@ def main():
         mqtt_client = MQTTClient()
         module_manager = ModuleManager()
         localDb = LokalDB()
+        uploader = Uploader()
 
         mqtt_client.subscribe('/restart', lambda data: handle_restart())
 
         # setup all modules on the module_manager and listen for Configs
         module_manager.setup_modules( DeviceConfig(api_client.get_device_config()) )
 
-        mqtt_client.subscribe( '/config', lambda data: module_manager.setup_modules(DeviceConfig(data)) )
-
-        next_contact = time.time()
-
-        # start main loop
-        while True:
-
-            # on each tick the modules check there tasks and do some stuf eg. writing sensor values to the db
-            module_manager.tick()
-
-            # display is possibly not available. we catch the not available error here
-            if 'system_ui' in locals():
-                system_ui.tick()
+        # config changes are applied on the main loop. scheduling them wakes the loop up
+        scheduler = module_manager.get_scheduler()
+        mqtt_client.subscribe( '/config', lambda data: scheduler.call_later(0, lambda: module_manager.setup_modules(DeviceConfig(data))) )
 
-            try:
-                if next_contact <= time.time():
-                    if led is not None: led.blink()
-                    api_client.send_ping()
-                    next_contact += 60
+        # ping and upload on the background worker. the loop never waits for the server
+        def contact_server():
+            if led is not None: led.blink()
+            uploader.request_ping()
+            uploader.request_sync()
 
-                    module_values = localDb.get_sensor_readings()
+        scheduler.call_later(0, contact_server, interval=CONTACT_INTERVAL)
 
-                    if len(module_values) > 0:
-                        api_client.send_sensor_values(module_values)
+        # write buffered sensor readings if the oldest one waits too long
+        scheduler.call_later(localDb.flush_interval, localDb.tick, interval=localDb.flush_interval)
 
-            except ServerNotReachableException as error:
-                get_logger().error(f"{error}")
+        # display is possibly not available. we catch the not available error here
+        if 'system_ui' in locals():
+            scheduler.call_later(CONTROLS_REFRESH_INTERVAL, system_ui.tick, interval=CONTROLS_REFRESH_INTERVAL)
 
-            # wait before next run to save energy
-            time.sleep(0.5)
+        # start main loop. it sleeps until the next module tick or task is due
+        while True:
+            scheduler.run_pending()
+            scheduler.wait()
 
 
     except ModuleInitializationException as error:
@@ -128,8 +128,34 @@ def main():
         except Exception as error:
             get_logger().error( f"Failed to destroy system_ui! {error}")
 
+        try:
+            TimerService().on_destroy()
+        except Exception as error:
+            get_logger().error( f"Failed to destroy timer_service! {error}")
+
+        try:
+            if uploader is not None:
+                uploader.on_destroy()
+        except Exception as error:
+            get_logger().error( f"Failed to destroy uploader! {error}")
+
+        try:
+            if api_client is not None:
+                api_client.on_destroy()
+        except Exception as error:
+            get_logger().error( f"Failed to destroy api_client! {error}")
+
+        try:
+            if localDb is not None:
+                localDb.on_destroy()
+        except Exception as error:
+            get_logger().error( f"Failed to destroy localDb! {error}")
+
 
 if __name__ == "__main__":
 
+    # systemd stops the service with SIGTERM. Exit regularly so the finally block flushes and closes everything
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
     load_dotenv()
     main()
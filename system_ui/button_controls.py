@@ -14,7 +14,7 @@ from exceptions.io_exception import IOInitializationException
 
 class ButtonControls(UIControls):
     def __init__(self):
-        self.pigpio = IO().get_pigpio()
+        self.pigpio = IO().get_gpio()
 
         try:
             self.next_gpio = int(os.getenv('NEXT_GPIO'))
@@ -52,8 +52,6 @@ class ButtonControls(UIControls):
 
         self.last_press = 0
 
-        self.last_tick = time.time()
-
         self.__init_callbacks()
 
     def __init_callbacks(self):
@@ -106,8 +104,4 @@ class ButtonControls(UIControls):
         self.reset_callbacks()
 
     def tick(self):
-        now = time.time()
-        if now - self.last_tick < 60: return
-        self.last_tick = now
-
         self.__init_callbacks()
@@ -1,9 +1,11 @@
 #!/usr/bin/python3
 # -*- coding: utf8 -*-
 
-import threading
 from core.logger import get_logger
+from core.scheduler import ScheduledTask
+from core.timer_service import TimerService
 from abstract_base_classes.ui_controls import UIControls
+from system_ui.render_scheduler import RenderScheduler
 
 from typing import Callable, Union
 
@@ -13,9 +15,10 @@ WHITE = 1
 BLACK = 0
 
 class Confirm():
-    def __init__(self, display: FrameBuffer, controls: UIControls, okay_func: Callable, cancel_func: Callable, title="Confirm", text="Wollen Sie fortfahren?"):
+    def __init__(self, display: FrameBuffer, controls: UIControls, renderer: RenderScheduler, okay_func: Callable, cancel_func: Callable, title="Confirm", text="Wollen Sie fortfahren?"):
         self.display = display
         self.controls = controls
+        self.renderer = renderer
 
         self.title = title
         
@@ -27,20 +30,20 @@ class Confirm():
         self.okay_unlocked = False
         self.cancel_unlocked = False
         
-        self.reset_timer: Union[threading.Timer, None] = None
+        self.reset_timer: Union[ScheduledTask, None] = None
         
         self.controls.reset_callbacks()
         self.controls.on_next(lambda: self.__okay_action())
         self.controls.on_okay(lambda: self.__okay_action())
         self.controls.on_prev(lambda: self.__cancel_action())
         self.controls.on_back(lambda: self.__cancel_action())
-        self._draw()
+        self.renderer.show(self._draw)
 
     def __okay_action(self):
         if self.okay_unlocked is False:
             self.okay_unlocked = True
             self.cancel_unlocked = False
-            self._draw()
+            self.renderer.request_redraw()
             self.__start_reset_timer()
         else:
             if self.reset_timer is not None: self.reset_timer.cancel()
@@ -50,7 +53,7 @@ class Confirm():
         if self.cancel_unlocked is False:
             self.cancel_unlocked = True
             self.okay_unlocked = False
-            self._draw()
+            self.renderer.request_redraw()
             self.__start_reset_timer()
         else:
             if self.reset_timer is not None: self.reset_timer.cancel()
@@ -59,14 +62,13 @@ class Confirm():
     def __reset_actions(self):
         self.okay_unlocked = False
         self.cancel_unlocked = False
-        self._draw()
+        self.renderer.request_redraw()
     
     def __start_reset_timer(self):
         if self.reset_timer is not None:
             self.reset_timer.cancel()
         # Run the callback after 1 seconds
-        self.reset_timer = threading.Timer(1.0, lambda: self.__reset_actions())
-        self.reset_timer.start()
+        self.reset_timer = TimerService().call_later(1.0, lambda: self.__reset_actions())
 
     def _draw(self):
         """Das Input Feld wird auf dem Bildschirm dargestellt"""
@@ -115,6 +117,4 @@ class Confirm():
             self.display.text('Okay', x=button_column_2_x + 10, y=button_row_y + 4, color=BLACK)
         else: 
             self.display.rect(button_column_2_x, button_row_y, button_width, button_hight, WHITE)
-            self.display.text('Okay', x=button_column_2_x + 10, y=button_row_y + 4, color=WHITE)
-        
-        self.display.show()
\ No newline at end of file
+            self.display.text('Okay', x=button_column_2_x + 10, y=button_row_y + 4, color=WHITE)
\ No newline at end of file
@@ -1,12 +1,10 @@
 #!/usr/bin/python3
 # -*- coding: utf8 -*-
 
-import threading
 import time
-from custom_libs.adafruid_ssd1306 import SSD1306_I2C
 from core.logger import get_logger
-from abstract_base_classes.thread_base import ThreadBase
 from abstract_base_classes.ui_controls import UIControls
+from system_ui.render_scheduler import RenderScheduler
 
 
 from typing import Callable
@@ -17,6 +15,7 @@ from custom_libs.adafruit_framebuf import FrameBuffer
 CHAR_SET = " abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTVWXYX1234567890.,;:!?_-+*/=<>(){}[]\"^´`\\§$@%&|"
 WHITE = 1
 BLACK = 0
+CURSOR_SPEED = 1    # seconds of one blink period of the cursor
 
 class Cursor():
     def __init__(self, input: 'Input'):
@@ -37,8 +36,7 @@ class Cursor():
             
     def draw(self):
         if "nav" == self.input.mode:
-            cursor_speed = 1
-            if time.time() % cursor_speed <= cursor_speed / 2:
+            if time.time() % CURSOR_SPEED <= CURSOR_SPEED / 2:
                 self.__draw_cursor(WHITE)
             else:
                 self.__draw_cursor(BLACK)
@@ -46,10 +44,14 @@ class Cursor():
         elif "edit" == self.input.mode:
             self.__draw_cursor(WHITE)
 
-class Input(ThreadBase):
-    def __init__(self, display: FrameBuffer, controls: UIControls, okay_func: Callable[[str], None], stop_func: Callable, title="Eingabe", value=""):
+class Input():
+    """
+    Text input. The view is redrawn by the RenderScheduler on every control event and for the blinking cursor.
+    """
+    def __init__(self, display: FrameBuffer, controls: UIControls, renderer: RenderScheduler, okay_func: Callable[[str], None], stop_func: Callable, title="Eingabe", value=""):
         self.display = display
         self.controls = controls
+        self.renderer = renderer
         self.mode = "nav" # "nav", "edit"
         self.__nav_p = 0
         self.cursor = Cursor(self)
@@ -66,10 +68,9 @@ class Input(ThreadBase):
         self.controls.on_prev(lambda: self.__prev_action())
         self.controls.on_okay(lambda: self.__okay_action())
         self.controls.on_back(lambda: self.__back_action())
-        
-        self.__draw_thread = threading.Thread(target=self.run,)
-        self.__draw_thread.start()
-        
+
+        self.renderer.show(self._draw, refresh_interval=CURSOR_SPEED / 2)
+
 
     def __next_action(self):
         if "nav" == self.mode:
@@ -78,6 +79,7 @@ class Input(ThreadBase):
             
         elif "edit" == self.mode:
             self.char_i[self.__nav_p] = (self.char_i[self.__nav_p] + 1) % len(CHAR_SET)
+        self.renderer.request_redraw()
 
     def __prev_action(self):
         if "nav" == self.mode:
@@ -87,22 +89,24 @@ class Input(ThreadBase):
         elif "edit" == self.mode:
             self.char_i[self.__nav_p] -= 1
             if self.char_i[self.__nav_p] < 0: self.char_i[self.__nav_p] = len(CHAR_SET) - 1
+        self.renderer.request_redraw()
 
     def __okay_action(self):
         if "edit" == self.mode: 
             self.__nav_mode()
+            self.renderer.request_redraw()
             return
         
         if self.is_pointer_on_char(): # wenn pointer auf char zeigt
             self.__edit_mode()
+            self.renderer.request_redraw()
         elif self.is_pointer_after_text(): # wenn pointer auf char zeigt
             self.__append_text(" ")
             self.__edit_mode()
+            self.renderer.request_redraw()
         elif -1 == self.__nav_p: # wenn pointer auf okay button zeigt
-            self.stop()
             self.__okay_func(self.__get_text())
         elif -2 == self.__nav_p: # wenn pointer auf cancel button zeigt
-            self.stop()
             self.__stop_func()
 
     def __back_action(self):
@@ -114,8 +118,10 @@ class Input(ThreadBase):
                 self.__nav_p = -2
             elif -2 == self.__nav_p:
                 self.__stop_func()
-        if "edit" == self.mode:
+                return
+        elif "edit" == self.mode:
             self.__nav_mode()
+        self.renderer.request_redraw()
 
     def __edit_mode(self):
         self.mode = "edit"
@@ -124,18 +130,6 @@ class Input(ThreadBase):
     def __nav_mode(self):
         self.mode = "nav"
         
-    def run(self):
-        self.__running = True
-        while self.__running:
-            self._draw()
-        
-    def stop(self):
-        self.__running = False
-        self.__draw_thread.join()
-    
-    def isRunning(self):
-        return self.__draw_thread.is_alive()
-
     def _draw(self):
         """Das Input Feld wird auf dem Bildschirm dargestellt"""
         
@@ -166,8 +160,6 @@ class Input(ThreadBase):
         
         self.cursor.set_position(max([4, (4 + self.__nav_p * 6)]), 28)
         if not self.is_pointer_on_button(): self.cursor.draw()
-        
-        self.display.show()
     
     def __get_text(self):
         text = ""
@@ -1,7 +1,6 @@
 #!/usr/bin/python3
 # -*- coding: utf8 -*-
 
-from custom_libs.adafruid_ssd1306 import SSD1306_I2C
 from abstract_base_classes.ui_controls import UIControls
 
 from typing import TYPE_CHECKING, Callable, Union
@@ -84,16 +83,16 @@ class Menu():
             self.system_ui.controls.on_prev(lambda: self.__prev_action())
             self.system_ui.controls.on_okay(lambda: self.__okay_action())
             self.system_ui.controls.on_back(lambda: self.__back_action())
-            self._draw()
+            self.system_ui.renderer.show(self._draw)
 
     def __next_action(self):
         self.pointer = (self.pointer + 1) % len(self.nodes)
-        self._draw()
+        self.system_ui.request_redraw()
 
     def __prev_action(self):
         self.pointer -= 1
         if self.pointer < 0: self.pointer = len(self.nodes) - 1
-        self._draw()
+        self.system_ui.request_redraw()
 
     def __okay_action(self):
         # if child is a menu set the menu active
@@ -141,5 +140,3 @@ class Menu():
                 if item.menu: self.system_ui.display.line(2, row_top+5, 5, row_top+5, WHITE)
                 else: self.system_ui.display.fill_rect(3, row_top+4, 2, 2, WHITE)
                 self.system_ui.display.text(item.name, 8, row_top+2, WHITE)
-
-        self.system_ui.display.show()
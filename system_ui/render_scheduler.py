@@ -0,0 +1,189 @@
+#!/usr/bin/python3
+# -*- coding: utf8 -*-
+
+import threading
+import time
+from functools import partial
+from typing import Callable, List, Union
+
+from core.logger import get_logger
+from core.metrics import Metrics
+from custom_libs.adafruit_framebuf import FrameBuffer
+
+DEFAULT_MAX_FPS = 20            # frames per second. more is not visible on the OLEDs and only costs bus time
+STOP_TIMEOUT = 2                # seconds stop() waits for a running frame
+
+class RenderScheduler:
+    """
+    Draws the active view on its own thread. A view registers its draw function with show() and asks for
+    a new frame with request_redraw() whenever its state changed, e.g. on a control event.
+    Requests that arrive while a frame is pending are coalesced into one frame and frames are at least
+    1 / max_fps seconds apart. The draw function only draws into the framebuffer, show() of the display
+    is called by the scheduler.
+    Other display commands (contrast, power) are handed to submit(), so the render thread is the only one
+    that touches the framebuffer and the bus.
+    The number of frames and of coalesced requests are published as 'display.frames' and
+    'display.coalesced_redraws' on Metrics, the seconds the last frame took to draw and show as
+    'display.frame_time'.
+    """
+    def __init__(self, display: FrameBuffer, max_fps: float = DEFAULT_MAX_FPS):
+        self.display = display
+        self.frame_interval = 1 / max_fps
+
+        self.__draw: Union[Callable[[], None], None] = None
+        self.__refresh_interval: Union[float, None] = None
+        self.__pending = False
+        self.__commands: List[Callable[[], None]] = []
+        self.__running = True
+        self.__last_frame = 0.0
+        self.__condition = threading.Condition()
+
+        self.__thread = threading.Thread(name='render', target=self.__run, daemon=True)
+        self.__thread.start()
+
+    def show(self, draw: Union[Callable[[], None], None], refresh_interval: Union[float, None] = None):
+        """
+        Makes draw the active view and renders it.
+
+        :param draw: Draws the view into the framebuffer. Runs on the render thread. None keeps the last frame.
+        :param refresh_interval: Seconds between redraws without request, e.g. for a blinking cursor. None only redraws on request.
+        """
+        with self.__condition:
+            self.__draw = draw
+            self.__refresh_interval = refresh_interval
+            self.__pending = True
+            self.__condition.notify()
+
+    def request_redraw(self):
+        """Renders the active view again as soon as the frame rate allows"""
+        with self.__condition:
+            if self.__pending:
+                Metrics().increment('display.coalesced_redraws')
+            self.__pending = True
+            self.__condition.notify()
+
+    def submit(self, command: Callable[[], None]):
+        """Runs command on the render thread before the next frame. Commands run in the order they were submitted."""
+        with self.__condition:
+            self.__commands.append(command)
+            self.__condition.notify()
+
+    def __next_job(self) -> Union[Callable[[], None], None]:
+        """Waits until a command or a frame is due and returns it. None if stopped"""
+        with self.__condition:
+            while True:
+                if self.__commands:
+                    return self.__commands.pop(0)
+                if not self.__running:
+                    return None
+
+                due = None
+                if self.__pending:
+                    due = self.__last_frame + self.frame_interval
+                elif self.__draw is not None and self.__refresh_interval is not None:
+                    due = self.__last_frame + self.__refresh_interval
+
+                now = time.monotonic()
+                if due is not None and due <= now:
+                    self.__pending = False
+                    self.__last_frame = now
+                    if self.__draw is not None:
+                        return partial(self.__frame, self.__draw)
+                    continue
+
+                self.__condition.wait(None if due is None else due - now)
+
+    def __frame(self, draw: Callable[[], None]):
+        start = time.perf_counter()
+        draw()
+        self.display.show()
+        Metrics().set('display.frame_time', time.perf_counter() - start)
+        Metrics().increment('display.frames')
+
+    def __run(self):
+        while True:
+            job = self.__next_job()
+            if job is None: return
+
+            try:
+                job()
+            except Exception as error:
+                get_logger().error(f"Render thread job {job} failed! {error}")
+
+    def stop(self):
+        """Runs the submitted commands and stops the render thread"""
+        with self.__condition:
+            self.__running = False
+            self.__condition.notify()
+        self.__thread.join(STOP_TIMEOUT)
+
+
+if __name__ == "__main__":
+
+    # Benchmark: CPU time and display bus traffic while the WLAN SSID input is open for a few seconds
+    # and a key is pressed every 200ms. The old Input redrew in a loop without any pause.
+    from custom_libs.adafruit_framebuf import MVLSB
+    from custom_libs.dirty_region import DirtyRegion
+    from abstract_base_classes.ui_controls import UIControls
+    from system_ui.input import Input
+
+    DURATION = 3
+    FULL_FRAME = 6 * 3 + 2 + 128 * 8    # bytes of a whole frame including the addressing commands
+
+    class Display(DirtyRegion, FrameBuffer):
+        def __init__(self):
+            super().__init__(bytearray(128 * 8), 128, 64, MVLSB)
+            self.init_dirty_region(8, 128)
+            self.frames = 0
+            self.sent = 0
+
+        def show(self):
+            self.frames += 1
+            self.sent += sum(6 * 3 + 2 + (p_1 - p_0 + 1) * (x_1 - x_0 + 1)
+                             for p_0, p_1, x_0, x_1 in self.pop_changed_windows(self.buf, 20, 20))
+
+    class Controls(UIControls):
+        def __init__(self): self.reset_callbacks()
+        def on_next(self, callback): self.callbacks['next'].append(callback)
+        def on_prev(self, callback): self.callbacks['prev'].append(callback)
+        def on_okay(self, callback): self.callbacks['okay'].append(callback)
+        def on_back(self, callback): self.callbacks['back'].append(callback)
+        def on_any(self, callback): pass
+        def reset_callbacks(self): self.callbacks = {'next': [], 'prev': [], 'okay': [], 'back': []}
+        def stop(self): pass
+        def tick(self): pass
+        def press(self, key):
+            for callback in self.callbacks[key]: callback()
+
+    class BusyRenderer:
+        """The old behaviour: a thread that draws and shows as fast as it can"""
+        def __init__(self, display):
+            self.display = display
+            self.running = True
+        def show(self, draw, refresh_interval=None):
+            def run():
+                while self.running:
+                    draw()
+                    self.display.show()
+            self.thread = threading.Thread(target=run)
+            self.thread.start()
+        def request_redraw(self): pass
+        def stop(self):
+            self.running = False
+            self.thread.join()
+
+    for name, create in (("busy loop", BusyRenderer), ("render scheduler", RenderScheduler)):
+        display = Display()
+        controls = Controls()
+        renderer = create(display)
+        start, cpu_start = time.monotonic(), time.process_time()
+        Input(display, controls, renderer, okay_func=lambda text: None, stop_func=lambda: None, title='WLAN SSID', value='Fritz')
+        keys = ['next', 'next', 'okay', 'next', 'next', 'okay']
+        while time.monotonic() - start < DURATION:
+            time.sleep(0.2)
+            controls.press(keys[int(time.monotonic() * 5) % len(keys)])
+        renderer.stop()
+        cpu = time.process_time() - cpu_start
+        print(f"{name:16} {cpu / DURATION * 100:5.1f}% CPU {display.frames / DURATION:7.1f} frames/s "
+              f"{display.frames * FULL_FRAME / DURATION / 1000:7.1f} kB/s whole frames "
+              f"{display.sent / DURATION / 1000:6.2f} kB/s changed bytes")
@@ -20,7 +20,7 @@ class Trigger(TypedDict):
 
 class RotaryControls(UIControls):
     def __init__(self):
-        self.pigpio = IO().get_pigpio()
+        self.pigpio = IO().get_gpio()
 
         try:
             self.next_gpio = int(os.getenv('NEXT_GPIO'))
@@ -43,7 +43,6 @@ class RotaryControls(UIControls):
 
         self.last_rotary_trigger = 0
         self.last_press = 0
-        self.last_tick = time.time()
 
         self.__init_callbacks(self)
 
@@ -103,10 +102,6 @@ class RotaryControls(UIControls):
         self.reset_callbacks()
 
     def tick(self):
-        now = time.time()
-        if now - self.last_tick < 60: return
-        self.last_tick = now
-
         self.__init_callbacks()
 
 
@@ -0,0 +1,133 @@
+#!/usr/bin/python3
+# -*- coding: utf8 -*-
+
+import os
+from typing import Callable, Union
+
+from abstract_base_classes.ui_controls import UIControls
+from core.scheduler import ScheduledTask
+from core.timer_service import TimerService
+
+KEYS = ('next', 'prev', 'okay', 'back')
+DEFAULT_STEP_INTERVAL = 1.0     # seconds between two keys of the script
+
+class ScriptedControls(UIControls):
+    """
+    Controls without buttons for headless runs with a simulated display, e.g. rendering benchmarks on a CI machine.
+    Keys are pressed with press() or played from a script like 'next next okay back' with one key every
+    step_interval seconds on the TimerService. Without arguments the script is read from UI_SCRIPT and the
+    interval from UI_SCRIPT_INTERVAL.
+    """
+    def __init__(self, script: Union[str, None] = None, step_interval: Union[float, None] = None):
+        self.callbacks: dict[str, list[Callable]] = {key: [] for key in KEYS}
+        self.__script: list[str] = []
+        self.__timer: Union[ScheduledTask, None] = None
+
+        if script is None:
+            script = os.getenv('UI_SCRIPT', '')
+        if step_interval is None:
+            try:
+                step_interval = float(os.getenv('UI_SCRIPT_INTERVAL', DEFAULT_STEP_INTERVAL))
+                if step_interval <= 0: raise ValueError()
+            except ValueError:
+                raise ValueError("Environment Variable 'UI_SCRIPT_INTERVAL' has to be a number greater than 0.")
+
+        if script:
+            self.play(script, step_interval)
+
+    def play(self, script: str, step_interval: float = DEFAULT_STEP_INTERVAL):
+        """Presses the keys of the space separated script one after another. Replaces a script that is still playing"""
+        keys = script.split()
+        unknown = [key for key in keys if key not in KEYS]
+        if unknown: raise ValueError(f"Unknown keys {unknown} in script. Valid keys are {KEYS}")
+
+        if self.__timer is not None: self.__timer.cancel()
+        self.__script = keys
+        self.__timer = TimerService().call_later(step_interval, self.__step, interval=step_interval)
+
+    def __step(self):
+        if not self.__script:
+            self.__timer.cancel()
+            return
+        self.press(self.__script.pop(0))
+
+    def press(self, key: str):
+        """Runs the callbacks of key like a button press"""
+        for func in self.callbacks[key]:
+            func()
+
+    def on_next(self, callable: Callable):
+        self.callbacks['next'].append(callable)
+
+    def on_prev(self, callable: Callable):
+        self.callbacks['prev'].append(callable)
+
+    def on_okay(self, callable: Callable):
+        self.callbacks['okay'].append(callable)
+
+    def on_back(self, callable: Callable):
+        self.callbacks['back'].append(callable)
+
+    def on_any(self, callable: Callable):
+        for key in KEYS:
+            self.callbacks[key].append(callable)
+
+    def reset_callbacks(self):
+        # new lists, so a callback that resets the controls does not change the list press() runs
+        self.callbacks = {key: [] for key in KEYS}
+
+    def stop(self):
+        if self.__timer is not None: self.__timer.cancel()
+        self.reset_callbacks()
+
+    def tick(self):
+        pass
+
+
+if __name__ == "__main__":
+
+    # Frame time regression run without hardware: the SystemUI on every simulated display type walks through
+    # the menu, the contrast settings and the system info screen. The script ends where it started, so every
+    # round is the same. Every key waits for its frame, so the numbers do not depend on the frame rate limit.
+    import statistics
+    import sys
+    import time
+    from abstract_base_classes.singleton_meta import SingletonMeta
+    from core.metrics import Metrics
+    from system_ui.system_ui import SystemUI
+
+    # system info and back, into 'Kontrast' and one step down and up, back to the first menu item
+    SCRIPT = 'okay back next next okay next okay next prev back prev back prev prev'
+    ROUNDS = 20
+    FRAME_TIMEOUT = 1.0
+
+    os.environ['BUTTON_TYPE'] = 'SCRIPTED'
+    os.environ['DISPLAY_MAX_FPS'] = '1000'
+    display_types = sys.argv[1:] or ['SIMULATED_SSD1306_I2C', 'SIMULATED_SSD1306_SPI', 'SIMULATED_SH1106_I2C', 'SIMULATED_SH1106_SPI']
+
+    for display_type in display_types:
+        os.environ['DISPLAY_TYPE'] = display_type
+        system_ui = SystemUI()
+        bus = system_ui.simulated_bus
+        bus.reset_counters()
+
+        frame_times = []
+        for _ in range(ROUNDS):
+            for key in SCRIPT.split():
+                frames = Metrics().get('display.frames', 0)
+                system_ui.controls.press(key)
+                deadline = time.monotonic() + FRAME_TIMEOUT
+                while Metrics().get('display.frames', 0) == frames and time.monotonic() < deadline:
+                    time.sleep(0.0005)
+                frame_times.append(Metrics().get('display.frame_time'))
+
+        system_ui.on_destroy()
+        del SingletonMeta._instances[SystemUI]
+
+        frame_times.sort()
+        keys = len(frame_times)
+        print(f"{display_type:22} frame time mean {statistics.mean(frame_times) * 1000:5.2f} ms "
+              f"p95 {frame_times[int(keys * 0.95)] * 1000:5.2f} ms max {frame_times[-1] * 1000:5.2f} ms "
+              f"{bus.transactions / keys:5.1f} transactions {bus.bytes / keys:6.0f} bytes "
+              f"{bus.bus_time() / keys * 1000:5.2f} ms on the bus per key")
+    TimerService().on_destroy()
@@ -5,19 +5,19 @@ from functools import partial
 from itertools import chain
 import os
 import subprocess
-import board
-import digitalio
-import threading
 import time
 
 from typing import Union
 
 from custom_libs.adafruid_ssd1306 import SSD1306_I2C, SSD1306_SPI
+from custom_libs.fake_bus import FakeI2C, FakePin, FakeSPI
 from helper.platform_detector import get_cpu_temperature, get_platform_model
 from core.logger import get_logger
 from helper.pin_adapter import PinAdapter
 from abstract_base_classes.singleton_meta import SingletonMeta
 from core.io import IO
+from core.scheduler import ScheduledTask
+from core.timer_service import TimerService
 from exceptions.display_exception import DisplayInitializationException
 from core.config_storage import ConfigStorage
 from core.api_client import APIClient
@@ -26,57 +26,74 @@ from system_ui.confirm import Confirm
 from system_ui.rotary_controls import RotaryControls
 from system_ui.input import Input
 from system_ui.menu import Menu
+from system_ui.render_scheduler import RenderScheduler, DEFAULT_MAX_FPS
 from system_ui.button_controls import ButtonControls
+from system_ui.scripted_controls import ScriptedControls
 from custom_libs.SH1106.sh1106 import SH1106_I2C, SH1106_SPI
 
 WHITE = 1
 BLACK = 0
+SYSTEM_INFO_REFRESH_INTERVAL = 1.0      # seconds between the CPU temperature updates on the system info screen
+SIMULATED_PREFIX = 'SIMULATED_'         # DISPLAY_TYPE prefix that runs the display driver on an in-memory bus
 
 class SystemUI(metaclass=SingletonMeta):
     """
     display_type = 'SSD1306_I2C', 'SH1106_I2C', 'SSD1306_SPI', 'SH1106_SPI'
+    Each type with the prefix 'SIMULATED_' (e.g. 'SIMULATED_SH1106_I2C') runs the same driver on a FakeI2C or
+    FakeSPI bus without hardware. The bus is kept in self.simulated_bus and counts the transactions and bytes.
+    button_type = 'ROTARY', 'BUTTON', 'SCRIPTED'
+
+    All drawing and display commands run on the render thread of self.renderer. The views hand their draw
+    function to self.renderer.show() and call request_redraw() on changes, display commands go through
+    self.renderer.submit(). So the show_* methods can be called from any thread.
     """
     def __init__(self):
 
         self.config = ConfigStorage()
 
-        self.turn_dark_timer: Union[threading.Timer, None] = None
-        self.turn_off_timer: Union[threading.Timer, None] = None
+        self.turn_dark_timer: Union[ScheduledTask, None] = None
+        self.turn_off_timer: Union[ScheduledTask, None] = None
 
         self.display_type = os.getenv('DISPLAY_TYPE')
         self.button_type = os.getenv('BUTTON_TYPE')
 
         self.io = IO()
 
-        if self.display_type == 'SH1106_SPI':
+        self.simulated_bus: Union[FakeI2C, FakeSPI, None] = None
+        driver = self.display_type
+        if driver is not None and driver.startswith(SIMULATED_PREFIX):
+            driver = driver[len(SIMULATED_PREFIX):]
+            self.simulated_bus = FakeSPI() if driver.endswith('_SPI') else FakeI2C()
+
+        if driver == 'SH1106_SPI':
             self.display = SH1106_SPI(width=128, height=64,
-                                        spi=self.io.get_spi(),
-                                        dc=PinAdapter(21, self.io.get_pigpio()),
-                                        res=PinAdapter(22, self.io.get_pigpio()),
-                                        cs=PinAdapter(8, self.io.get_pigpio())
+                                        spi=self.__get_spi(),
+                                        dc=self.__get_pin(21),
+                                        res=self.__get_pin(22),
+                                        cs=self.__get_pin(8)
                                     )
             self.display.show()
 
-        elif self.display_type == 'SSD1306_SPI':
+        elif driver == 'SSD1306_SPI':
             self.display = SSD1306_SPI(width=128, height=64,
-                                        spi=self.io.get_spi(),
-                                        dc=digitalio.DigitalInOut( digitalio.D21 ),
+                                        spi=self.__get_spi(),
+                                        dc=self.__get_digital_pin('D21'),
                                         reset=None,
-                                        cs=digitalio.DigitalInOut( digitalio.D8 ),
+                                        cs=self.__get_digital_pin('D8'),
                                     )
             self.display.show()
 
-        elif self.display_type == 'SH1106_I2C':
+        elif driver == 'SH1106_I2C':
 
             self.display = SH1106_I2C(width=128, height=64,
-                                        i2c=self.io.get_i2c(),
+                                        i2c=self.__get_i2c(),
                                         addr=0x3C,
                                     )
             self.display.flip(True)
 
-        elif self.display_type == 'SSD1306_I2C':
+        elif driver == 'SSD1306_I2C':
             self.display = SSD1306_I2C(width=128, height=64,
-                                        i2c=self.io.get_i2c(),
+                                        i2c=self.__get_i2c(),
                                         addr=0x3C,
                                     )
             # self.display.contrast(128)      # Helligkeitsstufe 6
@@ -84,16 +101,24 @@ class SystemUI(metaclass=SingletonMeta):
         else:
             raise DisplayInitializationException(f'DISPLAY_TYPE {self.display_type} on config not supported!')
 
+        try:
+            max_fps = float(os.getenv('DISPLAY_MAX_FPS', DEFAULT_MAX_FPS))
+            if max_fps <= 0: raise ValueError()
+        except ValueError:
+            raise ValueError("Environment Variable 'DISPLAY_MAX_FPS' has to be a number greater than 0.")
+        self.renderer = RenderScheduler(self.display, max_fps)
 
         # init controls
         if self.button_type == 'ROTARY':
             self.controls = RotaryControls()
+        elif self.button_type == 'SCRIPTED':
+            self.controls = ScriptedControls()
         else:
             self.controls = ButtonControls()
 
-        api_client = APIClient()
         modules = []
         try:
+            api_client = APIClient()
             modules = DeviceConfig(api_client.get_device_config()).get_all_configs()
         except Exception as e:
             get_logger().error(f"Could not fetch device config from server: {e}")
@@ -140,26 +165,41 @@ class SystemUI(metaclass=SingletonMeta):
         self.main_menu.on_draw( lambda: self.__set_contrast() )
         self.show_menu()
 
+    def __get_i2c(self):
+        return self.simulated_bus if self.simulated_bus is not None else self.io.get_i2c()
+
+    def __get_spi(self):
+        return self.simulated_bus if self.simulated_bus is not None else self.io.get_spi()
+
+    def __get_pin(self, gpio: int):
+        """Output pin for the SH1106 driver"""
+        return FakePin() if self.simulated_bus is not None else PinAdapter(gpio, self.io.get_gpio())
+
+    def __get_digital_pin(self, name: str):
+        """Output pin for the SSD1306 driver. name is the board pin, e.g. 'D21'"""
+        if self.simulated_bus is not None: return FakePin()
+        import board
+        import digitalio
+        return digitalio.DigitalInOut(getattr(board, name))
+
     def __set_contrast(self, step: Union[int,None] = None, static: bool = False):
         """Set Contrast"""
         # change contrast
         if step is not None:
             self.config.set('display_contrast', step)
         contrast = [1,10,30,50,90,128][self.config.get('display_contrast', 2)]
-        self.display.contrast(contrast)
+        self.renderer.submit(partial(self.display.contrast, contrast))
         # Run display save timer
         if self.turn_dark_timer is not None:
             self.turn_dark_timer.cancel()
         if static is False:
-            self.turn_dark_timer = threading.Timer(5.0, lambda:self.display.contrast(1))
-            self.turn_dark_timer.start()
+            self.turn_dark_timer = TimerService().call_later(5.0, lambda:self.renderer.submit(partial(self.display.contrast, 1)))
         # Run display off timer
         seconds = [0,10,60,120,600,1800][self.config.get('auto_off_time', 0)]
         if self.turn_off_timer is not None:
             self.turn_off_timer.cancel()
         if seconds > 0:
-            self.turn_off_timer = threading.Timer(seconds, lambda:self.display_off())
-            self.turn_off_timer.start()
+            self.turn_off_timer = TimerService().call_later(seconds, lambda:self.display_off())
         return True
 
     def __set_auto_off(self, step: int):
@@ -167,50 +207,41 @@ class SystemUI(metaclass=SingletonMeta):
         self.__set_contrast()
         return True
 
+    def request_redraw(self):
+        """Renders the active view again. Can be called from any thread"""
+        self.renderer.request_redraw()
+
     def show_menu(self):
         self.main_menu.activate()
 
     def show_system_info(self):
         self.__set_contrast(static=True)
-        self.display.fill(0)
-        self.display.fill_rect(0, 0, 32, 32, WHITE)
-        self.display.fill_rect(2, 2, 28, 28, BLACK)
-        self.display.vline(9, 8, 22, WHITE)
-        self.display.vline(16, 2, 22, WHITE)
-        self.display.vline(23, 8, 22, WHITE)
-        # self.display.fill_rect(26, 24, 2, 4, WHITE)
-        self.display.text('Smarthome', 40, 0, WHITE)
-        self.display.text('MultiPlatform', 40, 12, WHITE)
-        self.display.text(f"{get_platform_model()}", 40, 24, WHITE)
-        self.display.text(f'Name: {os.getenv("DEVICE_UID")}', 0, 38, WHITE)
-
-        interrupted = False
-
-        def draw_cpu():
-            nonlocal interrupted
-            if interrupted: return
-            self.display.fill_rect(0, 50, 128, 10, BLACK)
-            if interrupted: return
-            self.display.text(f"CPU Temp: {get_cpu_temperature():.2f}'C", 0, 50, WHITE)
-            if interrupted: return
-            self.display.show()
-            if interrupted: return
-            draw_cpu_timer = threading.Timer(1.0, lambda: draw_cpu())
-            if interrupted: return
-            draw_cpu_timer.start()
-
-        draw_cpu()
-
-        def set_interrupted():
-            nonlocal interrupted
-            interrupted = True
+        platform_model = get_platform_model()
+
+        def draw():
+            self.display.fill(0)
+            self.display.fill_rect(0, 0, 32, 32, WHITE)
+            self.display.fill_rect(2, 2, 28, 28, BLACK)
+            self.display.vline(9, 8, 22, WHITE)
+            self.display.vline(16, 2, 22, WHITE)
+            self.display.vline(23, 8, 22, WHITE)
+            # self.display.fill_rect(26, 24, 2, 4, WHITE)
+            self.display.text('Smarthome', 40, 0, WHITE)
+            self.display.text('MultiPlatform', 40, 12, WHITE)
+            self.display.text(f"{platform_model}", 40, 24, WHITE)
+            self.display.text(f'Name: {os.getenv("DEVICE_UID")}', 0, 38, WHITE)
+            cpu_temperature = get_cpu_temperature()
+            if cpu_temperature is not None:
+                self.display.text(f"CPU Temp: {cpu_temperature:.2f}'C", 0, 50, WHITE)
+
+        # only the changed CPU temperature is sent to the display on a refresh
+        self.renderer.show(draw, refresh_interval=SYSTEM_INFO_REFRESH_INTERVAL)
 
         self.controls.reset_callbacks()
-        self.controls.on_any(lambda: (set_interrupted(), self.show_menu()))
+        self.controls.on_any(lambda: self.show_menu())
 
     def show_module_child(self, module_child: Union[SensorConfig, ControllerConfig]):
         self.__set_contrast(static=True)
-        self.display.fill(BLACK)
 
         text='Module Child not implemented yet'
         title='Info'
@@ -225,12 +256,17 @@ class SystemUI(metaclass=SingletonMeta):
 
         self.show_info(text=text, title=title)
 
-    def display_off(self):
+    def __power_off(self):
+        """Runs on the render thread"""
         self.display.fill(BLACK)
         self.display.show()
         self.display.poweroff()
+
+    def display_off(self):
+        self.renderer.show(None)
+        self.renderer.submit(self.__power_off)
         self.controls.reset_callbacks()
-        self.controls.on_any(lambda: self.display.poweron())
+        self.controls.on_any(lambda: self.renderer.submit(self.display.poweron))
         self.controls.on_any(lambda: self.show_menu())
 
 
@@ -243,6 +279,7 @@ class SystemUI(metaclass=SingletonMeta):
         Input(
             display=self.display,
             controls=self.controls,
+            renderer=self.renderer,
             okay_func=lambda text: print_and_to_menu(text),
             stop_func=lambda: self.show_menu(),
             title='WLAN SSID',
@@ -259,6 +296,7 @@ class SystemUI(metaclass=SingletonMeta):
         Input(
             display=self.display,
             controls=self.controls,
+            renderer=self.renderer,
             okay_func=lambda text: print_and_to_menu(text),
             stop_func=lambda: self.show_menu(),
             title='WLAN Passwort',
@@ -278,6 +316,7 @@ class SystemUI(metaclass=SingletonMeta):
         Confirm(
             display=self.display,
             controls=self.controls,
+            renderer=self.renderer,
             okay_func=lambda: restart_system(),
             cancel_func=lambda: self.show_menu(),
             title='Neustart',
@@ -286,23 +325,27 @@ class SystemUI(metaclass=SingletonMeta):
 
     def show_info(self, text='Ein unbekannter Fehler ist aufgetreten', title='Info'):
         self.__set_contrast(static=True)
-        self.display.fill(BLACK)
 
-        self.display.text(title, int(self.display.width / 2) - len(title) * 6, 4, WHITE, size=2)
+        def draw():
+            self.display.fill(BLACK)
 
-        length=20
-        lines = [text[i:i+length] for i in range(0, len(text), length)]
-        for index, line in enumerate(lines):
-            self.display.text(line.strip(), 5, 24 + index * 8, WHITE)
+            self.display.text(title, int(self.display.width / 2) - len(title) * 6, 4, WHITE, size=2)
 
-        self.display.show()
+            length=20
+            lines = [text[i:i+length] for i in range(0, len(text), length)]
+            for index, line in enumerate(lines):
+                self.display.text(line.strip(), 5, 24 + index * 8, WHITE)
+
+        self.renderer.show(draw)
         self.controls.reset_callbacks()
         self.controls.on_any(lambda: self.show_menu())
 
     def on_destroy(self):
-        self.display.fill(BLACK)
-        self.display.show()
-        self.display.poweroff()
+        if self.turn_dark_timer is not None: self.turn_dark_timer.cancel()
+        if self.turn_off_timer is not None: self.turn_off_timer.cancel()
+        self.renderer.show(None)
+        self.renderer.submit(self.__power_off)
+        self.renderer.stop()
 
 
     def tick(self):